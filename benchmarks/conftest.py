@@ -0,0 +1,42 @@
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import pytest
+from workloads import WORKLOADS
+
+from chalk import Diagram
+
+# Built diagrams, shared by the benchmarks that don't time construction.
+_built: Dict[str, Diagram] = {}
+
+
+@pytest.fixture(params=sorted(WORKLOADS))
+def workload(request: Any) -> str:
+    "Name of the workload."
+    return str(request.param)
+
+
+@pytest.fixture
+def diagram(workload: str) -> Diagram:
+    "The (pre-built) diagram of the workload."
+    if workload not in _built:
+        _built[workload] = WORKLOADS[workload]()
+    return _built[workload]
+
+
+@pytest.fixture
+def track_memory(benchmark: Any) -> Callable[..., None]:
+    """Runs a function once under ``tracemalloc`` and records its peak
+    memory use (in KiB) in the benchmark's ``extra_info``, where it ends up
+    in the JSON report next to the timings."""
+
+    def track(fn: Callable[..., Any], *args: Any) -> None:
+        tracemalloc.start()
+        try:
+            fn(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_kib"] = peak // 1024
+
+    return track
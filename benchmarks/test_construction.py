@@ -0,0 +1,14 @@
+from typing import Any, Callable
+
+import pytest
+from workloads import WORKLOADS
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_construction(
+    benchmark: Any, track_memory: Callable[..., None], workload: str
+) -> None:
+    build = WORKLOADS[workload]
+    track_memory(build)
+    benchmark(build)
@@ -0,0 +1,36 @@
+from typing import Any, Callable
+
+import pytest
+
+from chalk import Diagram, origin, unit_x, unit_y
+
+pytest.importorskip("pytest_benchmark")
+
+DIRECTIONS = [unit_x, -unit_x, unit_y, -unit_y, unit_x + unit_y]
+
+
+def envelope(d: Diagram) -> None:
+    env = d.get_envelope()
+    for v in DIRECTIONS:
+        env(v)
+
+
+def trace(d: Diagram) -> None:
+    tr = d.get_trace()
+    for v in DIRECTIONS:
+        tr(origin, v)
+
+
+def sub_map(d: Diagram) -> None:
+    d.get_sub_map()
+
+
+@pytest.mark.parametrize("query", [envelope, trace, sub_map])
+def test_layout(
+    benchmark: Any,
+    track_memory: Callable[..., None],
+    diagram: Diagram,
+    query: Callable[[Diagram], None],
+) -> None:
+    track_memory(query, diagram)
+    benchmark(query, diagram)
@@ -0,0 +1,52 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from chalk import Diagram
+from chalk.backend import cairo, svg, tikz
+
+pytest.importorskip("pytest_benchmark")
+
+HEIGHT = 256
+
+
+def test_render_svg(
+    benchmark: Any,
+    track_memory: Callable[..., None],
+    diagram: Diagram,
+    tmp_path: Path,
+) -> None:
+    path = str(tmp_path / "out.svg")
+    track_memory(svg.render, diagram, path, HEIGHT)
+    benchmark(svg.render, diagram, path, HEIGHT)
+    benchmark.extra_info["bytes"] = os.path.getsize(path)
+
+
+def test_render_png(
+    benchmark: Any,
+    track_memory: Callable[..., None],
+    diagram: Diagram,
+    tmp_path: Path,
+) -> None:
+    pytest.importorskip("cairo")
+    path = str(tmp_path / "out.png")
+    track_memory(cairo.render, diagram, path, HEIGHT)
+    benchmark(cairo.render, diagram, path, HEIGHT)
+    benchmark.extra_info["bytes"] = os.path.getsize(path)
+
+
+def test_render_pdf(
+    benchmark: Any,
+    track_memory: Callable[..., None],
+    diagram: Diagram,
+    tmp_path: Path,
+) -> None:
+    pytest.importorskip("pylatex")
+    if shutil.which("pdflatex") is None:
+        pytest.skip("pdflatex is not installed")
+    path = str(tmp_path / "out.pdf")
+    # LaTeX compilation dominates, so a couple of rounds are enough.
+    benchmark.pedantic(tikz.render, (diagram, path, HEIGHT), rounds=2)
@@ -0,0 +1,360 @@
+"""
+Diagrams used by the benchmarks, adapted from the examples.
+
+Each workload is a function that builds a diagram from scratch, so that the
+construction itself can be timed. ``WORKLOADS`` maps the benchmark ids to
+the builders and their size parameters.
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+from colour import Color
+
+from chalk import (
+    ArrowOpts,
+    Diagram,
+    Trail,
+    arc_between,
+    circle,
+    concat,
+    hcat,
+    make_path,
+    origin,
+    rectangle,
+    square,
+    strut,
+    text,
+    unit_x,
+    unit_y,
+    vcat,
+)
+
+black = Color("black")
+grey = Color("#444444")
+gold = Color("#E7D49C")
+green = Color("green")
+white = Color("white")
+hanoi_colors = [Color("#9FB4CC"), Color("#CCCC9F"), Color("#DB4105")]
+
+
+# Hilbert curve (examples/hilbert.py)
+
+
+def hilbert_trail(n: int) -> Trail:
+    unit_x, unit_y = Trail.hrule(1), Trail.vrule(1)
+    if n == 0:
+        return Trail.empty()
+    h = hilbert_trail(n - 1)
+    h2 = h.rotate_by(0.25)
+    return (
+        h2.reflect_y()
+        + unit_y
+        + h
+        + unit_x
+        + h
+        + unit_y.reflect_y()
+        + h2.reflect_x()
+    )
+
+
+def hilbert(n: int) -> Diagram:
+    return hilbert_trail(n).stroke().center_xy().line_width(0.05)
+
+
+# Koch curves (examples/koch.py)
+
+
+def koch_trail(n: int) -> Trail:
+    if n == 0:
+        return Trail.hrule(1).scale_x(5)
+    k = koch_trail(n - 1).scale(1 / 3)
+    return k + k.rotate_by(1 / 6) + k.rotate_by(-1 / 6) + k
+
+
+def koch(n: int) -> Diagram:
+    return vcat(
+        koch_trail(i).stroke().line_width(0.01) for i in range(1, n + 1)
+    )
+
+
+# Escher's square limit (examples/escher_square_limit.py)
+
+# fmt: off
+markings = {
+    "p": [
+        [(4, 4), (6, 0)],
+        [(0, 3), (3, 4), (0, 8), (0, 3)],
+        [(4, 5), (7, 6), (4, 10), (4, 5)],
+        [(11, 0), (10, 4), (8, 8), (4, 13), (0, 16)],
+        [(11, 0), (14, 2), (16, 2)],
+        [(10, 4), (13, 5), (16, 4)],
+        [(9, 6), (12, 7), (16, 6)],
+        [(8, 8), (12, 9), (16, 8)],
+        [(8, 12), (16, 10)],
+        [(0, 16), (6, 15), (8, 16), (12, 12), (16, 12)],
+        [(10, 16), (12, 14), (16, 13)],
+        [(12, 16), (13, 15), (16, 14)],
+        [(14, 16), (16, 15)],
+    ],
+    "q": [
+        [(2, 0), (4, 5), (4, 7)],
+        [(4, 0), (6, 5), (6, 7)],
+        [(6, 0), (8, 5), (8, 8)],
+        [(8, 0), (10, 6), (10, 9)],
+        [(10, 0), (14, 11)],
+        [(12, 0), (13, 4), (16, 8), (15, 10), (16, 16), (12, 10), (6, 7), (4, 7), (0, 8)],  # noqa: E501
+        [(13, 0), (16, 6)],
+        [(14, 0), (16, 4)],
+        [(15, 0), (16, 2)],
+        [(0, 10), (7, 11)],
+        [(9, 12), (10, 10), (12, 12), (9, 12)],
+        [(8, 15), (9, 13), (11, 15), (8, 15)],
+        [(0, 12), (3, 13), (7, 15), (8, 16)],
+        [(2, 16), (3, 13)],
+        [(4, 16), (5, 14)],
+        [(6, 16), (7, 15)],
+    ],
+    "r": [
+        [(0, 12), (1, 14)],
+        [(0, 8), (2, 12)],
+        [(0, 4), (5, 10)],
+        [(0, 0), (8, 8)],
+        [(1, 1), (4, 0)],
+        [(2, 2), (8, 0)],
+        [(3, 3), (8, 2), (12, 0)],
+        [(5, 5), (12, 3), (16, 0)],
+        [(0, 16), (2, 12), (8, 8), (14, 6), (16, 4)],
+        [(6, 16), (11, 10), (16, 6)],
+        [(11, 16), (12, 12), (16, 8)],
+        [(12, 12), (16, 16)],
+        [(13, 13), (16, 10)],
+        [(14, 14), (16, 12)],
+        [(15, 15), (16, 14)],
+    ],
+    "s": [
+        [(0, 0), (4, 2), (8, 2), (16, 0)],
+        [(0, 4), (2, 1)],
+        [(0, 6), (7, 4)],
+        [(0, 8), (8, 6)],
+        [(0, 10), (7, 8)],
+        [(0, 12), (7, 10)],
+        [(0, 14), (7, 13)],
+        [(8, 16), (7, 13), (7, 8), (8, 6), (10, 4), (16, 0)],
+        [(10, 16), (11, 10)],
+        [(10, 6), (12, 4), (12, 7), (10, 6)],
+        [(13, 7), (15, 5), (15, 8), (13, 7)],
+        [(12, 16), (13, 13), (15, 9), (16, 8)],
+        [(13, 13), (16, 14)],
+        [(14, 11), (16, 12)],
+        [(15, 9), (16, 10)],
+    ],
+}
+# fmt: on
+
+
+def make_tile(name: str) -> Diagram:
+    def center(val: float) -> float:
+        return (val - 8) / 16
+
+    return concat(
+        make_path([(center(x), -center(y)) for x, y in coords])
+        for coords in markings[name]
+    )
+
+
+def quartet(tl: Diagram, tr: Diagram, bl: Diagram, br: Diagram) -> Diagram:
+    return ((tl | tr) / (bl | br)).center_xy().scale(0.5)
+
+
+def cycle(d: Diagram) -> Diagram:
+    return quartet(d, d.rotate(270), d.rotate(90), d.rotate(180))
+
+
+def escher_square_limit() -> Diagram:
+    blank = strut(1, 1)
+    fish = {name: make_tile(name) for name in "pqrs"}
+    fish_t = quartet(fish["p"], fish["q"], fish["r"], fish["s"])
+    fish_u = cycle(fish["q"].rotate(90))
+    side_1 = quartet(blank, blank, fish_t.rotate(90), fish_t)
+    side_2 = quartet(side_1, side_1, fish_t.rotate(90), fish_t)
+    corner_1 = quartet(blank, blank, blank, fish_u)
+    corner_2 = quartet(corner_1, side_1, side_1.rotate(90), fish_u)
+    pseudocorner = quartet(
+        corner_2, side_2, side_2.rotate(90), fish_t.rotate(90)
+    )
+    return cycle(pseudocorner).line_width(0.05)
+
+
+# Tournament network (examples/tournament-network.py)
+
+
+def tournament(n: int) -> Diagram:
+    def node(i: int) -> Diagram:
+        c = circle(0.2).fill_color(green)
+        t = text(str(i), 0.2).fill_color(white).line_width(0)
+        return (c + t).named(str(i))  # type: ignore
+
+    points = Trail.regular_polygon(n, 1).points()
+    d = concat(node(i).translate(p.x, p.y) for i, p in enumerate(points))
+    opts = ArrowOpts(head_pad=0.1, tail_pad=0.1)
+    for i in range(n):
+        for j in range(i + 1, n):
+            d = d.connect_outside(str(i), str(j), opts)  # type: ignore
+    return d
+
+
+# Towers of Hanoi (examples/hanoi.py)
+
+Hanoi = List[List[int]]
+
+
+def hanoi_states(disks: int) -> List[Hanoi]:
+    def moves(n: int, src: int, spare: int, tgt: int) -> List[Tuple[int, int]]:
+        if n <= 0:
+            return []
+        return (
+            moves(n - 1, src, tgt, spare)
+            + [(src, tgt)]
+            + moves(n - 1, spare, src, tgt)
+        )
+
+    state: Hanoi = [list(range(disks)), [], []]
+    states = [state]
+    for src, tgt in moves(disks, 0, 1, 2):
+        state = [list(stack) for stack in state]
+        state[tgt].insert(0, state[src].pop(0))
+        states.append(state)
+    return states
+
+
+def hanoi(disks: int) -> Diagram:
+    def draw_disk(n: int) -> Diagram:
+        color = hanoi_colors[n % len(hanoi_colors)]
+        return (
+            rectangle(n + 2, 1)
+            .fill_color(color)
+            .line_color(color)
+            .line_width(0.05)
+        )
+
+    def draw_stack(s: List[int]) -> Diagram:
+        post = rectangle(0.8, disks + 3).fill_color(black)
+        return post.align_b() + vcat(map(draw_disk, s)).align_b()
+
+    def draw_hanoi(state: Hanoi) -> Diagram:
+        return concat(
+            draw_stack(s).translate((disks + 4) * i, 0)
+            for i, s in enumerate(state)
+        )
+
+    return concat(
+        draw_hanoi(state).translate(0, (disks + 4.5) * i)
+        for i, state in enumerate(hanoi_states(disks))
+    )
+
+
+# Big Ben (examples/bigben.py), without the frame ornaments
+
+
+def rot_cycle(d: Diagram, times: int) -> Diagram:
+    return concat(d.rotate_by(i / times) for i in range(times))
+
+
+def fit_in(b: Diagram, s: Diagram, frame: float = 0.1) -> Diagram:
+    m = min(x for x in b.get_trace()(origin, unit_x) if x > 0)
+    return b + s.scale_uniform_to_x(2 * m - frame)
+
+
+def bigben() -> Diagram:
+    column = rectangle(1, 4).fill_color(black)
+    diamond = rectangle(1, 1).fill_color(black) + rectangle(
+        0.5, 0.5
+    ).fill_color(grey)
+    diamond = diamond.rotate_by(1 / 8)
+    column = column.with_envelope(rectangle(1, 2.5))
+    i = ((column / diamond).beside(diamond, -unit_y)).center_xy()
+    i = i + rectangle(0.01, 4).line_color(grey)
+    v = rectangle(1.5, 1).fill_color(black).align_bl() + i.align_b()
+    v = (v.align_br() + i.align_b()).center_xy()
+    ddiamond = (diamond | diamond).translate(-0.5, 0)
+    mid = (
+        rectangle(2, 0.5).fill_color(black)
+        + rectangle(1.5, 0.1).fill_color(grey)
+    ).shear_x(-0.2)
+    x = ((column / ddiamond) + mid).beside(ddiamond, -unit_y).center_xy()
+    numbers = [x | i | i, i, i | i, i | i | i, i | v, v, v | i]
+    numbers += [v | i | i, v | i | i | i, i | x, x, x | i]
+    part0 = concat(
+        n.center_xy().scale(0.05).translate_by(-unit_y).rotate_by(-k / 12)
+        for k, n in enumerate(numbers)
+    )
+
+    inner_circle = rot_cycle(circle(1.1).translate(0, -4.4), 12).rotate_by(
+        1 / 24
+    ) + circle(3).fill_color(black)
+    u45 = unit_x.rotate(-45)  # type: ignore
+    u60 = unit_x.rotate(60)  # type: ignore
+    diffy = abs(u45.y / u60.y)
+    diffx = diffy * abs(u60.x / u45.x)
+    offsets = [u45, diffy * u60, -diffy * u60, -0.73 * u60, 0.73 * u60]
+    offsets += [diffx * u45, diffx * unit_y]
+    y = Trail.from_offsets(offsets).stroke().align_br()
+    under_arc = arc_between(-unit_x, 2 * -unit_y, 0.5).align_tr()
+    pattern = (y.scale(3) / under_arc).align_r()
+    pattern = (pattern + pattern.reflect_x()).align_b()
+    part1 = inner_circle + rot_cycle(pattern.translate(0, -5.4), 12)
+    part1 = part1.line_color(gold).line_width(0.2)
+
+    band1 = (circle(1.1).line_width(0.1) + circle(1)).line_width(
+        0.2
+    ) + rot_cycle(diamond.scale(0.05).translate(1.05, 0), 12)
+    lines = rectangle(0.4, 0.001).fill_color(black).line_width(0.01)
+    band2 = fit_in(circle(1.4), part0, 0.1) + circle(1)
+    band2 = band2 + rot_cycle(lines.translate(1.2, 0), 48)
+    track = rectangle(0.33, 0.001, 0.1).fill_color(black).line_width(0.3)
+    band3 = (
+        circle(2.0).line_width(0.7)
+        + (circle(1.8) + circle(1.6)).line_width(0.3)
+        + circle(1.4).line_width(0.4)
+    )
+    band3 = band3 + rot_cycle(track.translate(1.7, 0), 60)
+    part2 = fit_in(band3, fit_in(band2, band1))
+
+    hand = make_path(
+        [(2, -0.5), (1, 0), (0.4, 20), (0, 21), (0, -1.5), (0.5, -1)],
+        closed=True,
+    ).fill_color(black)
+    hand = (hand + hand.reflect_x()).translate(0, -4).line_width(0.1)
+    frame = rectangle(1, 1).fill_color(black).line_color(gold)
+    inner = circle(1).line_color(gold).scale_uniform_to_x(0.96)
+    return (
+        frame.line_width(0.6)
+        + fit_in(inner, fit_in(part2, part1), 0.0)
+        + hand.scale_uniform_to_y(0.55).rotate_by(0.1)
+    )
+
+
+# Grids of simple shapes
+
+
+def grid(n: int) -> Diagram:
+    return vcat(
+        hcat((square(1) if (i + j) % 2 else circle(0.5)) for j in range(n))
+        for i in range(n)
+    )
+
+
+WORKLOADS: Dict[str, Callable[[], Diagram]] = {
+    "hilbert-3": lambda: hilbert(3),
+    "hilbert-5": lambda: hilbert(5),
+    "koch-4": lambda: koch(4),
+    "koch-6": lambda: koch(6),
+    "escher": escher_square_limit,
+    "tournament-6": lambda: tournament(6),
+    "tournament-12": lambda: tournament(12),
+    "hanoi-3": lambda: hanoi(3),
+    "hanoi-6": lambda: hanoi(6),
+    "bigben": bigben,
+    "grid-10": lambda: grid(10),
+    "grid-40": lambda: grid(40),
+}
@@ -14,6 +14,7 @@ from chalk.combinators import *  # noqa: F403
 from chalk.core import set_svg_draw_height, set_svg_height
 from chalk.envelope import Envelope
 from chalk.monoid import Maybe, MList, Monoid
+from chalk.parallel import RenderResult, render_many
 from chalk.shapes import *  # noqa: F403
 from chalk.style import Style
 from chalk.subdiagram import Name
@@ -0,0 +1,26 @@
+from typing import Callable, Dict
+
+BACKENDS = ("png", "svg", "pdf")
+
+
+def renderer(backend: str) -> Callable[..., None]:
+    """Returns the render function of a backend.
+
+    Args:
+        backend (str): One of ``"png"``, ``"svg"``, ``"pdf"``.
+
+    Returns:
+        Callable[..., None]: Function taking the diagram, the output path
+        and the size options.
+    """
+    assert backend in BACKENDS, f"Unknown backend {backend}"
+    import chalk.backend.cairo
+    import chalk.backend.svg
+    import chalk.backend.tikz
+
+    renderers: Dict[str, Callable[..., None]] = {
+        "png": chalk.backend.cairo.render,
+        "svg": chalk.backend.svg.render,
+        "pdf": chalk.backend.tikz.render,
+    }
+    return renderers[backend]
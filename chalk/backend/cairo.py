@@ -1,32 +1,56 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Optional
+import math
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
+from chalk.cull import frame
 from chalk.monoid import MList
+from chalk.profile import stage
 from chalk.shapes import (
     ArcSegment,
     ArrowHead,
+    Circle,
+    Geometric,
     Image,
     Latex,
     Path,
+    Rect,
+    RegularPolygon,
     Segment,
-    SegmentLike,
     Spacer,
     Text,
-    from_pil,
 )
+from chalk.shapes.latex import resolve_pending
+from chalk.shapes.text import FONT
 from chalk.style import Style
-from chalk.transform import P2, Affine, to_radians, unit_x, unit_y
+from chalk.transform import (
+    P2,
+    V2,
+    Affine,
+    BoundingBox,
+    to_radians,
+    unit_x,
+    unit_y,
+)
 from chalk.types import Diagram
 from chalk.visitor import DiagramVisitor, ShapeVisitor
 
 if TYPE_CHECKING:
-    from chalk.core import ApplyName, ApplyStyle, ApplyTransform, Primitive
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Instanced,
+        Primitive,
+    )
 
 
 Ident = Affine.identity()
 PyCairoContext = Any
 EMPTY_STYLE = Style.empty()
+# Path operations
+MOVE, LINE, ARC, CLOSE = range(4)
 
 
 def tx_to_cairo(affine: Affine) -> Any:
@@ -76,27 +100,76 @@ class ToList(DiagramVisitor[MList[Any], Affine]):
     ) -> MList[Primitive]:
         return MList([prim for prim in diagram.diagram.accept(self, t).data])
 
-
-class ToCairoShape(ShapeVisitor[None]):
-
-    def render_segment(
-        self, seg: SegmentLike, ctx: PyCairoContext, p: P2
-    ) -> None:
-        q = seg.q + p
-        if isinstance(seg, Segment):
-            ctx.line_to(q.x, q.y)
-        elif isinstance(seg, ArcSegment):
-            end = seg.angle + seg.dangle
+    def visit_instanced(
+        self, diagram: Instanced, t: Affine = Ident
+    ) -> MList[Primitive]:
+        # The diagram is compiled once; its copies share the shapes.
+        prims = diagram.diagram.accept(self, t).data
+        out = []
+        for i, ti in enumerate(diagram.transforms):
+            t_new = t * ti
+            copies = [prim.apply_transform(t_new) for prim in prims]
+            if diagram.styles is not None:
+                style = diagram.styles[i]
+                copies = [prim.apply_style(style) for prim in copies]
+            out.extend(copies)
+        return MList(out)
+
+
+def path_ops(path: Path) -> List[Tuple[Any, ...]]:
+    """The Cairo calls that draw a path, in its own coordinates. Arcs are
+    drawn on a unit circle, in the coordinates given by their matrix."""
+    ops: List[Tuple[Any, ...]] = []
+    for loc_trail in path.loc_trails:
+        for i, (seg, p) in enumerate(loc_trail.located_segments()):
+            if i == 0:
+                ops.append((MOVE, p.x, p.y))
+            if isinstance(seg, Segment):
+                q = seg.q + p
+                ops.append((LINE, q.x, q.y))
+            elif isinstance(seg, ArcSegment):
+                end = seg.angle + seg.dangle
+                matrix = tx_to_cairo(Affine.translation(p) * seg.t)
+                start, end = to_radians(seg.angle), to_radians(end)
+                ops.append((ARC, matrix, start, end, seg.dangle < 0))
+        if loc_trail.trail.closed:
+            ops.append((CLOSE,))
+    return ops
+
+
+def replay(ops: List[Tuple[Any, ...]], ctx: PyCairoContext) -> None:
+    "Adds a path given by ``path_ops`` to the context."
+    for op in ops:
+        kind = op[0]
+        if kind == LINE:
+            ctx.line_to(op[1], op[2])
+        elif kind == MOVE:
+            ctx.move_to(op[1], op[2])
+        elif kind == ARC:
+            _, matrix, start, end, negative = op
             ctx.save()
-            matrix = tx_to_cairo(Affine.translation(p) * seg.t)
             ctx.transform(matrix)
-            if seg.dangle < 0:
-                ctx.arc_negative(
-                    0.0, 0.0, 1.0, to_radians(seg.angle), to_radians(end)
-                )
+            if negative:
+                ctx.arc_negative(0.0, 0.0, 1.0, start, end)
             else:
-                ctx.arc(0.0, 0.0, 1.0, to_radians(seg.angle), to_radians(end))
+                ctx.arc(0.0, 0.0, 1.0, start, end)
             ctx.restore()
+        else:
+            ctx.close_path()
+
+
+class ToCairoShape(ShapeVisitor[None]):
+    """Draws shapes. The calls drawing a path that ``prims`` draw several
+    times (as the copies of an ``Instanced`` diagram) are kept until its
+    last copy is drawn, so that it is only converted once."""
+
+    def __init__(self, prims: Sequence[Any] = ()) -> None:
+        counts = Counter(
+            id(prim.shape) for prim in prims if isinstance(prim.shape, Path)
+        )
+        # Draws left of each shared path; `prims` keeps the paths alive.
+        self.uses = {key: n for key, n in counts.items() if n > 1}
+        self.paths: Dict[int, List[Tuple[Any, ...]]] = {}
 
     def visit_path(
         self,
@@ -106,13 +179,46 @@ class ToCairoShape(ShapeVisitor[None]):
     ) -> None:
         if not path.loc_trails[0].trail.closed:
             style.fill_opacity_ = 0
-        for loc_trail in path.loc_trails:
-            for i, (seg, p) in enumerate(loc_trail.located_segments()):
-                if i == 0:
-                    ctx.move_to(p.x, p.y)
-                self.render_segment(seg, ctx, p)
-            if loc_trail.trail.closed:
-                ctx.close_path()
+        key = id(path)
+        ops = self.paths.pop(key, None)
+        if ops is None:
+            ops = path_ops(path)
+        left = self.uses.pop(key, 1) - 1
+        if left > 0:
+            self.uses[key] = left
+            self.paths[key] = ops
+        replay(ops, ctx)
+
+    def visit_circle(
+        self,
+        shape: Circle,
+        ctx: PyCairoContext = None,
+        style: Style = EMPTY_STYLE,
+    ) -> None:
+        ctx.new_sub_path()
+        ctx.arc(0.0, 0.0, abs(shape.radius), 0.0, 2 * math.pi)
+        ctx.close_path()
+
+    def visit_rect(
+        self,
+        shape: Rect,
+        ctx: PyCairoContext = None,
+        style: Style = EMPTY_STYLE,
+    ) -> None:
+        w, h = shape.width, shape.height
+        ctx.rectangle(-w / 2, -h / 2, w, h)
+
+    def visit_regular_polygon(
+        self,
+        shape: RegularPolygon,
+        ctx: PyCairoContext = None,
+        style: Style = EMPTY_STYLE,
+    ) -> None:
+        vertices = shape.vertices()
+        ctx.move_to(*vertices[0])
+        for x, y in vertices[1:]:
+            ctx.line_to(x, y)
+        ctx.close_path()
 
     def visit_latex(
         self,
@@ -128,7 +234,7 @@ class ToCairoShape(ShapeVisitor[None]):
         ctx: PyCairoContext = None,
         style: Style = EMPTY_STYLE,
     ) -> None:
-        ctx.select_font_face("sans-serif")
+        ctx.select_font_face(FONT)
         if shape.font_size is not None:
             ctx.set_font_size(shape.font_size)
         extents = ctx.text_extents(shape.text)
@@ -160,50 +266,236 @@ class ToCairoShape(ShapeVisitor[None]):
         ctx: PyCairoContext = None,
         style: Style = EMPTY_STYLE,
     ) -> None:
-        surface = from_pil(shape.im)
+        surface = shape.surface()
         ctx.set_source_surface(
             surface, -(shape.width / 2), -(shape.height / 2)
         )
         ctx.paint()
 
 
+def to_prims(base: Diagram, style: Style) -> List[Any]:
+    "Compiles the diagram to its list of primitives, in painting order."
+    return base._style(style).accept(ToList(), Ident).data
+
+
 def render_cairo_prims(
     base: Diagram, ctx: PyCairoContext, style: Style
 ) -> None:
-    base = base._style(style)
+    draw_prims(to_prims(base, style), ctx)
+
+
+def draw_prims(
+    prims: List[Any], ctx: PyCairoContext, batch: bool = False
+) -> None:
+    if batch:
+        draw_prims_batched(prims, ctx)
+        return
+    shape_renderer = ToCairoShape(prims)
+    for prim in prims:
+        draw_prim(prim, ctx, shape_renderer)
+
+
+def draw_prim(
+    prim: Any, ctx: PyCairoContext, shape_renderer: ToCairoShape
+) -> None:
+    # apply transformation
+    matrix = tx_to_cairo(prim.transform)
+    ctx.transform(matrix)
+    prim.shape.accept(shape_renderer, ctx=ctx, style=prim.style)
+
+    # undo transformation
+    matrix.invert()
+    ctx.transform(matrix)
+    prim.style.render(ctx)
+    ctx.stroke()
+
+
+def device_arc(
+    m: Affine, start: float, end: float, ctx: PyCairoContext
+) -> None:
+    """Adds the arc of the unit circle from angle ``start`` to ``end`` (in
+    radians, in either direction), mapped by ``m``, as Bézier curves in
+    device coordinates. The current point must be the start of the arc.
+    The arc is cut in pieces short enough for the curves to stay within
+    0.1 pixel of it, like Cairo's own arcs."""
+    a, b, c, d, e, f = m[:6]
+    # Upper bound of the radius in pixels. A Bézier curve spanning a
+    # quarter turn of a unit circle is within 2.7e-4 of it, and the error
+    # grows as the sixth power of the angle.
+    radius = math.sqrt(a * a + b * b + d * d + e * e)
+    limit = (
+        math.pi / 2 * min(1.0, (0.1 / (2.7e-4 * radius + 1e-12)) ** (1 / 6))
+    )
+    n = max(1, math.ceil(abs(end - start) / limit))
+    step = (end - start) / n
+    k = 4 / 3 * math.tan(step / 4)
+    x0, y0 = math.cos(start), math.sin(start)
+    for i in range(1, n + 1):
+        x1, y1 = math.cos(start + i * step), math.sin(start + i * step)
+        # Control points along the tangents at both ends.
+        px, py = x0 - k * y0, y0 + k * x0
+        qx, qy = x1 + k * y1, y1 - k * x1
+        ctx.curve_to(
+            a * px + b * py + c,
+            d * px + e * py + f,
+            a * qx + b * qy + c,
+            d * qx + e * qy + f,
+            a * x1 + b * y1 + c,
+            d * x1 + e * y1 + f,
+        )
+        x0, y0 = x1, y1
+
+
+def device_path(path: Path, t: Affine, ctx: PyCairoContext) -> None:
+    "Adds a path to the context in device coordinates."
+    a, b, c, d, e, f = t[:6]
+    for loc_trail in path.loc_trails:
+        x, y = loc_trail.location
+        for i, seg in enumerate(loc_trail.trail.segments):
+            if i == 0:
+                ctx.move_to(a * x + b * y + c, d * x + e * y + f)
+            if isinstance(seg, ArcSegment):
+                m = t * Affine.translation(P2(x, y)) * seg.t
+                end = seg.angle + seg.dangle
+                device_arc(m, to_radians(seg.angle), to_radians(end), ctx)
+            x, y = x + seg.q.x, y + seg.q.y
+            if isinstance(seg, Segment):
+                ctx.line_to(a * x + b * y + c, d * x + e * y + f)
+        if loc_trail.trail.closed:
+            ctx.close_path()
+
+
+def device_polygon(
+    vertices: List[Tuple[float, float]], t: Affine, ctx: PyCairoContext
+) -> None:
+    "Adds a closed polygon to the context in device coordinates."
+    a, b, c, d, e, f = t[:6]
+    for i, (x, y) in enumerate(vertices):
+        x, y = a * x + b * y + c, d * x + e * y + f
+        if i == 0:
+            ctx.move_to(x, y)
+        else:
+            ctx.line_to(x, y)
+    ctx.close_path()
+
+
+def draw_prims_batched(prims: List[Any], ctx: PyCairoContext) -> None:
+    """Draws the primitives with their paths (arcs and circles included)
+    built in device coordinates, stroking runs of consecutive unfilled paths
+    of the same style at once.
+    Filled paths are drawn one by one, as filling them together would
+    change how they overlap."""
     shape_renderer = ToCairoShape()
-    for prim in base.accept(ToList(), Ident):
-        # apply transformation
-        matrix = tx_to_cairo(prim.transform)
-        ctx.transform(matrix)
-        prim.shape.accept(shape_renderer, ctx=ctx, style=prim.style)
-
-        # undo transformation
-        matrix.invert()
-        ctx.transform(matrix)
-        prim.style.render(ctx)
+    pending: Optional[Style] = None
+    for prim in prims:
+        shape, style = prim.shape, prim.style
+        if not isinstance(shape, (Path, Geometric)):
+            if pending is not None:
+                pending.render(ctx)
+                ctx.stroke()
+                pending = None
+            draw_prim(prim, ctx, shape_renderer)
+            continue
+        if isinstance(shape, Path) and not shape.loc_trails[0].trail.closed:
+            style.fill_opacity_ = 0
+        filled = style.fill_color_ is not None and style.fill_opacity_ != 0
+        if pending is not None and (filled or style != pending):
+            pending.render(ctx)
+            ctx.stroke()
+            pending = None
+        if isinstance(shape, Path):
+            device_path(shape, prim.transform, ctx)
+        elif isinstance(shape, (Rect, RegularPolygon)):
+            device_polygon(shape.vertices(), prim.transform, ctx)
+        elif isinstance(shape, Circle):
+            m = prim.transform * Affine.scale(V2(shape.radius, shape.radius))
+            a, _, c, d, _, f = m[:6]
+            ctx.move_to(a + c, d + f)
+            device_arc(m, 0.0, 2 * math.pi, ctx)
+            ctx.close_path()
+        if filled:
+            style.render(ctx)
+            ctx.stroke()
+        else:
+            pending = style
+    if pending is not None:
+        pending.render(ctx)
         ctx.stroke()
 
 
-def render(
-    self: Diagram, path: str, height: int = 128, width: Optional[int] = None
-) -> None:
-    """Render the diagram to a PNG file.
+def render_layer(job: Tuple[List[Any], int, int, int, int, bool]) -> bytes:
+    """Draws primitives on a transparent surface showing the region of the
+    image at ``(x, y)``, and returns its pixels."""
+    import cairo
 
-    Args:
-        self (Diagram): Given ``Diagram`` instance.
-        path (str): Path of the .png file.
-        height (int, optional): Height of the rendered image.
-                                Defaults to 128.
-        width (Optional[int], optional): Width of the rendered image.
-                                         Defaults to None.
-    """
+    prims, x, y, width, height, batch = job
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    ctx = cairo.Context(surface)
+    ctx.translate(-x, -y)
+    draw_prims(prims, ctx, batch)
+    surface.flush()
+    return bytes(surface.get_data())
+
+
+def draw_prims_parallel(
+    prims: List[Primitive],
+    ctx: PyCairoContext,
+    width: int,
+    height: int,
+    workers: int,
+    batch: bool = False,
+) -> None:
+    """Draws horizontal bands of the image in a pool of processes, each with
+    the primitives that overlap it, then copies the bands to the surface.
+    The bands are offset by whole pixels, so the pixels are the same as when
+    drawing the primitives directly."""
     import cairo
 
-    envelope = self.get_envelope()
-    assert envelope is not None
+    from chalk.backend.tiled import prim_bounds
+    from chalk.parallel import pool_map
+
+    # A few bands per worker, to balance the load.
+    size = max(1, -(-height // (4 * workers)))
+    bounds = [prim_bounds(prim) for prim in prims]
+    jobs = []
+    for y in range(0, height, size):
+        h = min(size, height - y)
+        band = [
+            prim
+            for prim, b in zip(prims, bounds)
+            if b is not None and b[1] < y + h and b[3] > y
+        ]
+        jobs.append((band, 0, y, width, h, batch))
+    stride = cairo.ImageSurface.format_stride_for_width(
+        cairo.FORMAT_ARGB32, width
+    )
+    for (_, _, y, _, h, _), data in zip(
+        jobs, pool_map(render_layer, jobs, workers)
+    ):
+        layer = cairo.ImageSurface.create_for_data(
+            bytearray(data), cairo.FORMAT_ARGB32, width, h, stride
+        )
+        ctx.set_source_surface(layer, 0, y)
+        ctx.paint()
 
+
+def layout(
+    self: Diagram,
+    height: int,
+    width: Optional[int] = None,
+    viewport: Optional[BoundingBox] = None,
+) -> Tuple[Diagram, int]:
+    """Fits the diagram, or the viewport if given, to the output frame, in
+    device coordinates. With a viewport, the diagram is culled to it.
+
+    Returns:
+        Tuple[Diagram, int]: The placed diagram and the output width.
+    """
     pad = 0.05
+    if viewport is not None:
+        self = self.with_envelope(frame(viewport))
+    envelope = self.get_envelope()
+    assert envelope is not None
 
     # infer width to preserve aspect ratio
     width = width or int(height * envelope.width / envelope.height)
@@ -214,12 +506,86 @@ def render(
     else:
         α = width / ((1 + pad) * envelope.width)
 
-    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
-    ctx = cairo.Context(surface)
-
     s = self.scale(α).center_xy().pad(1 + pad)
     e = s.get_envelope()
     assert e is not None
     s = s.translate(e(-unit_x), e(-unit_y))
-    render_cairo_prims(s, ctx, Style.root(max(width, height)))
-    surface.write_to_png(path)
+    if viewport is not None:
+        s = s.cull(BoundingBox([P2(0, 0), P2(width, height)]))
+    return s, width
+
+
+def render(
+    self: Diagram,
+    path: str,
+    height: int = 128,
+    width: Optional[int] = None,
+    workers: Optional[int] = None,
+    tile: Optional[int] = None,
+    viewport: Optional[BoundingBox] = None,
+    tolerance: Optional[float] = None,
+    batch: bool = False,
+) -> None:
+    """Render the diagram to a PNG file.
+
+    Args:
+        self (Diagram): Given ``Diagram`` instance.
+        path (str): Path of the .png file.
+        height (int, optional): Height of the rendered image.
+                                Defaults to 128.
+        width (Optional[int], optional): Width of the rendered image.
+                                         Defaults to None.
+        workers (Optional[int], optional): If more than one, horizontal
+            bands of the image are drawn in that many processes. Defaults to
+            None.
+        tile (Optional[int], optional): If given, the image is drawn in
+            square tiles of this size and streamed to the file, so that
+            the whole image is never held in memory (see
+            ``chalk.backend.tiled``). Defaults to None.
+        viewport (Optional[BoundingBox], optional): Region of the diagram
+            to render, in its coordinates. The subdiagrams outside of it are
+            skipped. Defaults to None, the whole diagram.
+        tolerance (Optional[float], optional): If given, the paths are
+            simplified so that they deviate by at most that many pixels
+            (see ``Diagram.simplify``). Defaults to None.
+        batch (bool, optional): If true, the paths are built directly in
+            device coordinates, and runs of unfilled paths of the same style
+            are stroked at once. Defaults to False.
+    """
+    import cairo
+
+    # Compile any deferred LaTeX placeholders in one concurrent batch.
+    resolve_pending()
+
+    if tile is not None:
+        from chalk.backend.tiled import render_tiled
+
+        render_tiled(
+            self,
+            path,
+            height,
+            width,
+            tile,
+            workers,
+            viewport,
+            tolerance,
+            batch,
+        )
+        return
+
+    with stage("layout"):
+        s, width = layout(self, height, width, viewport)
+        if tolerance is not None:
+            s = s.simplify(tolerance)
+
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    ctx = cairo.Context(surface)
+    with stage("traverse"):
+        style = Style.root(max(width, height))
+        if workers is not None and workers > 1:
+            prims = to_prims(s, style)
+            draw_prims_parallel(prims, ctx, width, height, workers, batch)
+        else:
+            draw_prims(to_prims(s, style), ctx, batch)
+    with stage("write"):
+        surface.write_to_png(path)
@@ -0,0 +1,73 @@
+"""
+Incremental PNG encoding.
+
+The encoder consumes the image one band of rows at a time and yields the
+encoded bytes as it goes, so neither the raw pixels nor the compressed file
+have to be held in memory at once.
+"""
+
+from __future__ import annotations
+
+import base64
+import struct
+import zlib
+from typing import Iterable, Iterator
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Flush compressed data in IDAT chunks of roughly this size.
+IDAT_SIZE = 1 << 16
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def iter_png(
+    width: int, height: int, rows: Iterable[bytes], level: int = 6
+) -> Iterator[bytes]:
+    """Encodes an 8-bit RGBA image as PNG.
+
+    Args:
+        width (int): Width of the image in pixels.
+        height (int): Height of the image in pixels.
+        rows (Iterable[bytes]): Bands of RGBA scanlines, from top to bottom.
+            Each element holds one or more complete rows.
+        level (int): zlib compression level.
+
+    Yields:
+        bytes: Consecutive parts of the PNG file.
+    """
+    yield PNG_SIGNATURE
+    # 8 bits per channel, color type 6 (RGBA), no interlacing.
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    yield _chunk(b"IHDR", ihdr)
+
+    stride = 4 * width
+    compressor = zlib.compressobj(level)
+    pending = b""
+    for band in rows:
+        view = memoryview(band)
+        for start in range(0, len(view), stride):
+            # Filter type 0 (none) for every scanline.
+            pending += compressor.compress(b"\x00")
+            pending += compressor.compress(view[start : start + stride])
+        if len(pending) >= IDAT_SIZE:
+            yield _chunk(b"IDAT", pending)
+            pending = b""
+    pending += compressor.flush()
+    yield _chunk(b"IDAT", pending)
+    yield _chunk(b"IEND", b"")
+
+
+def iter_base64(parts: Iterable[bytes]) -> Iterator[str]:
+    "Base64-encodes a stream of bytes without joining it first."
+    rest = b""
+    for part in parts:
+        data = rest + part
+        cut = len(data) - len(data) % 3
+        rest = data[cut:]
+        if cut:
+            yield base64.b64encode(data[:cut]).decode("ascii")
+    if rest:
+        yield base64.b64encode(rest).decode("ascii")
@@ -1,27 +1,40 @@
 from __future__ import annotations
 
+import hashlib
+import io
+import re
+import secrets
 import xml.etree.ElementTree as ET
-from typing import TYPE_CHECKING, Optional
+from typing import IO, TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 import svgwrite
 from svgwrite import Drawing
 from svgwrite.base import BaseElement
-from svgwrite.shapes import Rect
+from svgwrite.shapes import Rect as SVGRect
 
 from chalk import transform as tx
+from chalk.backend.png import iter_base64, iter_png
+from chalk.cull import frame
+from chalk.profile import stage
 from chalk.shapes import (
     ArcSegment,
     ArrowHead,
+    BufferImage,
+    Circle,
+    Geometric,
     Image,
     Latex,
     Path,
+    Rect,
+    RegularPolygon,
     Segment,
     SegmentLike,
     Spacer,
     Text,
 )
+from chalk.shapes.latex import resolve_pending
 from chalk.style import Style
-from chalk.transform import P2, unit_x, unit_y
+from chalk.transform import P2, BoundingBox, unit_x, unit_y
 from chalk.types import Diagram
 from chalk.visitor import DiagramVisitor, ShapeVisitor
 
@@ -32,11 +45,21 @@ if TYPE_CHECKING:
         ApplyTransform,
         Compose,
         Empty,
+        Instanced,
         Primitive,
     )
 
 
 EMPTY_STYLE = Style.empty()
+Ident = tx.Affine.identity()
+TOKEN = re.compile(
+    r"<!--(chalk-fragment-[0-9a-f]{16})-->|(chalk-stream-[0-9a-f]{16})"
+)
+
+
+def placeholder(kind: str) -> str:
+    "A random token, which the user's content cannot contain by accident."
+    return f"chalk-{kind}-{secrets.token_hex(8)}"
 
 
 def tx_to_svg(affine: tx.Affine) -> str:
@@ -48,7 +71,7 @@ def tx_to_svg(affine: tx.Affine) -> str:
     return convert(*affine[:6])
 
 
-class Raw(Rect):  # type: ignore
+class Raw(SVGRect):  # type: ignore
     """Shape class.
 
     A fake SVG node for importing latex.
@@ -62,12 +85,98 @@ class Raw(Rect):  # type: ignore
         return self.xml
 
 
+class Fragment(SVGRect):  # type: ignore
+    """Shape class.
+
+    A placeholder for a subdiagram rendered in another process.
+    """
+
+    def __init__(self, token: str):
+        self.token = token
+
+    def get_xml(self) -> ET.Element:
+        return ET.Comment(self.token)  # type: ignore
+
+
+class StreamingFile:
+    """File wrapper that replaces placeholder tokens in the written text
+    with the output of their streams. This allows embedding large data
+    (such as images) in the document without building it in memory.
+    Fragment placeholders are replaced by the XML rendered for them, and
+    unknown tokens are kept."""
+
+    def __init__(
+        self,
+        fileobj: IO[str],
+        streams: Dict[str, BufferImage],
+        fragments: Optional[Dict[str, str]] = None,
+    ):
+        self.fileobj = fileobj
+        self.streams = streams
+        self.fragments = fragments if fragments is not None else {}
+
+    def write(self, text: str) -> None:
+        pos = 0
+        for match in TOKEN.finditer(text):
+            self.fileobj.write(text[pos : match.start()])
+            pos = match.end()
+            fragment, stream = match.groups()
+            if fragment in self.fragments:
+                self.fileobj.write(self.fragments[fragment])
+                continue
+            if stream not in self.streams:
+                self.fileobj.write(match.group())
+                continue
+            shape = self.streams[stream]
+            png = iter_png(shape.width, shape.height, shape.rgba_rows())
+            for data in iter_base64(png):
+                self.fileobj.write(data)
+        self.fileobj.write(text[pos:])
+
+
 class ToSVG(DiagramVisitor[BaseElement, Style]):
+    """Converts a diagram to SVG elements.
+
+    The subdiagrams in ``deferred`` (given by id) are not converted: a
+    ``Fragment`` placeholder is emitted instead, and the subdiagram and
+    its inherited style are recorded in ``jobs``, and the token of the
+    placeholder in ``tokens``.
+
+    With ``merge``, composed diagrams are flattened, and each run of
+    consecutive unfilled paths with the same style is emitted as a single
+    ``<path>``, with its geometry transformed to the coordinates of the
+    composition.
+
+    The copies of an ``Instanced`` diagram are ``<use>`` references to an
+    element in the ``<defs>`` of the drawing, added once. The ids are
+    derived from the content of the referenced element, so that they are
+    the same in every document.
+    """
+
     A_type = BaseElement
 
-    def __init__(self, dwg: Drawing):
+    def __init__(
+        self,
+        dwg: Drawing,
+        streams: Optional[Dict[str, BufferImage]] = None,
+        deferred: Optional[Set[int]] = None,
+        merge: bool = False,
+    ):
         self.dwg = dwg
-        self.shape_renderer = ToSVGShape(dwg)
+        self.shape_renderer = ToSVGShape(dwg, streams)
+        self.deferred = deferred if deferred is not None else set()
+        self.merge = merge
+        self.jobs: List[Tuple[Diagram, Style]] = []
+        self.tokens: List[str] = []
+        # Ids of the elements that copies can refer to.
+        self.defined: Set[str] = set()
+
+    def render(self, diagram: Diagram, style: Style) -> BaseElement:
+        if id(diagram) not in self.deferred:
+            return diagram.accept(self, style)
+        self.jobs.append((diagram, style))
+        self.tokens.append(placeholder("fragment"))
+        return Fragment(self.tokens[-1])
 
     def visit_primitive(
         self, diagram: Primitive, style: Style = EMPTY_STYLE
@@ -93,35 +202,133 @@ class ToSVG(DiagramVisitor[BaseElement, Style]):
     def visit_compose(
         self, diagram: Compose, style: Style = EMPTY_STYLE
     ) -> BaseElement:
+        if self.merge:
+            return self.merged(diagram, style)
         g = self.dwg.g()
 
         for d in diagram.diagrams:
-            g.add(d.accept(self, style))
+            g.add(self.render(d, style))
+        return g
+
+    def merged(self, diagram: Compose, style: Style) -> BaseElement:
+        from chalk.core import (
+            ApplyName,
+            ApplyStyle,
+            ApplyTransform,
+            Compose,
+            Empty,
+            Primitive,
+        )
+
+        g = self.dwg.g()
+        # Style and closedness of the path being extended.
+        current: Optional[Tuple[Style, bool]] = None
+        line = None
+        # Pending subdiagrams, in reverse painting order.
+        stack: List[Tuple[Diagram, tx.Affine, Style]] = [
+            (d, Ident, style) for d in reversed(diagram.diagrams)
+        ]
+        while stack:
+            d, t, st = stack.pop()
+            if id(d) in self.deferred:
+                pass
+            elif isinstance(d, Compose):
+                stack.extend((c, t, st) for c in reversed(d.diagrams))
+                continue
+            elif isinstance(d, ApplyTransform):
+                stack.append((d.diagram, t * d.transform, st))
+                continue
+            elif isinstance(d, ApplyStyle):
+                stack.append((d.diagram, t, d.style.merge(st)))
+                continue
+            elif isinstance(d, ApplyName):
+                stack.append((d.diagram, t, st))
+                continue
+            elif isinstance(d, Empty) or (
+                isinstance(d, Primitive) and isinstance(d.shape, Spacer)
+            ):
+                # Draws nothing, so doesn't break the run.
+                continue
+            elif isinstance(d, Primitive) and isinstance(
+                d.shape, (Path, Geometric)
+            ):
+                shape = d.shape
+                if isinstance(shape, Geometric):
+                    shape = shape.to_path()
+                style_new = d.style.merge(st)
+                closed = shape.loc_trails[0].trail.closed
+                # Filling paths together would change how they overlap.
+                if not closed or style_new.fill_opacity_ == 0:
+                    if line is None or current != (style_new, closed):
+                        current = (style_new, closed)
+                        line = self.dwg.path(
+                            style="vector-effect: non-scaling-stroke;"
+                            + ("" if closed else "fill:none;")
+                        )
+                        g.add(self.dwg.g(style=style_new.to_svg() or ";"))
+                        g.elements[-1].add(line)
+                    path = shape.apply_transform(t * d.transform)
+                    line.push(*self.shape_renderer.path_commands(path))
+                    continue
+            line = None
+            inner = self.render(d, st)
+            if t != Ident:
+                wrapper = self.dwg.g(transform=tx_to_svg(t))
+                wrapper.add(inner)
+                inner = wrapper
+            g.add(inner)
         return g
 
     def visit_apply_transform(
         self, diagram: ApplyTransform, style: Style = EMPTY_STYLE
     ) -> BaseElement:
         g = self.dwg.g(transform=tx_to_svg(diagram.transform))
-        g.add(diagram.diagram.accept(self, style))
+        g.add(self.render(diagram.diagram, style))
         return g
 
     def visit_apply_style(
         self, diagram: ApplyStyle, style: Style = EMPTY_STYLE
     ) -> BaseElement:
-        return diagram.diagram.accept(self, diagram.style.merge(style))
+        return self.render(diagram.diagram, diagram.style.merge(style))
 
     def visit_apply_name(
         self, diagram: ApplyName, style: Style = EMPTY_STYLE
     ) -> BaseElement:
         g = self.dwg.g()
-        g.add(diagram.diagram.accept(self, style))
+        g.add(self.render(diagram.diagram, style))
+        return g
+
+    def visit_instanced(
+        self, diagram: Instanced, style: Style = EMPTY_STYLE
+    ) -> BaseElement:
+        from chalk.cache import hash_style, structural_hash
+
+        g = self.dwg.g()
+        digest = structural_hash(diagram.diagram) + bytes([self.merge])
+        keys: Dict[int, Tuple[str, Style]] = {}
+        for i, t in enumerate(diagram.transforms):
+            override = None if diagram.styles is None else diagram.styles[i]
+            if id(override) not in keys:
+                st = style if override is None else override.merge(style)
+                h = hashlib.blake2b(digest + hash_style(st), digest_size=8)
+                keys[id(override)] = ("chalk-" + h.hexdigest(), st)
+            key, st = keys[id(override)]
+            if key not in self.defined:
+                self.defined.add(key)
+                inner = self.dwg.g(id=key)
+                inner.add(self.render(diagram.diagram, st))
+                self.dwg.defs.add(inner)
+            g.add(self.dwg.use(href="#" + key, transform=tx_to_svg(t)))
         return g
 
 
 class ToSVGShape(ShapeVisitor[BaseElement]):
-    def __init__(self, dwg: Drawing):
+    def __init__(
+        self, dwg: Drawing, streams: Optional[Dict[str, BufferImage]] = None
+    ):
         self.dwg = dwg
+        # Images that are streamed into the document when it is written.
+        self.streams = streams if streams is not None else {}
 
     def render_segment(self, seg: SegmentLike, p: P2) -> str:
         q = seg.q + p
@@ -143,14 +350,43 @@ class ToSVGShape(ShapeVisitor[BaseElement]):
         line = self.dwg.path(
             style="vector-effect: non-scaling-stroke;" + extra_style,
         )
+        line.push(*self.path_commands(path))
+        return line
+
+    def path_commands(self, path: Path) -> List[str]:
+        commands = []
         for loc_trail in path.loc_trails:
             p = loc_trail.location
-            line.push(f"M {p.x} {p.y}")
+            commands.append(f"M {p.x} {p.y}")
             for i, (seg, p) in enumerate(loc_trail.located_segments()):
-                line.push(self.render_segment(seg, p))
+                commands.append(self.render_segment(seg, p))
             if loc_trail.trail.closed:
-                line.push("Z")
-        return line
+                commands.append("Z")
+        return commands
+
+    def visit_circle(
+        self, shape: Circle, style: Style = EMPTY_STYLE
+    ) -> BaseElement:
+        return self.dwg.circle(
+            r=abs(shape.radius), style="vector-effect: non-scaling-stroke;"
+        )
+
+    def visit_rect(
+        self, shape: Rect, style: Style = EMPTY_STYLE
+    ) -> BaseElement:
+        w, h = abs(shape.width), abs(shape.height)
+        return self.dwg.rect(
+            insert=(-w / 2, -h / 2),
+            size=(w, h),
+            style="vector-effect: non-scaling-stroke;",
+        )
+
+    def visit_regular_polygon(
+        self, shape: RegularPolygon, style: Style = EMPTY_STYLE
+    ) -> BaseElement:
+        return self.dwg.polygon(
+            shape.vertices(), style="vector-effect: non-scaling-stroke;"
+        )
 
     def visit_latex(
         self, shape: Latex, style: Style = EMPTY_STYLE
@@ -163,12 +399,14 @@ class ToSVGShape(ShapeVisitor[BaseElement]):
     def visit_text(
         self, shape: Text, style: Style = EMPTY_STYLE
     ) -> BaseElement:
-        dx = -(shape.get_bounding_box().width / 2)
+        # Centered horizontally by `text-anchor`, like its box. (Shifting
+        # by half the width of the box again would move measured text off
+        # center; an unmeasured text has a box of width 1e-4.) The weight
+        # is regular, as measured by the text metrics and drawn by Cairo.
         return self.dwg.text(
             shape.text,
-            transform=f"translate({dx}, 0)",
             style=f"""text-align:center; text-anchor:middle; dominant-baseline:middle;
-                      font-family:sans-serif; font-weight: bold;
+                      font-family:sans-serif;
                       font-size:{shape.font_size}px;
                       vector-effect: non-scaling-stroke;""",
         )
@@ -185,20 +423,119 @@ class ToSVGShape(ShapeVisitor[BaseElement]):
     ) -> BaseElement:
         assert style.output_size
         scale = 0.01 * (15 / 500) * style.output_size
-        return to_svg(shape.arrow_shape.scale(scale), self.dwg, style)
+        return to_svg(
+            shape.arrow_shape.scale(scale), self.dwg, style, self.streams
+        )
 
     def visit_image(
         self, shape: Image, style: Style = EMPTY_STYLE
     ) -> BaseElement:
         dx = -shape.width / 2
         dy = -shape.height / 2
-        return self.dwg.image(
-            href=shape.url_path, transform=f"translate({dx}, {dy})"
-        )
+        href = shape.url_path
+        if isinstance(shape, BufferImage):
+            token = placeholder("stream")
+            self.streams[token] = shape
+            href = "data:image/png;base64," + token
+        return self.dwg.image(href=href, transform=f"translate({dx}, {dy})")
 
 
-def to_svg(self: Diagram, dwg: Drawing, style: Style) -> BaseElement:
-    return self.accept(ToSVG(dwg), style)
+def to_svg(
+    self: Diagram,
+    dwg: Drawing,
+    style: Style,
+    streams: Optional[Dict[str, BufferImage]] = None,
+    merge: bool = False,
+) -> BaseElement:
+    return self.accept(ToSVG(dwg, streams, merge=merge), style)
+
+
+def split(diagram: Diagram, count: int) -> List[Diagram]:
+    """Cuts the top of the diagram tree, going down level by level until
+    there are at least ``count`` subdiagrams below the cut (or only
+    leaves). Shared subdiagrams appear once per reference."""
+    from chalk.core import ApplyName, ApplyStyle, ApplyTransform, Compose
+
+    frontier = [diagram]
+    deeper = True
+    while deeper and len(frontier) < count:
+        below: List[Diagram] = []
+        deeper = False
+        for d in frontier:
+            if isinstance(d, Compose):
+                below.extend(d.diagrams)
+                deeper = True
+            elif isinstance(d, (ApplyTransform, ApplyStyle, ApplyName)):
+                below.append(d.diagram)
+                deeper = True
+            else:
+                below.append(d)
+        frontier = below
+    return frontier
+
+
+def render_fragments(
+    chunk: Tuple[List[Tuple[Diagram, Style]], bool],
+) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Converts subdiagrams to XML, with their images embedded. Also returns
+    the id and XML of the definitions that their copies refer to."""
+    jobs, merge = chunk
+    dwg = svgwrite.Drawing()
+    streams: Dict[str, BufferImage] = {}
+    visitor = ToSVG(dwg, streams, merge=merge)
+
+    def to_xml(element: BaseElement) -> str:
+        xml = ET.tostring(element.get_xml(), encoding="unicode")
+        f = io.StringIO()
+        StreamingFile(f, streams).write(xml)
+        return f.getvalue()
+
+    out = [to_xml(diagram.accept(visitor, style)) for diagram, style in jobs]
+    definitions = [(d["id"], to_xml(d)) for d in dwg.defs.elements]
+    return out, definitions
+
+
+def to_svg_parallel(
+    self: Diagram,
+    dwg: Drawing,
+    style: Style,
+    workers: int,
+    merge: bool = False,
+) -> Tuple[BaseElement, Dict[str, BufferImage], Dict[str, str]]:
+    """Converts the diagram to SVG, converting the subdiagrams near the top
+    of the tree in a pool of processes.
+
+    The definitions of the copies are added to the ``<defs>`` of the
+    drawing, in order, skipping the ids that an earlier subdiagram already
+    defined.
+
+    Returns:
+        The root element, the images to stream and the XML of the fragment
+        placeholders.
+    """
+    from chalk.parallel import pool_map
+
+    streams: Dict[str, BufferImage] = {}
+    deferred = {id(d) for d in split(self, 4 * workers)}
+    visitor = ToSVG(dwg, streams, deferred, merge)
+    root = visitor.render(self, style)
+    # Contiguous chunks, a few per worker to balance the load.
+    jobs = visitor.jobs
+    size = max(1, -(-len(jobs) // (4 * workers)))
+    chunks = [(jobs[i : i + size], merge) for i in range(0, len(jobs), size)]
+    fragments: Dict[str, str] = {}
+    tokens = iter(visitor.tokens)
+    for xmls, definitions in pool_map(render_fragments, chunks, workers):
+        for xml in xmls:
+            fragments[next(tokens)] = xml
+        for key, xml in definitions:
+            if key in visitor.defined:
+                continue
+            visitor.defined.add(key)
+            token = placeholder("fragment")
+            dwg.defs.add(Fragment(token))
+            fragments[token] = xml
+    return root, streams, fragments
 
 
 def render(
@@ -207,6 +544,10 @@ def render(
     height: int = 128,
     width: Optional[int] = None,
     draw_height: Optional[int] = None,
+    workers: Optional[int] = None,
+    viewport: Optional[BoundingBox] = None,
+    tolerance: Optional[float] = None,
+    merge: bool = False,
 ) -> None:
     """Render the diagram to an SVG file.
 
@@ -219,20 +560,47 @@ def render(
                                          Defaults to None.
         draw_height (Optional[int], optional): Override the height for
                                                line width.
+        workers (Optional[int], optional): If more than one, the largest
+            subdiagrams are converted in that many processes. The output
+            is the same as the sequential one. Defaults to None.
+        viewport (Optional[BoundingBox], optional): Region of the diagram
+            to render, in its coordinates. The subdiagrams outside of it are
+            skipped. Defaults to None, the whole diagram.
+        tolerance (Optional[float], optional): If given, the paths are
+            simplified so that they deviate by at most that many pixels
+            (see ``Diagram.simplify``). Defaults to None.
+        merge (bool, optional): If true, runs of consecutive unfilled paths
+            with the same style are merged into single ``<path>`` elements.
+            Defaults to False.
 
     """
-    pad = 0.05
-    envelope = self.get_envelope()
+    # Compile any deferred LaTeX placeholders in one concurrent batch.
+    resolve_pending()
 
-    # infer width to preserve aspect ratio
-    assert envelope is not None
-    width = width or int(height * envelope.width / envelope.height)
+    pad = 0.05
+    with stage("layout"):
+        if viewport is not None:
+            self = self.with_envelope(frame(viewport))
+        envelope = self.get_envelope()
+
+        # infer width to preserve aspect ratio
+        assert envelope is not None
+        width = width or int(height * envelope.width / envelope.height)
+
+        # determine scale to fit the largest axis in the target frame size
+        if envelope.width - width <= envelope.height - height:
+            α = height / ((1 + pad) * envelope.height)
+        else:
+            α = width / ((1 + pad) * envelope.width)
 
-    # determine scale to fit the largest axis in the target frame size
-    if envelope.width - width <= envelope.height - height:
-        α = height / ((1 + pad) * envelope.height)
-    else:
-        α = width / ((1 + pad) * envelope.width)
+        s = self.center_xy().pad(1 + pad).scale(α)
+        e = s.get_envelope()
+        assert e is not None
+        s = s.translate(e(-unit_x), e(-unit_y))
+        if viewport is not None:
+            s = s.cull(BoundingBox([P2(0, 0), P2(width, height)]))
+        if tolerance is not None:
+            s = s.simplify(tolerance)
 
     dwg = svgwrite.Drawing(path, size=(width, height))
 
@@ -245,12 +613,22 @@ def render(
     dwg.defs.add(marker)
 
     dwg.add(outer)
-    s = self.center_xy().pad(1 + pad).scale(α)
-    e = s.get_envelope()
-    assert e is not None
-    s = s.translate(e(-unit_x), e(-unit_y))
     if draw_height is None:
         draw_height = max(height, width)
     style = Style.root(output_size=draw_height)
-    outer.add(to_svg(s, dwg, style))
-    dwg.save()
+    streams: Dict[str, BufferImage] = {}
+    fragments: Dict[str, str] = {}
+    with stage("traverse"):
+        if workers is not None and workers > 1:
+            root, streams, fragments = to_svg_parallel(
+                s, dwg, style, workers, merge
+            )
+            outer.add(root)
+        else:
+            outer.add(to_svg(s, dwg, style, streams, merge))
+    with stage("write"):
+        if not streams and not fragments:
+            dwg.save()
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            dwg.write(StreamingFile(f, streams, fragments))
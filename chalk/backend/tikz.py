@@ -1,27 +1,33 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, List
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
 
 from chalk import transform as tx
+from chalk.cull import frame
 from chalk.monoid import MList
+from chalk.profile import stage
 from chalk.shapes import (
     ArcSegment,
     ArrowHead,
+    Circle,
     Image,
     Latex,
     Path,
+    Rect,
+    RegularPolygon,
     Segment,
     SegmentLike,
     Spacer,
     Text,
 )
+from chalk.shapes.latex import resolve_pending
 from chalk.style import Style
-from chalk.transform import P2, origin
+from chalk.transform import P2, BoundingBox, origin
 from chalk.types import Diagram
 from chalk.visitor import DiagramVisitor, ShapeVisitor
 
 if TYPE_CHECKING:
-    from chalk.core import ApplyStyle, ApplyTransform, Primitive
+    from chalk.core import ApplyStyle, ApplyTransform, Instanced, Primitive
 
 
 PyLatex = Any
@@ -77,6 +83,41 @@ class ToTikZ(DiagramVisitor[MList[PyLatexElement], Style]):
         style_new = diagram.style.merge(style)
         return diagram.diagram.accept(self, style_new)
 
+    def visit_instanced(
+        self, diagram: Instanced, style: Style = EMPTY_STYLE
+    ) -> MList[PyLatexElement]:
+        from chalk.cache import hash_style
+
+        # The diagram is drawn once per run of copies with the same style,
+        # in the body of a loop over their transforms.
+        runs: List[Tuple[bytes, Style, List[str]]] = []
+        for i, t in enumerate(diagram.transforms):
+            st = style
+            if diagram.styles is not None:
+                st = diagram.styles[i].merge(style)
+            key = hash_style(st)
+            if not runs or runs[-1][0] != key:
+                runs.append((key, st, []))
+            a, b, c, d, e, f = t[:6]
+            runs[-1][2].append(f"{a}/{d}/{b}/{e}/{c}/{f}")
+        loops = []
+        for _, st, values in runs:
+            body = self.pylatex.utils.dumps_list(
+                diagram.diagram.accept(self, st).data, escape=False
+            )
+            loops.append(
+                self.pylatex.NoEscape(
+                    "\\foreach \\ta/\\tb/\\tc/\\td/\\te/\\tf in "
+                    f"{{{', '.join(values)}}} {{\n"
+                    "\\begin{scope}[cm={\\ta, \\tb, \\tc, \\td, "
+                    "(\\te, \\tf)}]\n"
+                    f"{body}\n"
+                    "\\end{scope}\n"
+                    "}"
+                )
+            )
+        return MList(loops)
+
 
 class ToTikZShape(ShapeVisitor[PyLatexElement]):
     def __init__(self, pylatex: PyLatex):
@@ -126,6 +167,47 @@ class ToTikZShape(ShapeVisitor[PyLatexElement]):
             options=self.pylatex.TikZOptions(**style.to_tikz(self.pylatex)),
         )
 
+    def visit_circle(
+        self, shape: Circle, style: Style = EMPTY_STYLE
+    ) -> PyLatexElement:
+        pts = self.pylatex.TikZPathList()
+        pts.append(self.pylatex.TikZCoordinate(0, 0))
+        pts._arg_list.append(
+            self.pylatex.TikZUserPath(f"circle [radius={abs(shape.radius)}]")
+        )
+        return self.pylatex.TikZDraw(
+            pts,
+            options=self.pylatex.TikZOptions(**style.to_tikz(self.pylatex)),
+        )
+
+    def visit_rect(
+        self, shape: Rect, style: Style = EMPTY_STYLE
+    ) -> PyLatexElement:
+        w, h = shape.width / 2, shape.height / 2
+        return self.pylatex.TikZDraw(
+            [
+                self.pylatex.TikZCoordinate(-w, -h),
+                "rectangle",
+                self.pylatex.TikZCoordinate(w, h),
+            ],
+            options=self.pylatex.TikZOptions(**style.to_tikz(self.pylatex)),
+        )
+
+    def visit_regular_polygon(
+        self, shape: RegularPolygon, style: Style = EMPTY_STYLE
+    ) -> PyLatexElement:
+        pts = self.pylatex.TikZPathList()
+        for i, (x, y) in enumerate(shape.vertices()):
+            if i > 0:
+                pts.append("--")
+            pts.append(self.pylatex.TikZCoordinate(x, y))
+        pts.append("--")
+        pts._arg_list.append(self.pylatex.TikZUserPath("cycle"))
+        return self.pylatex.TikZDraw(
+            pts,
+            options=self.pylatex.TikZOptions(**style.to_tikz(self.pylatex)),
+        )
+
     def visit_latex(
         self, shape: Latex, style: Style = EMPTY_STYLE
     ) -> PyLatexElement:
@@ -188,7 +270,23 @@ def to_tikz(
     return self.accept(ToTikZ(pylatex), style).data
 
 
-def render(self: Diagram, path: str, height: int = 128) -> None:
+def render(
+    self: Diagram,
+    path: str,
+    height: int = 128,
+    viewport: Optional[BoundingBox] = None,
+) -> None:
+    """Render the diagram to a PDF file, through TikZ.
+
+    Args:
+        self (Diagram): Given ``Diagram`` instance.
+        path (str): Path of the .pdf file.
+        height (int, optional): Height of the rendered image.
+                                Defaults to 128.
+        viewport (Optional[BoundingBox], optional): Region of the diagram
+            to render, in its coordinates. The subdiagrams outside of it are
+            skipped. Defaults to None, the whole diagram.
+    """
     # Hack: Convert roughly from px to pt. Assume 300 dpi.
     heightpt = height / 4.3
     try:
@@ -196,35 +294,62 @@ def render(self: Diagram, path: str, height: int = 128) -> None:
     except ImportError:
         print("Render PDF requires pylatex installation.")
         return
+    # Compile any deferred LaTeX placeholders in one concurrent batch.
+    resolve_pending()
 
     pad = 0.05
-    envelope = self.get_envelope()
-    assert envelope is not None
-
-    # infer width to preserve aspect ratio
-    width = heightpt * (envelope.width / envelope.height)
-    # determine scale to fit the largest axis in the target frame size
-    if envelope.width - width <= envelope.height - heightpt:
-        α = heightpt / ((1 + pad) * envelope.height)
-    else:
-        α = width / ((1 + pad) * envelope.width)
-    x, _ = pad * heightpt, pad * width
+    with stage("layout"):
+        if viewport is not None:
+            self = self.with_envelope(frame(viewport))
+        envelope = self.get_envelope()
+        assert envelope is not None
+
+        # infer width to preserve aspect ratio
+        width = heightpt * (envelope.width / envelope.height)
+        # determine scale to fit the largest axis in the target frame size
+        if envelope.width - width <= envelope.height - heightpt:
+            α = heightpt / ((1 + pad) * envelope.height)
+        else:
+            α = width / ((1 + pad) * envelope.width)
+        x, _ = pad * heightpt, pad * width
+
+        diagram = self.scale(α).reflect_y().pad(1 + pad)
+        envelope = diagram.get_envelope()
+        assert envelope is not None
+        from chalk.core import Primitive
+
+        padding = Primitive.from_shape(
+            Spacer(envelope.width, envelope.height)
+        ).translate(envelope.center.x, envelope.center.y)
+        if viewport is not None:
+            x0, y0, x1, y1 = envelope.bounds
+            diagram = diagram.cull(BoundingBox([P2(x0, y0), P2(x1, y1)]))
+        diagram = diagram + padding
 
     # create document
     doc = pylatex.Document(documentclass="standalone")
     # document_options= pylatex.TikZOptions(margin=f"{{{x}pt {x}pt {y}pt {y}pt}}"))
     # add our sample drawings
-    diagram = self.scale(α).reflect_y().pad(1 + pad)
-    envelope = diagram.get_envelope()
-    assert envelope is not None
-    from chalk.core import Primitive
-
-    padding = Primitive.from_shape(
-        Spacer(envelope.width, envelope.height)
-    ).translate(envelope.center.x, envelope.center.y)
-    diagram = diagram + padding
-    with doc.create(pylatex.TikZ()) as pic:
-        for x in to_tikz(diagram, pylatex, Style.root(max(height, width))):
-            pic.append(x)
-    doc.generate_tex(path.replace(".pdf", "") + ".tex")
-    doc.generate_pdf(path.replace(".pdf", ""), clean_tex=False)
+    with stage("traverse"):
+        with doc.create(pylatex.TikZ()) as pic:
+            if viewport is not None:
+                # Crops the subdiagrams crossing the border of the page.
+                pic.append(
+                    pylatex.TikZPath(
+                        [
+                            pylatex.TikZCoordinate(x0, y0),
+                            "rectangle",
+                            pylatex.TikZCoordinate(x1, y1),
+                        ],
+                        options=pylatex.TikZOptions(
+                            "use as bounding box", "clip"
+                        ),
+                    )
+                )
+            for x in to_tikz(
+                diagram, pylatex, Style.root(max(height, width))
+            ):
+                pic.append(x)
+    with stage("write"):
+        doc.generate_tex(path.replace(".pdf", "") + ".tex")
+        doc.generate_pdf(path.replace(".pdf", ""), clean_tex=False)
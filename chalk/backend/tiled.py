@@ -0,0 +1,155 @@
+"""
+Tiled rendering of very large PNG images.
+
+The output is cut in square tiles. Each primitive is assigned to the tiles
+that its bounds overlap, and each tile only draws its own primitives, in
+painting order. The tiles are drawn one band (a row of tiles) at a time
+and the band is encoded right away, so the memory used is proportional to
+``width × tile`` instead of ``width × height``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import PIL.Image
+
+from chalk.backend.cairo import layout, render_layer, to_prims
+from chalk.backend.png import iter_png
+from chalk.envelope import Envelope
+from chalk.profile import stage
+from chalk.shapes import ArrowHead, Text
+from chalk.shapes.image import from_argb32
+from chalk.shapes.latex import resolve_pending
+from chalk.shapes.text import DEFAULT_FONT_SIZE
+from chalk.style import Style
+from chalk.transform import P2, BoundingBox
+from chalk.types import Diagram
+
+Bounds = Tuple[float, float, float, float]
+
+
+def prim_bounds(prim: Any) -> Optional[Bounds]:
+    """Bounds of what the Cairo backend draws for a compiled primitive, in
+    device coordinates, or ``None`` if it draws nothing."""
+    shape = prim.shape
+    if isinstance(shape, ArrowHead):
+        # Arrow heads are sized at render time.
+        scale = 0.01 * (15 / 500) * prim.style.output_size
+        arrow = shape.arrow_shape.scale(scale).apply_transform(prim.transform)
+        envelope = arrow.get_envelope()
+    elif isinstance(shape, Text):
+        # Cairo lays out the text with its own font: overestimate it.
+        size = shape.font_size or DEFAULT_FONT_SIZE
+        w, h = len(shape.text) * size, 2 * size
+        box = BoundingBox([P2(-w / 2, -h / 2), P2(w / 2, h / 2)])
+        envelope = Envelope.from_bounding_box(box).apply_transform(
+            prim.transform
+        )
+    else:
+        envelope = prim.get_envelope()
+    if envelope.is_empty:
+        return None
+    # Miter joins reach up to 5 line widths out (Cairo's miter limit is
+    # 10), and antialiasing one more pixel.
+    m = 5 * prim.style.cairo_line_width() + 1
+    x0, y0, x1, y1 = envelope.bounds
+    return (x0 - m, y0 - m, x1 + m, y1 + m)
+
+
+def render_tile(job: Tuple[List[Any], int, int, int, int, bool]) -> bytes:
+    "Draws primitives on one tile and returns its RGBA pixels."
+    import cairo
+
+    _, _, _, width, height, _ = job
+    stride = cairo.ImageSurface.format_stride_for_width(
+        cairo.FORMAT_ARGB32, width
+    )
+    return from_argb32(render_layer(job), (width, height), stride).tobytes()
+
+
+def render_tiled(
+    self: Diagram,
+    path: str,
+    height: int = 128,
+    width: Optional[int] = None,
+    tile: int = 512,
+    workers: Optional[int] = None,
+    viewport: Optional[BoundingBox] = None,
+    tolerance: Optional[float] = None,
+    batch: bool = False,
+) -> None:
+    """Render the diagram to a PNG file, tile by tile.
+
+    Args:
+        self (Diagram): Given ``Diagram`` instance.
+        path (str): Path of the .png file.
+        height (int, optional): Height of the rendered image.
+                                Defaults to 128.
+        width (Optional[int], optional): Width of the rendered image.
+                                         Defaults to None.
+        tile (int, optional): Size of the tiles in pixels. Defaults to 512.
+        workers (Optional[int], optional): If more than one, the tiles of
+            a band are drawn in that many processes. Defaults to None.
+        viewport (Optional[BoundingBox], optional): Region of the diagram
+            to render, in its coordinates. Defaults to None, the whole
+            diagram.
+        tolerance (Optional[float], optional): If given, the paths are
+            simplified so that they deviate by at most that many pixels.
+            Defaults to None.
+        batch (bool, optional): If true, the paths are built in device
+            coordinates and stroked in batches. Defaults to False.
+    """
+    from chalk.parallel import task_pool
+
+    # Compile any deferred LaTeX placeholders in one concurrent batch.
+    resolve_pending()
+
+    with stage("layout"):
+        s, width = layout(self, height, width, viewport)
+        if tolerance is not None:
+            s = s.simplify(tolerance)
+        prims = to_prims(s, Style.root(max(width, height)))
+        cols = -(-width // tile)
+        rows = -(-height // tile)
+        tiles: List[List[Any]] = [[] for _ in range(rows * cols)]
+        for prim in prims:
+            bounds = prim_bounds(prim)
+            if bounds is None:
+                continue
+            x0, y0, x1, y1 = bounds
+            c0, c1 = max(0, int(x0 // tile)), min(cols - 1, int(x1 // tile))
+            r0, r1 = max(0, int(y0 // tile)), min(rows - 1, int(y1 // tile))
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    tiles[r * cols + c].append(prim)
+
+    jobs = [
+        (
+            tiles[r * cols + c],
+            c * tile,
+            r * tile,
+            min(tile, width - c * tile),
+            min(tile, height - r * tile),
+            batch,
+        )
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+    def bands(run: Callable[[Iterable[int]], List[bytes]]) -> Iterator[bytes]:
+        for r in range(rows):
+            h = min(tile, height - r * tile)
+            band = PIL.Image.new("RGBA", (width, h))
+            indices = range(r * cols, (r + 1) * cols)
+            for i, data in zip(indices, run(indices)):
+                _, x, _, w, _, _ = jobs[i]
+                band.paste(PIL.Image.frombytes("RGBA", (w, h), data), (x, 0))
+            yield band.tobytes()
+
+    # One pool draws the tiles of all the bands.
+    with stage("traverse"), task_pool(
+        render_tile, jobs, workers or 1
+    ) as run, open(path, "wb") as f:
+        for part in iter_png(width, height, bands(run)):
+            f.write(part)
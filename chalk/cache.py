@@ -0,0 +1,332 @@
+"""
+Structural hashing of diagrams and a content-addressed render cache.
+
+The hash of a diagram covers everything that the backends draw: the tree
+structure, the shapes, styles, transforms and names. It is memoized on
+every node, so re-hashing a diagram that shares subtrees with an already
+hashed one only visits the new nodes. Subtrees that contain images are
+hashed again every time, since the pixels can change under them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+from collections import OrderedDict
+from dataclasses import fields
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Tuple
+
+from chalk.backend import BACKENDS, renderer
+from chalk.shapes import (
+    ArcSegment,
+    ArrowHead,
+    BufferImage,
+    Circle,
+    Image,
+    Latex,
+    Path,
+    Rect,
+    RegularPolygon,
+    Spacer,
+    Text,
+)
+from chalk.style import Style
+from chalk.subdiagram import Name
+from chalk.transform import Affine, unit_x, unit_y
+from chalk.types import Diagram
+from chalk.visitor import DiagramVisitor, ShapeVisitor
+
+if TYPE_CHECKING:
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Compose,
+        Empty,
+        Instanced,
+        Primitive,
+    )
+
+Digest = bytes
+# A digest, and whether it depends on images.
+Hashed = Tuple[Digest, bool]
+
+
+def _h(*parts: Any) -> Digest:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, bytes):
+            h.update(part)
+        else:
+            h.update(repr(part).encode())
+        h.update(b"\x00")
+    return h.digest()
+
+
+def _floats(*xs: float) -> bytes:
+    return struct.pack(f"<{len(xs)}d", *xs)
+
+
+def hash_affine(t: Affine) -> bytes:
+    return _floats(*t[:6])
+
+
+def hash_style(style: Style) -> Digest:
+    parts: List[Any] = []
+    for dim in fields(style):
+        value = getattr(style, dim.name)
+        if value is None:
+            parts.append(b"")
+        elif dim.name.endswith("color_"):
+            parts.append(_floats(*value.rgb))
+        elif dim.name == "line_width_":
+            parts.append((value[0].name, value[1]))
+        else:
+            parts.append(value)
+    return _h(*parts)
+
+
+class ShapeHash(ShapeVisitor[Any]):
+    def visit_path(self, shape: Path) -> Digest:
+        parts: List[Any] = [b"path"]
+        for loc_trail in shape.loc_trails:
+            parts.append(_floats(*loc_trail.location))
+            parts.append(loc_trail.trail.closed)
+            for seg in loc_trail.trail.segments:
+                if isinstance(seg, ArcSegment):
+                    parts.append(_floats(seg.angle, seg.dangle, *seg.t[:6]))
+                else:
+                    parts.append(_floats(*seg.offset))
+        return _h(*parts)
+
+    def visit_circle(self, shape: Circle) -> Digest:
+        return _h(b"circle", _floats(shape.radius))
+
+    def visit_rect(self, shape: Rect) -> Digest:
+        return _h(b"rect", _floats(shape.width, shape.height))
+
+    def visit_regular_polygon(self, shape: RegularPolygon) -> Digest:
+        return _h(b"polygon", shape.sides, _floats(shape.side_length))
+
+    def visit_latex(self, shape: Latex) -> Digest:
+        return _h(b"latex", shape.text)
+
+    def visit_text(self, shape: Text) -> Digest:
+        return _h(b"text", shape.text, shape.font_size)
+
+    def visit_spacer(self, shape: Spacer) -> Digest:
+        return _h(b"spacer", _floats(shape.width, shape.height))
+
+    def visit_arrowhead(self, shape: ArrowHead) -> Digest:
+        return _h(b"arrowhead", structural_hash(shape.arrow_shape))
+
+    def visit_image(self, shape: Image) -> Digest:
+        if isinstance(shape, BufferImage):
+            data = hashlib.blake2b(shape.data, digest_size=16).digest()
+            return _h(b"buffer", shape.width, shape.height, data)
+        return _h(b"image", shape.local_path, shape.url_path, shape.mtime)
+
+
+SHAPE_HASH = ShapeHash()
+
+
+class StructuralHash(DiagramVisitor[Any, None]):
+    """Computes the hash of a diagram, and whether it contains images (whose
+    hash must not be memoized)."""
+
+    def visit_primitive(self, diagram: Primitive, args: None) -> Hashed:
+        digest = _h(
+            b"primitive",
+            diagram.shape.accept(SHAPE_HASH),
+            hash_style(diagram.style),
+            hash_affine(diagram.transform),
+        )
+        return digest, isinstance(diagram.shape, Image)
+
+    def visit_empty(self, diagram: Empty, args: None) -> Hashed:
+        return _h(b"empty"), False
+
+    def visit_compose(self, diagram: Compose, args: None) -> Hashed:
+        # The envelope is left out: the backends only read the envelope
+        # of the root, which is part of the render key.
+        return _node(b"compose", [], diagram.diagrams)
+
+    def visit_apply_transform(
+        self, diagram: ApplyTransform, args: None
+    ) -> Hashed:
+        parts = [hash_affine(diagram.transform)]
+        return _node(b"transform", parts, [diagram.diagram])
+
+    def visit_apply_style(self, diagram: ApplyStyle, args: None) -> Hashed:
+        parts = [hash_style(diagram.style)]
+        return _node(b"style", parts, [diagram.diagram])
+
+    def visit_apply_name(self, diagram: ApplyName, args: None) -> Hashed:
+        # Names are usually `Name`s, but plain atoms are accepted too.
+        dname: Any = diagram.dname
+        if isinstance(dname, Name):
+            parts = [1, dname.atomic_names]
+        else:
+            parts = [0, dname]
+        return _node(b"name", parts, [diagram.diagram])
+
+    def visit_instanced(self, diagram: Instanced, args: None) -> Hashed:
+        styles = diagram.styles or []
+        digest, volatile = _hashed(diagram.diagram)
+        return (
+            _h(
+                b"instanced",
+                digest,
+                b"".join(hash_affine(t) for t in diagram.transforms),
+                b"".join(hash_style(s) for s in styles),
+            ),
+            volatile,
+        )
+
+
+STRUCTURAL_HASH = StructuralHash()
+
+
+def _node(tag: bytes, parts: List[Any], children: Iterable[Diagram]) -> Hashed:
+    hashed = [_hashed(d) for d in children]
+    digest = _h(tag, *parts, *(d for d, _ in hashed))
+    return digest, any(volatile for _, volatile in hashed)
+
+
+def _hashed(self: Diagram) -> Hashed:
+    digest: Optional[Digest] = self.__dict__.get("_digest")
+    if digest is not None:
+        return digest, False
+    digest, volatile = self.accept(STRUCTURAL_HASH, None)
+    if not volatile:
+        self.__dict__["_digest"] = digest
+    return digest, volatile
+
+
+def structural_hash(self: Diagram) -> Digest:
+    """Returns a digest of the diagram's shapes, styles, transforms and names.
+    Two diagrams with the same digest are drawn identically (up to their
+    framing, see ``render_key``)."""
+    return _hashed(self)[0]
+
+
+def render_key(self: Diagram, backend: str, **options: Any) -> str:
+    """Key of a rendered diagram: its structural hash, the extents of its
+    envelope along the axes (used by the backends to frame the output),
+    the backend and the size options."""
+    extents: Optional[Tuple[float, ...]] = self.__dict__.get("_extents")
+    if extents is None:
+        envelope = self.get_envelope()
+        extents = ()
+        if not envelope.is_empty:
+            extents = tuple(envelope(v) for v in (unit_x, -unit_x, unit_y))
+            extents += (envelope(-unit_y),)
+        self.__dict__["_extents"] = extents
+    return _h(
+        structural_hash(self),
+        _floats(*extents),
+        backend,
+        sorted(options.items()),
+    ).hex()
+
+
+class RenderCache:
+    """Cache of rendered files, indexed by ``render_key``.
+
+    Rendered bytes are kept in an in-memory LRU tier and, if a directory is
+    given, in an on-disk tier that persists across processes.
+
+    Usage:
+
+        ```python
+        from chalk.cache import RenderCache
+
+        cache = RenderCache(maxsize=256, directory=".chalk-cache")
+        cache.render(diagram, "out.svg", backend="svg", height=200)
+        ```
+
+    Args:
+        maxsize (int): Number of renders kept in memory.
+        directory (Optional[str]): Directory of the on-disk tier.
+    """
+
+    def __init__(self, maxsize: int = 128, directory: Optional[str] = None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.memory: OrderedDict[str, bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.memory.get(key)
+        if data is not None:
+            self.memory.move_to_end(key)
+            return data
+        if self.directory is not None:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.directory is not None:
+            # Write atomically, so concurrent readers never see partial data.
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._disk_path(key))
+
+    def _remember(self, key: str, data: bytes) -> None:
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def render(
+        self, diagram: Diagram, path: str, backend: str = "png", **options: Any
+    ) -> None:
+        """Renders the diagram to ``path``, reusing a cached render of an
+        identical diagram if there is one.
+
+        Args:
+            diagram (Diagram): Diagram to render.
+            path (str): Output file.
+            backend (str): One of ``"png"``, ``"svg"``, ``"pdf"``.
+            **options (Any): Size options of the backend's render function.
+        """
+        assert backend in BACKENDS, f"Unknown backend {backend}"
+        key = render_key(diagram, backend, **options)
+        data = self.get(key)
+        if data is None:
+            self.misses += 1
+            data = _render_bytes(diagram, backend, **options)
+            self.put(key, data)
+        else:
+            self.hits += 1
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def _render_bytes(diagram: Diagram, backend: str, **options: Any) -> bytes:
+    render = renderer(backend)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        out = os.path.join(tmpdir, "diagram." + backend)
+        render(diagram, out, **options)
+        with open(out, "rb") as f:
+            return f.read()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
@@ -1,8 +1,9 @@
-from typing import Iterable, List, Optional, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
 
-from chalk.envelope import Envelope
+from chalk.envelope import DiagramEnvelope
 from chalk.monoid import associative_reduce
 from chalk.shapes import Path, Spacer
+from chalk.style import Style
 from chalk.transform import V2, Affine, origin, unit_x, unit_y
 from chalk.types import Diagram
 
@@ -10,7 +11,7 @@ from chalk.types import Diagram
 
 
 def with_envelope(self: Diagram, other: Diagram) -> Diagram:
-    return self.compose(other.get_envelope())
+    return self.compose(DiagramEnvelope(other))
 
 
 # with_trace, phantom,
@@ -34,14 +35,7 @@ def pad(self: Diagram, extra: float) -> Diagram:
     Returns:
         Diagram: A diagram object.
     """
-    envelope = self.get_envelope()
-
-    def f(d: V2) -> float:
-        assert envelope is not None
-        return envelope(d) * extra
-
-    new_envelope = Envelope(f, envelope.is_empty)
-    return self.compose(new_envelope)
+    return self.compose(DiagramEnvelope(self, factor=extra))
 
 
 def frame(self: Diagram, extra: float) -> Diagram:
@@ -55,24 +49,15 @@ def frame(self: Diagram, extra: float) -> Diagram:
     Returns:
         Diagram: A diagram object.
     """
-    envelope = self.get_envelope()
-
-    def f(d: V2) -> float:
-        assert envelope is not None
-        return envelope(d) + extra
-
-    new_envelope = Envelope(f, envelope.is_empty)
-    return self.compose(new_envelope)
+    return self.compose(DiagramEnvelope(self, offset=extra))
 
 
 # extrudeEnvelope, intrudeEnvelope
 
 
 def atop(self: Diagram, other: Diagram) -> Diagram:
-    envelope1 = self.get_envelope()
-    envelope2 = other.get_envelope()
-    new_envelope = envelope1 + envelope2
-    return self.compose(new_envelope, other)
+    # The envelope is derived from the two diagrams when it is first needed.
+    return self.compose(None, other)
 
 
 # beneath
@@ -89,33 +74,131 @@ def beside(self: Diagram, other: Diagram, direction: V2) -> Diagram:
     return atop(self, juxtapose(self, other, direction))
 
 
+def instance(
+    diagram: Diagram,
+    transforms: Sequence[Affine],
+    styles: Optional[Sequence[Style]] = None,
+) -> Diagram:
+    """
+    Copies of a diagram, one per transform. The copies share the diagram:
+    its envelope is computed once and the backends convert it once.
+
+    Args:
+        diagram (Diagram): Diagram to copy.
+        transforms (Sequence[Affine]): Transform of each copy.
+        styles (Optional[Sequence[Style]]): Style of each copy, applied on
+            top of the diagram's own.
+
+    Returns:
+        Diagram: New diagram
+
+    """
+    from chalk.core import Instanced
+
+    if not transforms:
+        return empty()
+    assert styles is None or len(styles) == len(transforms)
+    return Instanced(
+        diagram, list(transforms), None if styles is None else list(styles)
+    )
+
+
+def _place(diagrams: Iterable[Diagram], points: Iterable[V2]) -> Diagram:
+    pairs = list(zip(diagrams, points))
+    if len(pairs) > 1 and all(d is pairs[0][0] for d, _ in pairs):
+        # The same diagram everywhere, as in scatter plots: share it.
+        return instance(pairs[0][0], [Affine.translation(p) for _, p in pairs])
+    return concat(d.translate(p.x, p.y) for d, p in pairs)
+
+
 def place_at(
     diagrams: Iterable[Diagram], points: List[Tuple[float, float]]
 ) -> Diagram:
-    return concat(d.translate(x, y) for d, (x, y) in zip(diagrams, points))
+    return _place(diagrams, (V2(x, y) for x, y in points))
 
 
 def place_on_path(diagrams: Iterable[Diagram], path: Path) -> Diagram:
-    return concat(
-        d.translate(p.x, p.y) for d, p in zip(diagrams, path.points())
-    )
+    return _place(diagrams, path.points())
+
+
+# Extent of a diagram along a direction: how far it reaches backwards and
+# forwards from its origin, or ``None`` if it is empty.
+Extent = Optional[Tuple[float, float]]
+# How ``cat`` nests ``beside``: an item index, the empty diagram (``None``),
+# or two nodes with the offsets of the separator and of the second one.
+Node = Union[None, int, Tuple["Node", float, "Node", float]]
+
+
+def _extent(diagram: Diagram, u: V2) -> Extent:
+    envelope = diagram.get_envelope()
+    if envelope.is_empty:
+        return None
+    return envelope(-u), envelope(u)
+
+
+def _gap(a: Extent, b: Extent) -> float:
+    "Offset at which ``beside`` places ``b`` after ``a``."
+    return (0.0 if a is None else a[1]) + (0.0 if b is None else b[0])
+
+
+def _union(a: Extent, b: Extent, offset: float) -> Extent:
+    "Extent of ``a`` atop ``b`` moved forwards by ``offset``."
+    if b is None:
+        return a
+    b = (b[0] - offset, b[1] + offset)
+    if a is None:
+        return b
+    return max(a[0], b[0]), max(a[1], b[1])
 
 
 # position, atPoints
 def cat(
     diagrams: Iterable[Diagram], v: V2, sep: Optional[float] = None
 ) -> Diagram:
-
-    diagrams = iter(diagrams)
-    start = next(diagrams, None)
-    sep_dia = hstrut(sep).rotate(v.angle)
-    if start is None:
+    # Places the diagrams as nested ``a.beside(sep, v).beside(b, v)`` would,
+    # but only queries the envelope of each diagram once and composes them
+    # in a single node.
+    items = list(diagrams)
+    if not items:
         return empty()
-
-    def fn(a: Diagram, b: Diagram) -> Diagram:
-        return a.beside(sep_dia, v).beside(b, v)
-
-    return fn(start, associative_reduce(fn, diagrams, empty()))
+    u = v.scaled_to(1)
+    sep_dia = hstrut(sep).rotate(v.angle)
+    sep_extent = _extent(sep_dia, u)
+
+    def fn(
+        a: Tuple[Extent, Node], b: Tuple[Extent, Node]
+    ) -> Tuple[Extent, Node]:
+        sep_offset = _gap(a[0], sep_extent)
+        extent = _union(a[0], sep_extent, sep_offset)
+        offset = _gap(extent, b[0])
+        return _union(extent, b[0], offset), (a[1], sep_offset, b[1], offset)
+
+    leaves: List[Tuple[Extent, Node]] = [
+        (_extent(d, u), i) for i, d in enumerate(items)
+    ]
+    _, root = fn(leaves[0], associative_reduce(fn, leaves[1:], (None, None)))
+
+    placed: List[Diagram] = []
+
+    def move(d: Diagram, offset: float) -> Diagram:
+        if offset == 0:
+            return d
+        return d.apply_transform(Affine.translation(u * offset))
+
+    def place(node: Node, offset: float) -> None:
+        if node is None:
+            return
+        if isinstance(node, int):
+            placed.append(move(items[node], offset))
+            return
+        left, sep_offset, right, right_offset = node
+        place(left, offset)
+        if sep is not None:
+            placed.append(move(sep_dia, offset + sep_offset))
+        place(right, offset + right_offset)
+
+    place(root, 0.0)
+    return concat(placed)
 
 
 def concat(diagrams: Iterable[Diagram]) -> Diagram:
@@ -129,9 +212,23 @@ def concat(diagrams: Iterable[Diagram]) -> Diagram:
         Diagram: New diagram
 
     """
-    from chalk.core import BaseDiagram
-
-    return BaseDiagram.concat(diagrams)  # type: ignore
+    from chalk.core import Children, Compose
+
+    # One node for all the diagrams, with the same children as repeated
+    # ``atop``, but without the intermediate nodes.
+    children: List[Diagram] = []
+    count = 0
+    for d in diagrams:
+        count += 1
+        if isinstance(d, Compose) and d.envelope is None:
+            children.extend(d.diagrams)
+        else:
+            children.append(d)
+    if count == 0:
+        return empty()
+    if count == 1:
+        return d
+    return Compose(None, Children(children))
 
 
 def empty() -> Diagram:
@@ -263,7 +360,5 @@ def at_center(self: Diagram, other: Diagram) -> Diagram:
         Diagram: A diagram object.
     """
     envelope1 = self.get_envelope()
-    envelope2 = other.get_envelope()
     t = Affine.translation(envelope1.center)
-    new_envelope = envelope1 + (t * envelope2)
-    return self.compose(new_envelope, other.apply_transform(t))
+    return self.compose(None, other.apply_transform(t))
@@ -1,17 +1,33 @@
 from __future__ import annotations
 
+import itertools
 import os
 import tempfile
 from dataclasses import dataclass
-from typing import Any, List, Optional, TypeVar
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    overload,
+)
 
 import chalk.align
 import chalk.arrow
 import chalk.backend.cairo
 import chalk.backend.svg
 import chalk.backend.tikz
+import chalk.cache
 import chalk.combinators
+import chalk.cull
 import chalk.model
+import chalk.simplify
+import chalk.stats
 import chalk.subdiagram
 import chalk.trace
 import chalk.types
@@ -55,6 +71,10 @@ class BaseDiagram(chalk.types.Diagram):
     def empty(cls) -> Diagram:  # type: ignore
         return Empty()
 
+    @classmethod
+    def concat(cls, diagrams: Iterable[Diagram]) -> Diagram:  # type: ignore
+        return chalk.combinators.concat(diagrams)
+
     # Tranformable
     def apply_transform(self, t: Affine) -> Diagram:  # type: ignore
         return ApplyTransform(t, self)
@@ -67,17 +87,29 @@ class BaseDiagram(chalk.types.Diagram):
         return self.apply_style(style)
 
     def compose(
-        self, envelope: Envelope, other: Optional[Diagram] = None
+        self, envelope: Optional[Envelope], other: Optional[Diagram] = None
     ) -> Diagram:
-        other = other if other is not None else Empty()
-        if isinstance(self, Compose) and isinstance(other, Compose):
-            return Compose(envelope, self.diagrams + other.diagrams)
-        elif isinstance(self, Compose):
-            return Compose(envelope, self.diagrams + [other])
-        elif isinstance(other, Compose):
-            return Compose(envelope, [self] + other.diagrams)
-        else:
-            return Compose(envelope, [self, other])
+        """Composes the diagram with another one. A ``None`` envelope is
+        derived from the composed diagrams; operands with a derived envelope
+        are flattened into the new node."""
+        diagrams: List[Diagram] = [self] if other is None else [self, other]
+        if envelope is not None:
+            return Compose(envelope, diagrams)
+        children: Optional[Children] = None
+        for d in diagrams:
+            if isinstance(d, Compose) and d.envelope is None:
+                items = d.diagrams
+                if not isinstance(items, Children):
+                    items = Children(list(items))
+                children = (
+                    items if children is None else children.extend(items)
+                )
+            elif children is None:
+                children = Children([d])
+            else:
+                children = children.append(d)
+        assert children is not None
+        return Compose(None, children)
 
     def named(self, name: Name) -> Diagram:
         """Add a name (or a sequence of names) to a diagram."""
@@ -175,6 +207,12 @@ class BaseDiagram(chalk.types.Diagram):
 
     with_names = chalk.subdiagram.with_names
 
+    # Hashing
+    structural_hash = chalk.cache.structural_hash
+    stats = chalk.stats.stats
+    cull = chalk.cull.cull
+    simplify = chalk.simplify.simplify
+
     def qualify(self, name: Name) -> Diagram:
         """Prefix names in the diagram by a given name or sequence of names."""
         return self.accept(Qualify(name), None)
@@ -182,6 +220,15 @@ class BaseDiagram(chalk.types.Diagram):
     def accept(self, visitor: DiagramVisitor[A, Any], args: Any) -> A:
         raise NotImplementedError
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # Derived envelopes are closures: they are rebuilt after unpickling,
+        # as are the expansions of instanced diagrams.
+        state = dict(self.__dict__)
+        state.pop("_envelope", None)
+        state.pop("_content_envelope", None)
+        state.pop("_expanded", None)
+        return state
+
 
 @dataclass
 class Primitive(BaseDiagram):
@@ -246,12 +293,81 @@ class Empty(BaseDiagram):
         return visitor.visit_empty(self, args)
 
 
+class Children(Sequence[Diagram]):
+    """The diagrams of a ``Compose`` node: an immutable view of the first
+    ``length`` items of a list that may be shared with other nodes.
+
+    Appending to the view that ends where the list ends grows the list in
+    place, and the new view shares it; appending to any other view copies
+    it first. Accumulating a diagram with ``d = d + x`` in a loop is thus
+    linear instead of quadratic.
+    """
+
+    __slots__ = ("items", "length")
+
+    def __init__(self, items: List[Diagram], length: Optional[int] = None):
+        self.items = items
+        self.length = len(items) if length is None else length
+
+    def __len__(self) -> int:
+        return self.length
+
+    @overload
+    def __getitem__(self, index: int) -> Diagram: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Diagram]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return self.items[: self.length][index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Children index out of range")
+        return self.items[index]
+
+    def __iter__(self) -> Iterator[Diagram]:
+        return itertools.islice(self.items, self.length)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (Children, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            a == b for a, b in zip(self, other)
+        )
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __reduce__(self) -> Any:
+        return Children, (list(self),)
+
+    def append(self, diagram: Diagram) -> Children:
+        "A view with one more diagram at the end."
+        return self.extend((diagram,))
+
+    def extend(self, diagrams: Iterable[Diagram]) -> Children:
+        "A view with more diagrams at the end."
+        new = list(diagrams)
+        if len(self.items) == self.length:
+            items = self.items
+        else:
+            items = self.items[: self.length]
+        items.extend(new)
+        return Children(items)
+
+
 @dataclass
 class Compose(BaseDiagram):
-    """Compose class."""
+    """Compose class.
 
-    envelope: Envelope
-    diagrams: List[Diagram]
+    The envelope is either explicit or, when ``None``, derived from the
+    envelopes of the diagrams (and memoized on first use).
+    """
+
+    envelope: Optional[Envelope]
+    diagrams: Sequence[Diagram]
 
     def accept(self, visitor: DiagramVisitor[A, Any], args: Any) -> A:
         return visitor.visit_compose(self, args)
@@ -290,6 +406,37 @@ class ApplyName(BaseDiagram):
         return visitor.visit_apply_name(self, args)
 
 
+@dataclass
+class Instanced(BaseDiagram):
+    """Copies of one diagram, each with its own transform and, optionally,
+    its own style. It draws the same as the composition of
+    ``diagram.apply_transform(t).apply_style(s)`` over the copies, but the
+    copies share the diagram, so the backends can convert it once.
+    """
+
+    diagram: Diagram
+    transforms: List[Affine]
+    styles: Optional[List[Style]] = None
+
+    def expand(self) -> Diagram:
+        "The composition of the copies (memoized)."
+        expanded: Optional[Diagram] = self.__dict__.get("_expanded")
+        if expanded is None:
+            copies = []
+            for i, t in enumerate(self.transforms):
+                copy = self.diagram.apply_transform(t)
+                if self.styles is not None:
+                    copy = copy.apply_style(self.styles[i])
+                copies.append(copy)
+            expanded = self.__dict__["_expanded"] = Compose(
+                None, Children(copies)
+            )
+        return expanded
+
+    def accept(self, visitor: DiagramVisitor[A, Any], args: Any) -> A:
+        return visitor.visit_instanced(self, args)
+
+
 class Qualify(DiagramVisitor[Diagram, None]):
     A_type = Diagram
 
@@ -322,3 +469,10 @@ class Qualify(DiagramVisitor[Diagram, None]):
         return ApplyName(
             self.name + diagram.dname, diagram.diagram.accept(self, None)
         )
+
+    def visit_instanced(self, diagram: Instanced, args: None) -> Diagram:
+        return Instanced(
+            diagram.diagram.accept(self, None),
+            diagram.transforms,
+            diagram.styles,
+        )
@@ -0,0 +1,211 @@
+"""
+Viewport culling.
+
+A diagram is culled top-down: a subtree whose envelope lies entirely
+outside the viewport is dropped, one that lies entirely inside is kept as
+is, and only the subtrees crossing the border are visited further. Since
+the envelopes of composed diagrams are memoized, this is cheap even for
+large diagrams.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from chalk.envelope import Envelope, GetEnvelope, instanced_envelope
+from chalk.transform import P2, Affine, BoundingBox
+from chalk.types import Diagram
+from chalk.visitor import DiagramVisitor
+
+if TYPE_CHECKING:
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Compose,
+        Empty,
+        Instanced,
+        Primitive,
+    )
+
+Ident = Affine.identity()
+# Default margin around the viewport, relative to its larger side. Line
+# widths, arrow heads and texts are sized at render time and can stick out
+# of the envelopes.
+MARGIN = 0.05
+
+
+class ContentEnvelope(GetEnvelope):
+    "Envelope of what a diagram draws, ignoring explicit envelopes."
+
+    def visit_compose(self, diagram: Compose, t: Affine = Ident) -> Envelope:
+        envelope = diagram.__dict__.get("_content_envelope")
+        if envelope is None:
+            envelope = Envelope.concat(
+                d.accept(self, Ident) for d in diagram.diagrams
+            )
+            diagram.__dict__["_content_envelope"] = envelope
+        return envelope.apply_transform(t)
+
+    def visit_instanced(
+        self, diagram: Instanced, t: Affine = Ident
+    ) -> Envelope:
+        envelope = diagram.__dict__.get("_content_envelope")
+        if envelope is None:
+            envelope = instanced_envelope(
+                diagram.diagram.accept(self, Ident), diagram.transforms
+            )
+            diagram.__dict__["_content_envelope"] = envelope
+        return envelope.apply_transform(t)
+
+
+class Cull(DiagramVisitor[Any, Affine]):
+    """Removes the subdiagrams outside of a box, extended by a margin.
+    Returns ``None`` if nothing is left. The transformation ``t`` is
+    accumulated downwards."""
+
+    def __init__(self, box: BoundingBox, margin: float = 0.0):
+        self.x0, self.y0 = box.min_point - P2(margin, margin)
+        self.x1, self.y1 = box.max_point + P2(margin, margin)
+        self.envelopes = ContentEnvelope()
+
+    def cull(self, diagram: Diagram, t: Affine) -> Optional[Diagram]:
+        envelope = diagram.accept(self.envelopes, t)
+        if envelope.is_empty:
+            return diagram
+        x0, y0, x1, y1 = envelope.bounds
+        if x1 < self.x0 or x0 > self.x1 or y1 < self.y0 or y0 > self.y1:
+            return None
+        if x0 >= self.x0 and x1 <= self.x1 and y0 >= self.y0 and y1 <= self.y1:
+            return diagram
+        result: Optional[Diagram] = diagram.accept(self, t)
+        return result
+
+    def visit_primitive(
+        self, diagram: Primitive, t: Affine = Ident
+    ) -> Optional[Diagram]:
+        return diagram
+
+    def visit_empty(
+        self, diagram: Empty, t: Affine = Ident
+    ) -> Optional[Diagram]:
+        return diagram
+
+    def visit_compose(
+        self, diagram: Compose, t: Affine = Ident
+    ) -> Optional[Diagram]:
+        from chalk.core import Compose
+
+        children = []
+        for d in diagram.diagrams:
+            child = self.cull(d, t)
+            if child is not None:
+                children.append(child)
+        if not children:
+            return None
+        if len(children) == len(diagram.diagrams) and all(
+            a is b for a, b in zip(children, diagram.diagrams)
+        ):
+            return diagram
+        return Compose(diagram.envelope, children)
+
+    def visit_instanced(
+        self, diagram: Instanced, t: Affine = Ident
+    ) -> Optional[Diagram]:
+        from chalk.core import Instanced
+
+        # Each copy is tested with the transformed bounds of the diagram.
+        envelope = diagram.diagram.accept(self.envelopes, Ident)
+        if envelope.is_empty:
+            return diagram
+        x0, y0, x1, y1 = envelope.bounds
+        corners = [(x0, y0), (x1, y0), (x0, y1), (x1, y1)]
+        keep = []
+        for i, ti in enumerate(diagram.transforms):
+            a, b, c, d, e, f = (t * ti)[:6]
+            xs = [a * x + b * y + c for x, y in corners]
+            ys = [d * x + e * y + f for x, y in corners]
+            if (
+                max(xs) >= self.x0
+                and min(xs) <= self.x1
+                and max(ys) >= self.y0
+                and min(ys) <= self.y1
+            ):
+                keep.append(i)
+        if not keep:
+            return None
+        if len(keep) == len(diagram.transforms):
+            return diagram
+        styles = diagram.styles
+        return Instanced(
+            diagram.diagram,
+            [diagram.transforms[i] for i in keep],
+            None if styles is None else [styles[i] for i in keep],
+        )
+
+    def visit_apply_transform(
+        self, diagram: ApplyTransform, t: Affine = Ident
+    ) -> Optional[Diagram]:
+        from chalk.core import ApplyTransform
+
+        inner = self.cull(diagram.diagram, t * diagram.transform)
+        if inner is None:
+            return None
+        if inner is diagram.diagram:
+            return diagram
+        return ApplyTransform(diagram.transform, inner)
+
+    def visit_apply_style(
+        self, diagram: ApplyStyle, t: Affine = Ident
+    ) -> Optional[Diagram]:
+        from chalk.core import ApplyStyle
+
+        inner = self.cull(diagram.diagram, t)
+        if inner is None:
+            return None
+        if inner is diagram.diagram:
+            return diagram
+        return ApplyStyle(diagram.style, inner)
+
+    def visit_apply_name(
+        self, diagram: ApplyName, t: Affine = Ident
+    ) -> Optional[Diagram]:
+        from chalk.core import ApplyName
+
+        inner = self.cull(diagram.diagram, t)
+        if inner is None:
+            return None
+        if inner is diagram.diagram:
+            return diagram
+        return ApplyName(diagram.dname, inner)
+
+
+def cull(
+    self: Diagram, viewport: BoundingBox, margin: Optional[float] = None
+) -> Diagram:
+    """Removes the parts of the diagram that are outside of the viewport.
+    Subdiagrams crossing its border are kept whole.
+
+    Args:
+        viewport (BoundingBox): Visible region, in the coordinates of the
+            diagram.
+        margin (Optional[float]): Extra space kept around the viewport.
+            Defaults to 5% of its larger side.
+
+    Returns:
+        Diagram: The culled diagram (empty if nothing is visible).
+    """
+    from chalk.core import Empty
+
+    if margin is None:
+        margin = MARGIN * max(viewport.width, viewport.height)
+    result = Cull(viewport, margin).cull(self, Ident)
+    return Empty() if result is None else result
+
+
+def frame(viewport: BoundingBox) -> Diagram:
+    "An invisible diagram whose envelope is the viewport."
+    from chalk.combinators import strut
+
+    center = (viewport.min_point + viewport.max_point) / 2
+    return strut(viewport.width, viewport.height).translate(center.x, center.y)
@@ -1,6 +1,15 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Callable, Iterable, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Sequence,
+    Tuple,
+)
 
 from chalk.monoid import Monoid
 from chalk.transform import (
@@ -19,7 +28,7 @@ from chalk.transform import (
 from chalk.visitor import DiagramVisitor
 
 if TYPE_CHECKING:
-    from chalk.core import ApplyTransform, Compose, Primitive
+    from chalk.core import ApplyTransform, Compose, Instanced, Primitive
     from chalk.types import Diagram
 
 
@@ -52,6 +61,17 @@ class Envelope(Transformable, Monoid):
             lambda direction: max(self(direction), other(direction))
         )
 
+    @classmethod
+    def concat(cls, elems: Iterable[Envelope]) -> Envelope:
+        # A flat maximum: combining many envelopes pairwise would nest as
+        # many closures.
+        envelopes = [e for e in elems if not e.is_empty]
+        if not envelopes:
+            return Envelope.empty()
+        if len(envelopes) == 1:
+            return envelopes[0]
+        return Envelope(lambda direction: max(e(direction) for e in envelopes))
+
     @property
     def center(self) -> P2:
         if self.is_empty:
@@ -71,6 +91,12 @@ class Envelope(Transformable, Monoid):
         assert not self.is_empty
         return self(unit_y) + self(-unit_y)
 
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        "Axis-aligned bounds ``(min x, min y, max x, max y)``."
+        assert not self.is_empty
+        return (-self(-unit_x), -self(-unit_y), self(unit_x), self(unit_y))
+
     def apply_transform(self, t: Affine) -> Envelope:
         if self.is_empty:
             return self
@@ -103,11 +129,15 @@ class Envelope(Transformable, Monoid):
 
     @staticmethod
     def from_bounding_box(box: BoundingBox) -> Envelope:
+        x0, y0 = box.min_point
+        x1, y1 = box.max_point
+
         def wrapped(d: V2) -> SignedDistance:
-            v: float = apply_affine(
-                Affine.rotation(d.angle), box
-            ).bounding_box.max_point.x
-            return v / d.length
+            # The farthest corner in direction d.
+            x, y = d.x, d.y
+            cx: float = x1 if x > 0 else x0
+            cy: float = y1 if y > 0 else y0
+            return (cx * x + cy * y) / (x * x + y * y)
 
         return Envelope(wrapped)
 
@@ -135,6 +165,93 @@ class Envelope(Transformable, Monoid):
         return segments
 
 
+class DiagramEnvelope(Envelope):
+    """The envelope of a diagram, scaled and then offset: used to give a
+    diagram the envelope of another one (``with_envelope``) or a padded
+    version of its own (``pad``, ``frame``). Unlike an envelope built from a
+    closure, it can be pickled and serialized.
+    """
+
+    def __init__(
+        self, diagram: Diagram, factor: float = 1.0, offset: float = 0.0
+    ):
+        self.diagram = diagram
+        self.factor = factor
+        self.offset = offset
+        envelope = diagram.get_envelope()
+
+        def f(d: V2) -> SignedDistance:
+            return envelope(d) * factor + offset
+
+        super().__init__(f, envelope.is_empty)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DiagramEnvelope):
+            return NotImplemented
+        return bool(self.__getstate__() == other.__getstate__())
+
+    def __getstate__(self) -> Any:
+        return self.diagram, self.factor, self.offset
+
+    def __setstate__(self, state: Tuple[Diagram, float, float]) -> None:
+        self.__init__(*state)  # type: ignore
+
+
+def _hull(points: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    "Vertices of the convex hull of points (Andrew's monotone chain)."
+    points = sorted(set(points))
+    if len(points) < 3:
+        return points
+
+    def half(ps: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        out: List[Tuple[float, float]] = []
+        for x, y in ps:
+            while len(out) >= 2:
+                (ax, ay), (bx, by) = out[-2], out[-1]
+                if (bx - ax) * (y - ay) - (by - ay) * (x - ax) > 0:
+                    break
+                out.pop()
+            out.append((x, y))
+        return out[:-1]
+
+    return half(points) + half(points[::-1])
+
+
+def instanced_envelope(
+    envelope: Envelope, transforms: Sequence[Affine]
+) -> Envelope:
+    """Envelope of copies of a diagram, given its envelope and the
+    transforms of the copies.
+
+    The copies are grouped by the linear part of their transform: the
+    envelope is transformed once per group, and the farthest translation of
+    a group in a direction is found among the vertices of the convex hull
+    of its translations.
+    """
+    if envelope.is_empty or not transforms:
+        return Envelope.empty()
+    groups: Dict[Tuple[float, ...], List[Tuple[float, float]]] = {}
+    for t in transforms:
+        a, b, c, d, e, f = t[:6]
+        groups.setdefault((a, b, d, e), []).append((c, f))
+    parts = []
+    for (a, b, d, e), offsets in groups.items():
+        linear = envelope
+        if (a, b, d, e) != (1, 0, 0, 1):
+            linear = envelope.apply_transform(Affine(a, b, 0, d, e, 0))
+        parts.append((linear, _hull(offsets)))
+
+    def wrapped(v: V2) -> SignedDistance:
+        x, y = v.x, v.y
+        n = x * x + y * y
+        return max(
+            linear(v) + max(px * x + py * y for px, py in hull) / n
+            for linear, hull in parts
+        )
+
+    return Envelope(wrapped)
+
+
 class GetEnvelope(DiagramVisitor[Envelope, Affine]):
     A_type = Envelope
 
@@ -145,7 +262,16 @@ class GetEnvelope(DiagramVisitor[Envelope, Affine]):
         return diagram.shape.get_envelope().apply_transform(new_transform)
 
     def visit_compose(self, diagram: Compose, t: Affine = Ident) -> Envelope:
-        return diagram.envelope.apply_transform(t)
+        envelope = diagram.envelope
+        if envelope is None:
+            # Derived from the children on first use, and memoized.
+            envelope = diagram.__dict__.get("_envelope")
+            if envelope is None:
+                envelope = Envelope.concat(
+                    d.get_envelope() for d in diagram.diagrams
+                )
+                diagram.__dict__["_envelope"] = envelope
+        return envelope.apply_transform(t)
 
     def visit_apply_transform(
         self, diagram: ApplyTransform, t: Affine = Ident
@@ -153,6 +279,17 @@ class GetEnvelope(DiagramVisitor[Envelope, Affine]):
         n = t * diagram.transform
         return diagram.diagram.accept(self, n)
 
+    def visit_instanced(
+        self, diagram: Instanced, t: Affine = Ident
+    ) -> Envelope:
+        envelope = diagram.__dict__.get("_envelope")
+        if envelope is None:
+            envelope = instanced_envelope(
+                diagram.diagram.accept(self, Ident), diagram.transforms
+            )
+            diagram.__dict__["_envelope"] = envelope
+        return envelope.apply_transform(t)
+
 
 def get_envelope(self: Diagram, t: Affine = Ident) -> Envelope:
     return self.accept(GetEnvelope(), t)
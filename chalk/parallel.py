@@ -0,0 +1,260 @@
+"""
+Rendering many diagrams in parallel.
+
+The workers are forked from the calling process, so they inherit the
+diagrams and the caches (compiled LaTeX snippets, decoded images) without
+having to copy them. Where ``fork`` is not available the workers are
+spawned, and each diagram is sent to them in the compact binary format of
+``chalk.serialize``.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from chalk.backend import renderer
+from chalk.serialize import dumps, loads
+from chalk.shapes import BufferImage, Image
+from chalk.shapes.latex import resolve_pending
+from chalk.types import Diagram
+
+# Jobs of the current `render_many` call, inherited by the forked workers.
+_jobs: Optional[Tuple[Sequence[Diagram], Sequence[str], str, Any]] = None
+# Function and arguments of the current `pool_map` call.
+_tasks: Optional[Tuple[Callable[[Any], Any], Sequence[Any]]] = None
+
+
+@dataclass
+class RenderResult:
+    """Outcome of rendering one diagram.
+
+    Attributes:
+        index (int): Position of the diagram in the input.
+        path (str): Output file.
+        error (Optional[str]): Formatted traceback if the render failed.
+        elapsed (float): Render time in seconds.
+    """
+
+    index: int
+    path: str
+    error: Optional[str]
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _render(
+    index: int,
+    diagram: Callable[[], Diagram],
+    path: str,
+    backend: str,
+    options: Any,
+) -> RenderResult:
+    start = time.perf_counter()
+    error = None
+    try:
+        renderer(backend)(diagram(), path, **options)
+    except Exception:
+        error = traceback.format_exc()
+    return RenderResult(index, path, error, time.perf_counter() - start)
+
+
+def _render_one(index: int) -> RenderResult:
+    "Renders one of the jobs inherited from the parent process."
+    assert _jobs is not None
+    diagrams, paths, backend, options = _jobs
+    return _render(
+        index, lambda: diagrams[index], paths[index], backend, options
+    )
+
+
+def _render_serialized(job: Tuple[int, bytes, str, str, Any]) -> RenderResult:
+    "Renders a job sent to a spawned worker."
+    index, data, path, backend, options = job
+    return _render(index, lambda: loads(data), path, backend, options)
+
+
+def _run_task(index: int) -> Any:
+    "Runs one of the tasks inherited from the parent process."
+    assert _tasks is not None
+    fn, args = _tasks
+    return fn(args[index])
+
+
+@contextmanager
+def task_pool(
+    fn: Callable[[Any], Any], args: Sequence[Any], workers: int
+) -> Iterator[Callable[[Iterable[int]], List[Any]]]:
+    """Starts a pool of processes for applying a function to the arguments,
+    and yields a function that applies it to the arguments at the given
+    indices. The same processes serve every call made inside the block.
+
+    Forked workers inherit the arguments; spawned ones receive them pickled,
+    so ``fn`` has to be defined at the top level of a module.
+
+    Args:
+        fn (Callable[[Any], Any]): Function to apply.
+        args (Sequence[Any]): Arguments, one per call.
+        workers (int): Number of processes.
+
+    Yields:
+        Callable[[Iterable[int]], List[Any]]: Returns the results for the
+        given indices, in their order.
+    """
+    global _tasks
+    workers = min(workers, len(args))
+    if workers <= 1:
+        yield lambda indices: [fn(args[i]) for i in indices]
+        return
+    if "fork" not in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            yield lambda indices: pool.map(fn, [args[i] for i in indices])
+        return
+    _tasks = (fn, args)
+    try:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            yield lambda indices: pool.map(_run_task, indices)
+    finally:
+        _tasks = None
+
+
+def pool_map(
+    fn: Callable[[Any], Any], args: Sequence[Any], workers: int
+) -> List[Any]:
+    """Applies a function to each argument in a pool of processes (see
+    ``task_pool``).
+
+    Args:
+        fn (Callable[[Any], Any]): Function to apply.
+        args (Sequence[Any]): Arguments, one per call.
+        workers (int): Number of processes.
+
+    Returns:
+        List[Any]: The results, in the order of the arguments.
+    """
+    with task_pool(fn, args, workers) as run:
+        return run(range(len(args)))
+
+
+def _warm_caches(diagrams: Sequence[Diagram], workers: Optional[int]) -> None:
+    "Fills the caches in the parent, so that all the workers share them."
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Compose,
+        Instanced,
+        Primitive,
+    )
+
+    resolve_pending(workers)
+    seen = set()
+    stack = list(diagrams)
+    while stack:
+        d = stack.pop()
+        if id(d) in seen:
+            continue
+        seen.add(id(d))
+        if isinstance(d, Primitive):
+            shape = d.shape
+            if isinstance(shape, Image) and not isinstance(shape, BufferImage):
+                # Decodes the image into the per-file cache.
+                shape.im
+        elif isinstance(d, Compose):
+            stack.extend(d.diagrams)
+        elif isinstance(d, (ApplyTransform, ApplyStyle, ApplyName, Instanced)):
+            stack.append(d.diagram)
+
+
+def render_many(
+    diagrams: Sequence[Diagram],
+    paths: Sequence[str],
+    backend: str = "png",
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[RenderResult], None]] = None,
+    **options: Any,
+) -> List[RenderResult]:
+    """Renders each diagram to the corresponding path, spreading the work
+    over a pool of processes.
+
+    A failing render doesn't stop the others: its traceback is reported in
+    its ``RenderResult``.
+
+    Usage:
+
+        ```python
+        from chalk import render_many
+
+        results = render_many(diagrams, paths, "svg", workers=8, height=64)
+        failed = [r for r in results if not r.ok]
+        ```
+
+    Args:
+        diagrams (Sequence[Diagram]): Diagrams to render.
+        paths (Sequence[str]): Output files, one per diagram.
+        backend (str): One of ``"png"``, ``"svg"``, ``"pdf"``.
+        workers (Optional[int]): Number of processes. Defaults to the number
+            of processors.
+        progress (Optional[Callable[[RenderResult], None]]): Called with the
+            result of each diagram as soon as it is rendered.
+        **options (Any): Size options of the backend's render function.
+
+    Returns:
+        List[RenderResult]: The results, in the order of the input.
+    """
+    global _jobs
+    assert len(diagrams) == len(paths), "Expected one path per diagram"
+    if not diagrams:
+        return []
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(diagrams))
+    _warm_caches(diagrams, workers)
+
+    results: Dict[int, RenderResult] = {}
+    pool = None
+    _jobs = (diagrams, paths, backend, options)
+    try:
+        done: Iterable[RenderResult]
+        # Small chunks keep the progress reports regular.
+        chunksize = max(1, min(64, len(diagrams) // (8 * workers)))
+        if workers <= 1:
+            done = map(_render_one, range(len(diagrams)))
+        elif "fork" in multiprocessing.get_all_start_methods():
+            pool = multiprocessing.get_context("fork").Pool(workers)
+            done = pool.imap_unordered(
+                _render_one, range(len(diagrams)), chunksize
+            )
+        else:
+            pool = multiprocessing.get_context("spawn").Pool(workers)
+            jobs = (
+                (i, dumps(d), path, backend, options)
+                for i, (d, path) in enumerate(zip(diagrams, paths))
+            )
+            done = pool.imap_unordered(_render_serialized, jobs, chunksize)
+        for result in done:
+            results[result.index] = result
+            if progress is not None:
+                progress(result)
+    finally:
+        _jobs = None
+        if pool is not None:
+            pool.terminate()
+    return [results[i] for i in range(len(diagrams))]
@@ -0,0 +1,246 @@
+"""
+Opt-in profiling of diagram construction and rendering.
+
+Inside a ``profile()`` block, the hot operations of chalk (envelope and
+trace queries, style merges, affine products, node visits) are wrapped to
+count calls and measure wall time, and the backends report the time spent
+in each stage of a render (layout, traversal, writing the output). The
+wrappers are removed when the block exits, so there is no cost otherwise.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Profile collecting the measurements; `None` when not profiling.
+_active: Optional[Profile] = None
+
+
+@dataclass
+class Stat:
+    """Measurements of one kind of operation.
+
+    Attributes:
+        calls (int): Number of calls.
+        total (float): Wall time in seconds, including the nested
+            operations (recursive calls are counted once).
+        own (float): Wall time in seconds, excluding the nested operations.
+    """
+
+    calls: int = 0
+    total: float = 0.0
+    own: float = 0.0
+
+
+class Profile:
+    "Measurements collected inside a ``profile()`` block."
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, Stat] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        # Time spent in the nested operations of each open frame.
+        self._children: List[float] = []
+        self._open: Counter[str] = Counter()
+
+    @property
+    def elapsed(self) -> float:
+        end = time.perf_counter() if self.end is None else self.end
+        return end - self.start
+
+    def _enter(self, key: str) -> Stat:
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = Stat()
+        self._open[key] += 1
+        self._children.append(0.0)
+        return stat
+
+    def _exit(self, key: str, stat: Stat, elapsed: float) -> None:
+        stat.calls += 1
+        stat.own += elapsed - self._children.pop()
+        if self._children:
+            self._children[-1] += elapsed
+        self._open[key] -= 1
+        if not self._open[key]:
+            stat.total += elapsed
+
+    def call(self, key: str, fn: Callable[..., Any], *args: Any) -> Any:
+        "Calls ``fn(*args)``, accounting its time under ``key``."
+        stat = self._enter(key)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._exit(key, stat, time.perf_counter() - start)
+
+    def report(self) -> List[Tuple[str, Stat]]:
+        "The statistics, sorted by decreasing own time."
+        return sorted(self.stats.items(), key=lambda kv: -kv[1].own)
+
+    def __str__(self) -> str:
+        lines = [f"{'':32}{'calls':>10}{'total ms':>12}{'own ms':>12}"]
+        for key, stat in self.report():
+            lines.append(
+                f"{key:32}{stat.calls:>10}"
+                f"{1e3 * stat.total:>12.2f}{1e3 * stat.own:>12.2f}"
+            )
+        lines.append(f"{'elapsed':32}{'':>10}{1e3 * self.elapsed:>12.2f}")
+        return "\n".join(lines)
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """Exports the statistics as JSON.
+
+        Args:
+            path (Optional[str]): If given, the JSON is also written there.
+
+        Returns:
+            str: The JSON document.
+        """
+        data = {
+            "elapsed": self.elapsed,
+            "stats": {key: asdict(stat) for key, stat in self.report()},
+        }
+        return _dump(data, path)
+
+    def to_chrome_trace(self, path: Optional[str] = None) -> str:
+        """Exports the render stages in the Chrome trace event format, which
+        can be opened in ``chrome://tracing`` or Perfetto. Each stage carries
+        the number of operations of each kind that ran inside it.
+
+        Args:
+            path (Optional[str]): If given, the trace is also written there.
+
+        Returns:
+            str: The JSON document.
+        """
+        return _dump({"traceEvents": self.events}, path)
+
+
+def _dump(data: Any, path: Optional[str]) -> str:
+    out = json.dumps(data, indent=1)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(out)
+    return out
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    "Marks a stage of a render. Does nothing when not profiling."
+    prof = _active
+    if prof is None:
+        yield
+        return
+    key = "stage." + name
+    before = {k: stat.calls for k, stat in prof.stats.items()}
+    stat = prof._enter(key)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        prof._exit(key, stat, elapsed)
+        counts = {
+            k: s.calls - before.get(k, 0)
+            for k, s in prof.stats.items()
+            if not k.startswith("stage.") and s.calls > before.get(k, 0)
+        }
+        prof.events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": 1e6 * (start - prof.start),
+                "dur": 1e6 * elapsed,
+                "pid": 0,
+                "tid": 0,
+                "args": counts,
+            }
+        )
+
+
+def _targets() -> List[Tuple[Any, str, Callable[[Tuple[Any, ...]], str]]]:
+    "The methods to instrument, with the key of each call."
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Compose,
+        Empty,
+        Instanced,
+        Primitive,
+    )
+    from chalk.envelope import Envelope
+    from chalk.style import Style
+    from chalk.trace import Trace
+    from chalk.transform import Affine
+
+    def visit(args: Tuple[Any, ...]) -> str:
+        return "visit." + type(args[1]).__name__
+
+    nodes = [
+        Primitive,
+        Empty,
+        Compose,
+        ApplyTransform,
+        ApplyStyle,
+        ApplyName,
+        Instanced,
+    ]
+    return [
+        (Envelope, "__call__", lambda args: "envelope"),
+        (Trace, "__call__", lambda args: "trace"),
+        (Style, "merge", lambda args: "style.merge"),
+        (Affine, "__mul__", lambda args: "affine.mul"),
+    ] + [(node, "accept", visit) for node in nodes]
+
+
+def _wrap(
+    prof: Profile, fn: Callable[..., Any], key: Callable[..., str]
+) -> Callable[..., Any]:
+    def wrapper(*args: Any) -> Any:
+        return prof.call(key(args), fn, *args)
+
+    return wrapper
+
+
+@contextmanager
+def profile() -> Iterator[Profile]:
+    """Profiles the diagram operations and renders run inside the block.
+
+    Usage:
+
+        ```python
+        from chalk.profile import profile
+
+        with profile() as prof:
+            diagram.render_svg("out.svg")
+        print(prof)
+        prof.to_chrome_trace("render.trace.json")
+        ```
+
+    Yields:
+        Profile: The collected measurements.
+    """
+    global _active
+    assert _active is None, "Profiles can't be nested"
+    prof = Profile()
+    patched = []
+    for owner, name, key in _targets():
+        original = owner.__dict__[name]
+        patched.append((owner, name, original))
+        setattr(owner, name, _wrap(prof, original, key))
+    _active = prof
+    try:
+        yield prof
+    finally:
+        _active = None
+        prof.end = time.perf_counter()
+        for owner, name, original in reversed(patched):
+            setattr(owner, name, original)
@@ -0,0 +1,562 @@
+"""
+Compact binary serialization of diagrams.
+
+A serialized diagram is a table of its distinct nodes in post-order, so
+children come before their parents and shared subtrees are stored once.
+Derived envelopes are not stored: they are rebuilt from the children when
+first needed after loading.
+
+Layout (little-endian)::
+
+    magic "CHLK", version (u8), node count (u32), nodes...
+
+    node      := tag (u8) payload
+    Empty     := -
+    Primitive := affine style shape
+    Compose   := envelope children
+    Transform := affine child
+    Style     := style child
+    Name      := (0 atom | 1 count atoms) child
+    atom      := none | bool | i64 | f64 | string | count atoms
+    Instanced := child count affines (0 | 1 styles)
+
+where ``affine`` is six f64, ``child`` is the u32 index of a node,
+``children`` is a u32 count followed by indices and ``envelope`` is either
+0 (derived) or 1 followed by a node index, a factor and an offset (f64).
+An ``Instanced`` node stores the u32 count of its copies, their affines
+and, if flagged, one style per copy. Name atoms are tagged (u8) and
+limited to these primitive types and tuples of them, so loading never
+runs code from the data.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import IO, Any, Dict, List, Tuple
+
+from colour import Color
+
+from chalk.envelope import DiagramEnvelope
+from chalk.shapes import (
+    ArcSegment,
+    ArrowHead,
+    BufferImage,
+    Circle,
+    Image,
+    Latex,
+    Path,
+    Rect,
+    RegularPolygon,
+    Segment,
+    Spacer,
+    Text,
+)
+from chalk.style import Style, WidthType, color_from_rgb
+from chalk.subdiagram import Name
+from chalk.trail import Located, Trail
+from chalk.transform import P2, V2, Affine
+from chalk.types import Diagram, Shape
+
+MAGIC = b"CHLK"
+VERSION = 1
+
+# Node tags
+EMPTY, PRIMITIVE, COMPOSE, TRANSFORM, STYLE, NAME, INSTANCED = range(7)
+# Shape tags
+(
+    PATH,
+    SPACER,
+    TEXT,
+    LATEX,
+    IMAGE,
+    BUFFER,
+    ARROWHEAD,
+    CIRCLE,
+    RECT,
+    POLYGON,
+) = range(10)
+# Segment tags
+SEGMENT, ARC = range(2)
+# Name atom tags
+NONE, BOOL, INT, FLOAT, STR, TUPLE = range(6)
+
+U8 = struct.Struct("<B")
+U32 = struct.Struct("<I")
+I64 = struct.Struct("<q")
+F64 = struct.Struct("<d")
+F64x2 = struct.Struct("<2d")
+F64x3 = struct.Struct("<3d")
+F64x6 = struct.Struct("<6d")
+F64x8 = struct.Struct("<8d")
+
+
+def _children(d: Diagram) -> List[Diagram]:
+    "The nodes a node refers to, which must be written before it."
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Compose,
+        Instanced,
+        Primitive,
+    )
+
+    if isinstance(d, Primitive):
+        if isinstance(d.shape, ArrowHead):
+            return [d.shape.arrow_shape]
+        return []
+    if isinstance(d, Compose):
+        if isinstance(d.envelope, DiagramEnvelope):
+            return [d.envelope.diagram, *d.diagrams]
+        return list(d.diagrams)
+    if isinstance(d, (ApplyTransform, ApplyStyle, ApplyName, Instanced)):
+        return [d.diagram]
+    return []
+
+
+class Writer:
+    def __init__(self) -> None:
+        self.out = bytearray()
+        self.index: Dict[int, int] = {}
+
+    def u8(self, x: int) -> None:
+        self.out += U8.pack(x)
+
+    def u32(self, x: int) -> None:
+        self.out += U32.pack(x)
+
+    def f64(self, x: float) -> None:
+        self.out += F64.pack(x)
+
+    def string(self, s: str) -> None:
+        data = s.encode()
+        self.u32(len(data))
+        self.out += data
+
+    def blob(self, data: Any) -> None:
+        data = memoryview(data).cast("B")
+        self.u32(len(data))
+        self.out += data
+
+    def ref(self, d: Diagram) -> None:
+        self.u32(self.index[id(d)])
+
+    def affine(self, t: Affine) -> None:
+        self.out += F64x6.pack(*t[:6])
+
+    def color(self, c: Color) -> None:
+        self.out += F64x3.pack(*c.rgb)
+
+    def style(self, style: Style) -> None:
+        values = [
+            style.line_width_,
+            style.line_color_,
+            style.fill_color_,
+            style.fill_opacity_,
+            style.dashing_,
+            style.output_size,
+        ]
+        self.u8(sum(1 << i for i, v in enumerate(values) if v is not None))
+        if style.line_width_ is not None:
+            self.u8(style.line_width_[0].value)
+            self.f64(style.line_width_[1])
+        if style.line_color_ is not None:
+            self.color(style.line_color_)
+        if style.fill_color_ is not None:
+            self.color(style.fill_color_)
+        if style.fill_opacity_ is not None:
+            self.f64(style.fill_opacity_)
+        if style.dashing_ is not None:
+            strokes, offset = style.dashing_
+            self.u32(len(strokes))
+            for x in strokes:
+                self.f64(x)
+            self.f64(offset)
+        if style.output_size is not None:
+            self.f64(style.output_size)
+
+    def atom(self, a: Any) -> None:
+        if a is None:
+            self.u8(NONE)
+        elif type(a) is bool:
+            self.u8(BOOL)
+            self.u8(a)
+        elif type(a) is int and -(1 << 63) <= a < 1 << 63:
+            self.u8(INT)
+            self.out += I64.pack(a)
+        elif type(a) is float:
+            self.u8(FLOAT)
+            self.f64(a)
+        elif type(a) is str:
+            self.u8(STR)
+            self.string(a)
+        elif type(a) is tuple:
+            self.u8(TUPLE)
+            self.u32(len(a))
+            for x in a:
+                self.atom(x)
+        else:
+            raise ValueError(f"Can't serialize name atom {a!r}")
+
+    def shape(self, shape: Shape) -> None:
+        if isinstance(shape, Path):
+            self.u8(PATH)
+            self.u32(len(shape.loc_trails))
+            for loc_trail in shape.loc_trails:
+                self.out += F64x2.pack(*loc_trail.location)
+                trail = loc_trail.trail
+                self.u8(trail.closed)
+                self.u32(len(trail.segments))
+                for seg in trail.segments:
+                    if isinstance(seg, ArcSegment):
+                        self.u8(ARC)
+                        self.out += F64x8.pack(
+                            seg.angle, seg.dangle, *seg.t[:6]
+                        )
+                    else:
+                        self.u8(SEGMENT)
+                        self.out += F64x2.pack(*seg.offset)
+        elif isinstance(shape, Circle):
+            self.u8(CIRCLE)
+            self.f64(shape.radius)
+        elif isinstance(shape, Rect):
+            self.u8(RECT)
+            self.out += F64x2.pack(shape.width, shape.height)
+        elif isinstance(shape, RegularPolygon):
+            self.u8(POLYGON)
+            self.u32(shape.sides)
+            self.f64(shape.side_length)
+        elif isinstance(shape, Spacer):
+            self.u8(SPACER)
+            self.out += F64x2.pack(shape.width, shape.height)
+        elif isinstance(shape, Text):
+            self.u8(TEXT)
+            self.string(shape.text)
+            self.f64(
+                float("nan") if shape.font_size is None else shape.font_size
+            )
+        elif isinstance(shape, Latex):
+            self.u8(LATEX)
+            self.string(shape.text)
+        elif isinstance(shape, BufferImage):
+            self.u8(BUFFER)
+            self.u32(shape.width)
+            self.u32(shape.height)
+            self.u32(shape.stride)
+            self.blob(shape.data)
+        elif isinstance(shape, Image):
+            self.u8(IMAGE)
+            self.string(shape.local_path)
+            self.string("" if shape.url_path is None else shape.url_path)
+            self.u8(shape.url_path is not None)
+        elif isinstance(shape, ArrowHead):
+            self.u8(ARROWHEAD)
+            self.ref(shape.arrow_shape)
+        else:
+            raise ValueError(f"Can't serialize shape {type(shape).__name__}")
+
+    def node(self, d: Diagram) -> None:
+        from chalk.core import (
+            ApplyName,
+            ApplyStyle,
+            ApplyTransform,
+            Compose,
+            Empty,
+            Instanced,
+            Primitive,
+        )
+
+        if isinstance(d, Primitive):
+            self.u8(PRIMITIVE)
+            self.affine(d.transform)
+            self.style(d.style)
+            self.shape(d.shape)
+        elif isinstance(d, Compose):
+            self.u8(COMPOSE)
+            if d.envelope is None:
+                self.u8(0)
+            elif isinstance(d.envelope, DiagramEnvelope):
+                self.u8(1)
+                self.ref(d.envelope.diagram)
+                self.f64(d.envelope.factor)
+                self.f64(d.envelope.offset)
+            else:
+                raise ValueError(
+                    "Can't serialize an envelope given as a function"
+                )
+            self.u32(len(d.diagrams))
+            for child in d.diagrams:
+                self.ref(child)
+        elif isinstance(d, ApplyTransform):
+            self.u8(TRANSFORM)
+            self.affine(d.transform)
+            self.ref(d.diagram)
+        elif isinstance(d, ApplyStyle):
+            self.u8(STYLE)
+            self.style(d.style)
+            self.ref(d.diagram)
+        elif isinstance(d, ApplyName):
+            self.u8(NAME)
+            # Names are usually `Name`s, but plain atoms are accepted too.
+            dname: Any = d.dname
+            if isinstance(dname, Name):
+                self.u8(1)
+                self.u32(len(dname.atomic_names))
+                for a in dname.atomic_names:
+                    self.atom(a)
+            else:
+                self.u8(0)
+                self.atom(dname)
+            self.ref(d.diagram)
+        elif isinstance(d, Instanced):
+            self.u8(INSTANCED)
+            self.ref(d.diagram)
+            self.u32(len(d.transforms))
+            for t in d.transforms:
+                self.affine(t)
+            self.u8(d.styles is not None)
+            for style in d.styles or []:
+                self.style(style)
+        else:
+            assert isinstance(d, Empty), f"Unknown node {type(d).__name__}"
+            self.u8(EMPTY)
+
+    def diagram(self, root: Diagram) -> bytes:
+        # Post-order over the distinct nodes, without recursion.
+        order: List[Diagram] = []
+        stack: List[Tuple[Diagram, bool]] = [(root, False)]
+        started = set()
+        while stack:
+            d, done = stack.pop()
+            if done:
+                self.index[id(d)] = len(order)
+                order.append(d)
+                continue
+            if id(d) in started:
+                continue
+            started.add(id(d))
+            stack.append((d, True))
+            for child in reversed(_children(d)):
+                if id(child) not in started:
+                    stack.append((child, False))
+        header = MAGIC + U8.pack(VERSION) + U32.pack(len(order))
+        self.out += header
+        for d in order:
+            self.node(d)
+        return bytes(self.out)
+
+
+class Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.pos = 0
+        self.nodes: List[Diagram] = []
+
+    def read(self, fmt: struct.Struct) -> Tuple[Any, ...]:
+        values = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def u8(self) -> int:
+        x: int = self.data[self.pos]
+        self.pos += 1
+        return x
+
+    def u32(self) -> int:
+        return int(self.read(U32)[0])
+
+    def f64(self) -> float:
+        return float(self.read(F64)[0])
+
+    def string(self) -> str:
+        return bytes(self.blob()).decode()
+
+    def blob(self) -> memoryview:
+        n = self.u32()
+        self.pos += n
+        return self.data[self.pos - n : self.pos]
+
+    def ref(self) -> Diagram:
+        return self.nodes[self.u32()]
+
+    def affine(self) -> Affine:
+        return Affine(*self.read(F64x6))
+
+    def color(self) -> Color:
+        return color_from_rgb(self.read(F64x3))  # type: ignore
+
+    def style(self) -> Style:
+        mask = self.u8()
+        style = Style()
+        if mask & 1:
+            kind = WidthType(self.u8())
+            style.line_width_ = (kind, self.f64())
+        if mask & 2:
+            style.line_color_ = self.color()
+        if mask & 4:
+            style.fill_color_ = self.color()
+        if mask & 8:
+            style.fill_opacity_ = self.f64()
+        if mask & 16:
+            strokes = [self.f64() for _ in range(self.u32())]
+            style.dashing_ = (strokes, self.f64())
+        if mask & 32:
+            style.output_size = self.f64()
+        return style
+
+    def atom(self) -> Any:
+        tag = self.u8()
+        if tag == NONE:
+            return None
+        if tag == BOOL:
+            return bool(self.u8())
+        if tag == INT:
+            return self.read(I64)[0]
+        if tag == FLOAT:
+            return self.f64()
+        if tag == STR:
+            return self.string()
+        if tag == TUPLE:
+            return tuple(self.atom() for _ in range(self.u32()))
+        raise ValueError(f"Unknown name atom tag {tag}")
+
+    def arc(self) -> ArcSegment:
+        angle, dangle, *t = self.read(F64x8)
+        return ArcSegment.normalized(angle, dangle, Affine(*t))
+
+    def shape(self) -> Shape:
+        tag = self.u8()
+        if tag == PATH:
+            loc_trails = []
+            for _ in range(self.u32()):
+                location = P2(*self.read(F64x2))
+                closed = bool(self.u8())
+                segments: List[Any] = []
+                for _ in range(self.u32()):
+                    if self.u8() == ARC:
+                        segments.append(self.arc())
+                    else:
+                        segments.append(Segment(V2(*self.read(F64x2))))
+                loc_trails.append(Located(Trail(segments, closed), location))
+            return Path(loc_trails)
+        if tag == CIRCLE:
+            return Circle(self.f64())
+        if tag == RECT:
+            return Rect(*self.read(F64x2))
+        if tag == POLYGON:
+            sides = self.u32()
+            return RegularPolygon(sides, self.f64())
+        if tag == SPACER:
+            return Spacer(*self.read(F64x2))
+        if tag == TEXT:
+            text = self.string()
+            size = self.f64()
+            return Text(text, None if size != size else size)
+        if tag == LATEX:
+            return Latex(self.string())
+        if tag == BUFFER:
+            width, height, stride = self.u32(), self.u32(), self.u32()
+            # Cairo draws from writable buffers only.
+            data = bytearray(self.blob())
+            return BufferImage(data, width, height, stride)
+        if tag == IMAGE:
+            local_path, url_path = self.string(), self.string()
+            return Image(local_path, url_path if self.u8() else None)
+        if tag == ARROWHEAD:
+            return ArrowHead(self.ref())
+        raise ValueError(f"Unknown shape tag {tag}")
+
+    def node(self) -> Diagram:
+        from chalk.core import (
+            ApplyName,
+            ApplyStyle,
+            ApplyTransform,
+            Compose,
+            Empty,
+            Instanced,
+            Primitive,
+        )
+
+        tag = self.u8()
+        if tag == PRIMITIVE:
+            transform = self.affine()
+            style = self.style()
+            return Primitive(self.shape(), style, transform)
+        if tag == COMPOSE:
+            envelope = None
+            if self.u8():
+                source = self.ref()
+                factor, offset = self.read(F64x2)
+                envelope = DiagramEnvelope(source, factor, offset)
+            children = [self.ref() for _ in range(self.u32())]
+            return Compose(envelope, children)
+        if tag == TRANSFORM:
+            return ApplyTransform(self.affine(), self.ref())
+        if tag == STYLE:
+            return ApplyStyle(self.style(), self.ref())
+        if tag == NAME:
+            if self.u8():
+                name = Name(None)
+                atoms = [self.atom() for _ in range(self.u32())]
+                name.atomic_names = tuple(atoms)
+                return ApplyName(name, self.ref())
+            return ApplyName(self.atom(), self.ref())
+        if tag == INSTANCED:
+            diagram = self.ref()
+            transforms = [self.affine() for _ in range(self.u32())]
+            styles = None
+            if self.u8():
+                styles = [self.style() for _ in transforms]
+            return Instanced(diagram, transforms, styles)
+        if tag == EMPTY:
+            return Empty()
+        raise ValueError(f"Unknown node tag {tag}")
+
+    def diagram(self) -> Diagram:
+        if bytes(self.data[:4]) != MAGIC:
+            raise ValueError("Not a serialized chalk diagram")
+        self.pos = 4
+        version = self.u8()
+        if version != VERSION:
+            raise ValueError(f"Unsupported serialization version {version}")
+        for _ in range(self.u32()):
+            self.nodes.append(self.node())
+        return self.nodes[-1]
+
+
+def dumps(diagram: Diagram) -> bytes:
+    """Serializes a diagram to bytes.
+
+    Envelopes are stored only where they were set explicitly, with
+    ``with_envelope``, ``pad`` or ``frame``; a ``ValueError`` is raised for
+    envelopes given as arbitrary functions.
+
+    Args:
+        diagram (Diagram): Diagram to serialize.
+
+    Returns:
+        bytes: The serialized diagram.
+    """
+    return Writer().diagram(diagram)
+
+
+def loads(data: bytes) -> Diagram:
+    """Rebuilds a diagram serialized with ``dumps``.
+
+    Args:
+        data (bytes): The serialized diagram.
+
+    Returns:
+        Diagram: The diagram.
+    """
+    return Reader(data).diagram()
+
+
+def dump(diagram: Diagram, f: IO[bytes]) -> None:
+    "Serializes a diagram to a binary file."
+    f.write(dumps(diagram))
+
+
+def load(f: IO[bytes]) -> Diagram:
+    "Rebuilds a diagram from a binary file written by ``dump``."
+    return loads(f.read())
@@ -1,8 +1,22 @@
+from functools import lru_cache
 from typing import Optional, Tuple, Union
 
 from chalk.shapes.arc import ArcSegment, arc_seg, arc_seg_angle  # noqa: F401
 from chalk.shapes.arrowheads import ArrowHead, dart  # noqa: F401
-from chalk.shapes.image import Image, from_pil, image  # noqa: F401
+from chalk.shapes.geometric import (  # noqa: F401
+    Circle,
+    Geometric,
+    Rect,
+    RegularPolygon,
+)
+from chalk.shapes.image import (  # noqa: F401
+    BufferImage,
+    Image,
+    from_pil,
+    image,
+    image_from_array,
+    image_from_buffer,
+)
 from chalk.shapes.latex import Latex, latex  # noqa: F401
 from chalk.shapes.path import Path, make_path  # noqa: F401
 from chalk.shapes.segment import Segment, seg  # noqa: F401
@@ -15,6 +29,14 @@ from chalk.types import Diagram
 # Functions mirroring Diagrams.2d.Shapes
 
 
+# The unit circle, built once: ``circle`` returns scaled references to it.
+# Rectangles and polygons are built at their real size, since a small or
+# thin one would scale the prototype by a singular-looking transform.
+@lru_cache(maxsize=None)
+def _unit_circle() -> Diagram:
+    return Circle(1).stroke()
+
+
 def hrule(length: float) -> Diagram:
     return Trail.hrule(length).stroke().center_xy()
 
@@ -41,6 +63,8 @@ def vrule(length: float) -> Diagram:
 def regular_polygon(sides: int, side_length: float) -> Diagram:
     """Draws a regular polygon with given number of sides and given side
     length. The polygon is oriented with one edge parallel to the x-axis."""
+    if side_length > 0:
+        return RegularPolygon(sides, side_length).stroke()
     return Trail.regular_polygon(sides, side_length).centered().stroke()
 
 
@@ -65,6 +89,8 @@ def rectangle(
         Diagrams
     """
     if radius is None:
+        if width > 0 and height > 0:
+            return Rect(width, height).stroke()
         return Trail.rectangle(width, height).stroke().center_xy()
     else:
         return (
@@ -80,7 +106,7 @@ def square(side: float) -> Diagram:
 
 def circle(radius: float) -> Diagram:
     "Draws a circle with the specified ``radius``."
-    return Trail.circle().stroke().center_xy().scale(radius)
+    return _unit_circle().scale(radius)
 
 
 def arc(radius: float, angle0: float, angle1: float) -> Diagram:
@@ -149,10 +175,15 @@ __all__ = [
     "Trail",
     "Path",
     "Image",
+    "BufferImage",
     "ArrowHead",
     "arc_seg",
     "dart",
     "ArcSegment",
+    "Circle",
+    "Geometric",
+    "Rect",
+    "RegularPolygon",
     "from_pil",
     "make_path",
     "arc_seg_angle",
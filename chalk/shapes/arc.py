@@ -6,13 +6,11 @@ from __future__ import annotations
 
 import math
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, List, Union
-
-from planar.py import Ray
+from typing import TYPE_CHECKING, Callable, List, Optional, Union
 
 import chalk.transform as tx
 from chalk.envelope import Envelope
-from chalk.shapes.segment import LocatedSegment, ray_circle_intersection
+from chalk.shapes.segment import LocatedSegment
 from chalk.trace import Trace
 from chalk.transform import P2, V2, from_radians, unit_x, unit_y
 from chalk.types import Enveloped, Traceable, TrailLike
@@ -34,14 +32,43 @@ def is_in_mod_360(x: Degrees, a: Degrees, b: Degrees) -> bool:
     return (x - a) % 360 <= (b - a) % 360
 
 
-@dataclass
+def arc_sector(
+    angle: Degrees, dangle: Degrees
+) -> Callable[[float, float], bool]:
+    """Test of whether a direction ``(x, y)`` points to the arc of the unit
+    circle from ``angle`` to ``angle + dangle``. The ends of the arc are
+    computed once, and the test only uses cross products."""
+    if abs(dangle) >= 360:
+        return lambda x, y: True
+    if dangle < 0:
+        angle, dangle = angle + dangle, -dangle
+    x0, y0 = V2.polar(angle, 1)
+    x1, y1 = V2.polar(angle + dangle, 1)
+    if dangle <= 180:
+        return lambda x, y: x0 * y - y0 * x >= 0 and x * y1 - y * x1 >= 0
+    # Not strictly inside the complementary arc, which is less than half
+    # a turn.
+    return lambda x, y: not (x1 * y - y1 * x > 0 and x * y0 - y * x0 > 0)
+
+
+@dataclass(init=False)
 class LocatedArcSegment(Traceable, Enveloped, tx.Transformable):
     "A ellipse arc represented with the cetner parameterization"
+
+    __slots__ = ("angle", "dangle", "t")
+
     angle: float
     dangle: float
 
     # Ellipse is closed under affine.
-    t: tx.Affine = tx.Affine.identity()
+    t: tx.Affine
+
+    def __init__(
+        self, angle: float, dangle: float, t: tx.Affine = Ident
+    ) -> None:
+        self.angle = angle
+        self.dangle = dangle
+        self.t = t
 
     # Parts to be careful about translation-invariance
     @property
@@ -81,49 +108,50 @@ class LocatedArcSegment(Traceable, Enveloped, tx.Transformable):
         return tx.apply_p2_affine(t2, unit_x).angle
 
     def get_trace(self, t: tx.Affine = Ident) -> Trace:
-        "Trace is done as simple arc and transformed"
-        angle0_deg = self.angle
-        angle1_deg = self.angle + self.dangle
-
-        def f(p: P2, v: V2) -> List[float]:
-            ray = Ray(p, v)
-            return sorted(
-                [
-                    d / v.length
-                    for d in ray_circle_intersection(ray, 1)
-                    if is_in_mod_360(
-                        ((d * v) + P2.polar(self.angle, 1)).angle,
-                        min(angle0_deg, angle1_deg),
-                        max(angle0_deg, angle1_deg),
-                    )
-                ]
-            )
-
-        return Trace(f).apply_transform(self.t)
+        """The ray is mapped to the coordinates of the unit circle, where
+        it is intersected with the circle."""
+        a, b, c, d, e, f = self.t[:6]
+        det = a * e - b * d
+        if det == 0:
+            return Trace.empty()
+        on_arc = arc_sector(self.angle, self.dangle)
+
+        def wrapped(p: P2, v: V2) -> List[float]:
+            # Inverse of the linear part of the arc's transform.
+            x, y = p.x - c, p.y - f
+            px, py = (e * x - b * y) / det, (a * y - d * x) / det
+            vx, vy = (e * v.x - b * v.y) / det, (a * v.y - d * v.x) / det
+            # Roots of |p + s v|² = 1.
+            qa = vx * vx + vy * vy
+            qb = px * vx + py * vy
+            delta = qb * qb - qa * (px * px + py * py - 1)
+            if delta < 0:
+                return []
+            sq = math.sqrt(delta)
+            roots = [(-qb - sq) / qa, (-qb + sq) / qa] if sq else [-qb / qa]
+            return [s for s in roots if on_arc(px + s * vx, py + s * vy)]
+
+        return Trace(wrapped)
 
     def get_envelope(self, t: tx.Affine = Ident) -> Envelope:
-        "Trace is done as simple arc and transformed"
-        angle0_deg = self.angle
-        angle1_deg = self.angle + self.dangle
-
-        v1 = V2.polar(angle0_deg, 1)
-        v2 = V2.polar(angle1_deg, 1)
-
-        def wrapped(d: V2) -> float:
-            is_circle = abs(angle0_deg - angle1_deg) >= 360
-            if is_circle or is_in_mod_360(
-                d.angle,
-                min(angle0_deg, angle1_deg),
-                max(angle0_deg, angle1_deg),
-            ):
-                # Case 1: P2 at arc
-                return 1 / d.length
-            else:
-                # Case 2: P2 outside of arc
-                x: float = max(d.dot(v1), d.dot(v2))
-                return x
-
-        return Envelope(wrapped).apply_transform(self.t)
+        """Support function of the transformed arc: the top of the ellipse
+        in the direction if it is on the arc, otherwise the farthest
+        end."""
+        a, b, c, d, e, f = self.t[:6]
+        on_arc = arc_sector(self.angle, self.dangle)
+        p, q = self.p, self.q
+        px, py, qx, qy = p.x, p.y, q.x, q.y
+
+        def wrapped(v: V2) -> float:
+            x, y = v.x, v.y
+            n = x * x + y * y
+            # The direction in the coordinates of the unit circle.
+            wx, wy = a * x + d * y, b * x + e * y
+            if on_arc(wx, wy):
+                return (c * x + f * y + math.sqrt(wx * wx + wy * wy)) / n
+            return max(px * x + py * y, qx * x + qy * y) / n
+
+        return Envelope(wrapped)
 
     @staticmethod
     def arc_between(
@@ -161,18 +189,63 @@ class LocatedArcSegment(Traceable, Enveloped, tx.Transformable):
         return ret
 
 
-@dataclass
+@dataclass(init=False)
 class ArcSegment(LocatedArcSegment, TrailLike):
-    "A translation invariant version of Arc"
+    """A translation invariant version of Arc. Its transform maps the start
+    of the arc to the origin, and its end point is kept, so that
+    transforming it is just a matrix product."""
+
+    # Not a field: the end point is derived from the others.
+    __slots__ = ("end",)
+
+    def __init__(
+        self, angle: float, dangle: float, t: tx.Affine = Ident
+    ) -> None:
+        start = tx.apply_p2_affine(t, P2.polar(angle, 1))
+        self.angle = angle
+        self.dangle = dangle
+        self.t = tx.Affine.translation(-start) * t
+        self.end = tx.apply_p2_affine(self.t, P2.polar(angle + dangle, 1))
+
+    @staticmethod
+    def normalized(
+        angle: float, dangle: float, t: tx.Affine, end: Optional[P2] = None
+    ) -> ArcSegment:
+        """Builds an arc from a transform that already maps its start to the
+        origin, without normalizing it again."""
+        seg = ArcSegment.__new__(ArcSegment)
+        seg.angle, seg.dangle, seg.t = angle, dangle, t
+        if end is None:
+            end = tx.apply_p2_affine(t, P2.polar(angle + dangle, 1))
+        seg.end = end
+        return seg
 
-    def __post_init__(self) -> None:
-        self.t = tx.Affine.translation(-self.p) * self.t
-        assert self.p.x == 0, self.p
-        assert self.p.y == 0, self.p
+    @property
+    def p(self) -> P2:
+        return ORIGIN
+
+    @property
+    def q(self) -> P2:
+        return self.end
 
     def apply_transform(self, t: tx.Affine) -> ArcSegment:
-        t = tx.remove_translation(t)
-        return ArcSegment(self.angle, self.dangle, t * self.t)
+        # Only the linear part of t applies: the start stays at the origin.
+        a, b, _, d, e, _ = t[:6]
+        a1, b1, c1, d1, e1, f1 = self.t[:6]
+        x, y = self.end
+        return ArcSegment.normalized(
+            self.angle,
+            self.dangle,
+            tx.Affine(
+                a * a1 + b * d1,
+                a * b1 + b * e1,
+                a * c1 + b * f1,
+                d * a1 + e * d1,
+                d * b1 + e * e1,
+                d * c1 + e * f1,
+            ),
+            P2(a * x + b * y, d * x + e * y),
+        )
 
     def to_trail(self) -> Trail:
         from chalk.trail import Trail
@@ -0,0 +1,161 @@
+"""
+Shapes with a closed-form geometry.
+
+Circles, rectangles and regular polygons are common enough to deserve
+their own shapes: their envelopes and traces are computed directly, and
+the backends draw them with their native elements. Ellipses are
+transformed circles.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+
+from chalk.envelope import Envelope
+from chalk.shapes.path import Path
+from chalk.shapes.shape import Shape
+from chalk.trace import Trace
+from chalk.trail import Trail
+from chalk.transform import P2, V2, BoundingBox
+from chalk.visitor import A, ShapeVisitor
+
+Point = Tuple[float, float]
+
+
+def polygon_envelope(vertices: List[Point]) -> Envelope:
+    "Envelope of a polygon: its farthest vertex in each direction."
+
+    def wrapped(d: V2) -> float:
+        x, y = d.x, d.y
+        return max(px * x + py * y for px, py in vertices) / (x * x + y * y)
+
+    return Envelope(wrapped)
+
+
+def polygon_trace(vertices: List[Point]) -> Trace:
+    "Trace of a closed polygon: the ray is intersected with each edge."
+    edges = [
+        (ax, ay, bx - ax, by - ay)
+        for (ax, ay), (bx, by) in zip(vertices, vertices[1:] + vertices[:1])
+    ]
+
+    def f(p: P2, v: V2) -> List[float]:
+        px, py, vx, vy = p.x, p.y, v.x, v.y
+        out = []
+        for ax, ay, ex, ey in edges:
+            denom = vx * ey - vy * ex
+            if denom == 0:
+                continue
+            wx, wy = ax - px, ay - py
+            s = (wx * vy - wy * vx) / denom
+            if 0 <= s <= 1:
+                out.append((wx * ey - wy * ex) / denom)
+        return sorted(out)
+
+    return Trace(f)
+
+
+@dataclass
+class Geometric(Shape):
+    "A closed shape centered at the origin, which can also be a path."
+
+    def to_path(self) -> Path:
+        raise NotImplementedError
+
+
+@dataclass
+class Circle(Geometric):
+    "Circle class."
+
+    radius: float
+
+    def get_bounding_box(self) -> BoundingBox:
+        r = abs(self.radius)
+        return BoundingBox([P2(-r, -r), P2(r, r)])
+
+    def get_envelope(self) -> Envelope:
+        return Envelope.from_circle(abs(self.radius))
+
+    def get_trace(self) -> Trace:
+        r2 = self.radius * self.radius
+
+        def f(p: P2, v: V2) -> List[float]:
+            # Roots of |p + t v|² = r².
+            a = v.x * v.x + v.y * v.y
+            b = p.x * v.x + p.y * v.y
+            c = p.x * p.x + p.y * p.y - r2
+            delta = b * b - a * c
+            if delta < 0:
+                return []
+            if delta == 0:
+                return [-b / a]
+            sq = math.sqrt(delta)
+            return [(-b - sq) / a, (-b + sq) / a]
+
+        return Trace(f)
+
+    def to_path(self) -> Path:
+        return Path([Trail.circle(self.radius).at(P2(self.radius, 0))])
+
+    def accept(self, visitor: ShapeVisitor[A], **kwargs: Any) -> A:
+        return visitor.visit_circle(self, **kwargs)
+
+
+@dataclass
+class Rect(Geometric):
+    "Rectangle class."
+
+    width: float
+    height: float
+
+    def vertices(self) -> List[Point]:
+        w, h = self.width / 2, self.height / 2
+        return [(-w, -h), (w, -h), (w, h), (-w, h)]
+
+    def get_bounding_box(self) -> BoundingBox:
+        w, h = abs(self.width) / 2, abs(self.height) / 2
+        return BoundingBox([P2(-w, -h), P2(w, h)])
+
+    def to_path(self) -> Path:
+        return Path.from_points([P2(*p) for p in self.vertices()], True)
+
+    def accept(self, visitor: ShapeVisitor[A], **kwargs: Any) -> A:
+        return visitor.visit_rect(self, **kwargs)
+
+
+@dataclass
+class RegularPolygon(Geometric):
+    """Regular polygon class. One edge is parallel to the x-axis, and the
+    origin is the center of the polygon."""
+
+    sides: int
+    side_length: float
+
+    def vertices(self) -> List[Point]:
+        s = self.side_length
+        angle = 2 * math.pi / self.sides
+        # Same vertices as ``Trail.regular_polygon(...).centered()``.
+        x, y = -s / 2, s / (2 * math.tan(angle / 2))
+        points = []
+        for i in range(self.sides):
+            points.append((x, y))
+            x += s * math.cos(i * angle)
+            y -= s * math.sin(i * angle)
+        return points
+
+    def get_bounding_box(self) -> BoundingBox:
+        return BoundingBox([P2(*p) for p in self.vertices()])
+
+    def get_envelope(self) -> Envelope:
+        return polygon_envelope(self.vertices())
+
+    def get_trace(self) -> Trace:
+        return polygon_trace(self.vertices())
+
+    def to_path(self) -> Path:
+        return Path.from_points([P2(*p) for p in self.vertices()], True)
+
+    def accept(self, visitor: ShapeVisitor[A], **kwargs: Any) -> A:
+        return visitor.visit_regular_polygon(self, **kwargs)
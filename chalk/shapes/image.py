@@ -1,6 +1,10 @@
-from dataclasses import dataclass
+import os
+import sys
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from functools import lru_cache
 from io import BytesIO
-from typing import Any, Optional
+from typing import Any, Iterator, Optional, Tuple
 
 import PIL
 from PIL import Image as Im
@@ -8,6 +12,38 @@ from PIL import Image as Im
 from chalk.shapes.shape import Shape
 from chalk.transform import P2, BoundingBox, origin
 from chalk.types import Diagram
+from chalk.visitor import A, ShapeVisitor
+
+# CSS pixels per unit, as used by cairosvg when rasterizing.
+SVG_UNITS = {
+    "": 1.0,
+    "px": 1.0,
+    "pt": 4 / 3,
+    "pc": 16.0,
+    "in": 96.0,
+    "cm": 96 / 2.54,
+    "mm": 96 / 25.4,
+}
+# Cairo's ARGB32 pixels are native-endian 32-bit words.
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def to_argb32(im: Im.Image) -> bytes:
+    "The pixels of an RGBA image in Cairo's ARGB32 layout."
+    if LITTLE_ENDIAN:
+        return im.tobytes("raw", "BGRa")
+    r, g, b, a = im.convert("RGBa").split()
+    return PIL.Image.merge("RGBA", (a, r, g, b)).tobytes()
+
+
+def from_argb32(data: Any, size: Tuple[int, int], stride: int) -> Im.Image:
+    "An RGBA image of pixels in Cairo's ARGB32 layout."
+    if LITTLE_ENDIAN:
+        return PIL.Image.frombuffer(
+            "RGBA", size, data, "raw", "BGRa", stride, 1
+        )
+    im = PIL.Image.frombuffer("RGBa", size, data, "raw", "aRGB", stride, 1)
+    return im.convert("RGBA")
 
 
 def from_pil(
@@ -19,32 +55,96 @@ def from_pil(
     format: cairo.Format = cairo.FORMAT_ARGB32
     if "A" not in im.getbands():
         im.putalpha(int(alpha * 256.0))  # type: ignore
-    arr = bytearray(im.tobytes("raw", "BGRa"))
+    arr = bytearray(to_argb32(im))
     surface = cairo.ImageSurface.create_for_data(
         arr, format, im.width, im.height  # type: ignore
     )
     return surface
 
 
+def _svg_length(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    value = value.strip()
+    unit = value.lstrip("0123456789.+-eE")
+    number = value[: len(value) - len(unit)]
+    if unit not in SVG_UNITS or not number:
+        return None
+    return float(number) * SVG_UNITS[unit]
+
+
+def svg_size(local_path: str) -> Optional[Tuple[int, int]]:
+    """Reads the size of an SVG file from the attributes of its root element,
+    without rasterizing it. Returns ``None`` if the size cannot be
+    determined this way (for example, for percentage sizes)."""
+    _, root = next(ET.iterparse(local_path, events=("start",)))
+    width = _svg_length(root.get("width"))
+    height = _svg_length(root.get("height"))
+    if width is None or height is None:
+        view_box = root.get("viewBox")
+        if view_box is None:
+            return None
+        _, _, vw, vh = map(float, view_box.replace(",", " ").split())
+        width = vw if width is None else width
+        height = vh if height is None else height
+    return int(width), int(height)
+
+
+@lru_cache(maxsize=32)
+def _decode(local_path: str, mtime: int) -> Im.Image:
+    if local_path.endswith("svg"):
+        import cairosvg
+
+        out = BytesIO()
+        cairosvg.svg2png(url=local_path, write_to=out)
+        im = PIL.Image.open(out)
+    else:
+        im = PIL.Image.open(local_path)
+    im.load()
+    return im
+
+
+@lru_cache(maxsize=32)
+def _surface(local_path: str, mtime: int) -> Any:
+    return from_pil(_decode(local_path, mtime).copy())
+
+
 @dataclass
 class Image(Shape):
-    """Image class."""
+    """Image class.
+
+    Only the size of the image is read on construction; the pixels are
+    decoded when the image is first rendered. Decoded images and Cairo
+    surfaces are cached per file (path and modification time) and shared
+    by all the shapes that use it.
+    """
 
     local_path: str
     url_path: Optional[str]
 
     def __post_init__(self) -> None:
+        size = None
         if self.local_path.endswith("svg"):
-            import cairosvg
-
-            out = BytesIO()
-            cairosvg.svg2png(url=self.local_path, write_to=out)
+            size = svg_size(self.local_path)
         else:
-            out = open(self.local_path, "rb")  # type:ignore
+            with PIL.Image.open(self.local_path) as im:
+                size = im.size
+        if size is None:
+            size = self.im.size
+        self.width, self.height = size
 
-        self.im = PIL.Image.open(out)
-        self.height = self.im.height
-        self.width = self.im.width
+    @property
+    def mtime(self) -> int:
+        return os.stat(self.local_path).st_mtime_ns
+
+    @property
+    def im(self) -> Im.Image:
+        "The decoded image."
+        return _decode(self.local_path, self.mtime)
+
+    def surface(self) -> Any:
+        "The Cairo surface of the image."
+        return _surface(self.local_path, self.mtime)
 
     def get_bounding_box(self) -> BoundingBox:
         left = origin.x - self.width / 2
@@ -53,8 +153,106 @@ class Image(Shape):
         br = P2(left + self.width, top + self.height)
         return BoundingBox([tl, br])
 
+    def accept(self, visitor: ShapeVisitor[A], **kwargs: Any) -> A:
+        return visitor.visit_image(self, **kwargs)
+
+
+@dataclass
+class BufferImage(Image):
+    """Image backed by a pixel buffer in Cairo's ARGB32 layout
+    (premultiplied alpha, native-endian 32-bit pixels, that is, BGRA bytes
+    on little-endian machines and ARGB bytes on big-endian ones).
+
+    The buffer is never copied: the Cairo backend draws straight from it and
+    the SVG backend streams it out as base64-encoded PNG. Any object that
+    supports the buffer protocol can be used, for example a NumPy array or a
+    ``numpy.memmap`` / ``mmap.mmap`` of a raw file. Cairo needs a writable
+    buffer; map read-only files in copy-on-write mode (``mode="c"``).
+    """
+
+    local_path: str = field(default="", init=False)
+    url_path: Optional[str] = field(default=None, init=False)
+    data: Any
+    width: int
+    height: int
+    stride: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.stride:
+            self.stride = 4 * self.width
+        self.data = memoryview(self.data).cast("B")
+        if len(self.data) < self.stride * self.height:
+            raise ValueError("Buffer is smaller than stride × height")
+
+    def __reduce__(self) -> Any:
+        # Pickling copies the pixels, into a writable buffer.
+        data = bytearray(self.data)
+        return (BufferImage, (data, self.width, self.height, self.stride))
+
+    @property
+    def im(self) -> Im.Image:
+        return from_argb32(self.data, (self.width, self.height), self.stride)
+
+    def surface(self) -> Any:
+        import cairo
+
+        return cairo.ImageSurface.create_for_data(
+            self.data,
+            cairo.FORMAT_ARGB32,
+            self.width,
+            self.height,
+            self.stride,
+        )
+
+    def rgba_rows(self, band: int = 64) -> Iterator[bytes]:
+        "Yields the pixels as straight (not premultiplied) RGBA scanlines."
+        for top in range(0, self.height, band):
+            rows = min(band, self.height - top)
+            start = top * self.stride
+            chunk = self.data[start : start + rows * self.stride]
+            yield from_argb32(chunk, (self.width, rows), self.stride).tobytes()
+
 
 def image(local_path: str, url_path: Optional[str]) -> Diagram:
     from chalk.core import Primitive
 
     return Primitive.from_shape(Image(local_path, url_path))
+
+
+def image_from_buffer(
+    data: Any, width: int, height: int, stride: int = 0
+) -> Diagram:
+    """Creates an image from a raw ARGB32 pixel buffer without copying it.
+
+    Args:
+        data (Any): Object supporting the buffer protocol.
+        width (int): Width in pixels.
+        height (int): Height in pixels.
+        stride (int): Bytes per row. Defaults to ``4 * width``.
+
+    Returns:
+        Diagram
+    """
+    from chalk.core import Primitive
+
+    return Primitive.from_shape(BufferImage(data, width, height, stride))
+
+
+def image_from_array(array: Any) -> Diagram:
+    """Creates an image from a C-contiguous array in Cairo's ARGB32 layout,
+    either of shape ``(height, width, 4)`` with ``uint8`` entries in native
+    byte order (BGRA on little-endian machines) or of shape
+    ``(height, width)`` with ``uint32`` entries.
+
+    Args:
+        array (Any): A NumPy array (or ``numpy.memmap``).
+
+    Returns:
+        Diagram
+    """
+    height, width = array.shape[:2]
+    if array.strides[1] != 4 or array.itemsize * array.size != 4 * (
+        width * height
+    ):
+        raise ValueError("Expected an array of 32-bit ARGB pixels")
+    return image_from_buffer(array, width, height, array.strides[0])
@@ -1,11 +1,141 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
 
 from chalk.shapes.shape import Shape
 from chalk.transform import P2, BoundingBox, origin
 from chalk.types import Diagram
 from chalk.visitor import A, ShapeVisitor
 
+# Compiled snippets, indexed by their source: (width, height, svg content).
+# The least recently used ones are dropped beyond `CACHE_SIZE`.
+Compiled = Tuple[float, float, str]
+CACHE_SIZE = 1024
+_compiled: "OrderedDict[str, Compiled]" = OrderedDict()
+
+# Snippets waiting to be compiled; `None` when not inside a `batch` block.
+_pending: Optional[List[str]] = None
+# Pool size of the open `batch` block.
+_workers: Optional[int] = None
+
+
+def _compile(text: str) -> Compiled:
+    """Compiles a single snippet with ``latextools``. This function runs in
+    the worker processes, so it only depends on its argument."""
+    # Need to install latextools for this to run.
+    import latextools
+
+    # Border ensures no cropping.
+    latex_eq = latextools.render_snippet(
+        f"{text}",
+        commands=[latextools.cmd.all_math],
+        config=latextools.DocumentConfig(
+            "standalone", {"crop=true,border=0.1cm"}
+        ),
+    )
+    eq = latex_eq.as_svg()
+    eq_lines = eq.content.split("\n")
+    content = "<g>\n" + "\n".join(eq_lines[2:-2]) + "\n</g>"
+
+    # Undo scaling done by latextools
+    # https://github.com/cduck/latextools/blob/caa15da02d88e5a4c82eb06f8fadbe48abd7ad2f/latextools/convert.py#L131
+    width = eq.width * 3 / 4
+    height = eq.height * 3 / 4
+    return width, height, content
+
+
+def _store(text: str, compiled: Compiled) -> None:
+    width, height, content = compiled
+    # From latextools Ensures no clash between multiple math statements
+    id_prefix = f"embed-{hash(content)}-"
+    content = (
+        content.replace('id="', f'id="{id_prefix}')
+        .replace('="url(#', f'="url(#{id_prefix}')
+        .replace('xlink:href="#', f'href="#{id_prefix}')
+    )
+    _compiled[text] = (width, height, content)
+    _compiled.move_to_end(text)
+    while len(_compiled) > CACHE_SIZE:
+        _compiled.popitem(last=False)
+
+
+def clear_cache() -> None:
+    "Forgets all the compiled snippets."
+    _compiled.clear()
+
+
+def compile_snippets(
+    texts: Iterable[str], workers: Optional[int] = None
+) -> None:
+    """Compiles the given snippets concurrently and caches the results.
+
+    Snippets that were already compiled are skipped. Each ``latex`` run is
+    an independent process, so the snippets are spread over a process pool.
+
+    Args:
+        texts (Iterable[str]): LaTeX snippets.
+        workers (Optional[int]): Size of the process pool. Defaults to the
+            number of processors.
+    """
+    todo = list(dict.fromkeys(t for t in texts if t not in _compiled))
+    if not todo:
+        return
+    if len(todo) == 1 or workers == 1:
+        for text in todo:
+            _store(text, _compile(text))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for text, compiled in zip(todo, executor.map(_compile, todo)):
+            _store(text, compiled)
+
+
+def resolve_pending(workers: Optional[int] = None) -> None:
+    """Compiles all the placeholders created inside an open ``batch``
+    block. Rendering calls this, so placeholders are always resolved
+    before they are drawn."""
+    if _pending:
+        texts = list(_pending)
+        _pending.clear()
+        compile_snippets(texts, workers or _workers)
+
+
+@contextmanager
+def batch(workers: Optional[int] = None) -> Iterator[None]:
+    """Defers the compilation of the ``Latex`` shapes built inside the block
+    and compiles all of them concurrently when the block exits.
+
+    Usage:
+
+        ```python
+        from chalk import latex
+        from chalk.shapes.latex import batch
+
+        with batch():
+            labels = [latex(f"$x_{{{i}}}$") for i in range(100)]
+        ```
+
+    Args:
+        workers (Optional[int]): Size of the process pool. Defaults to the
+            number of processors.
+
+    Yields:
+        None
+    """
+    global _pending, _workers
+    outer = _pending
+    if outer is None:
+        _pending, _workers = [], workers
+    try:
+        yield
+    finally:
+        if outer is None:
+            try:
+                resolve_pending()
+            finally:
+                _pending, _workers = None, None
+
 
 @dataclass
 class Latex(Shape):
@@ -14,34 +144,34 @@ class Latex(Shape):
     text: str
 
     def __post_init__(self) -> None:
-        # Need to install latextools for this to run.
-        import latextools
-
-        # Border ensures no cropping.
-        latex_eq = latextools.render_snippet(
-            f"{self.text}",
-            commands=[latextools.cmd.all_math],
-            config=latextools.DocumentConfig(
-                "standalone", {"crop=true,border=0.1cm"}
-            ),
-        )
-        self.eq = latex_eq.as_svg()
-        eq_lines = self.eq.content.split("\n")
-        c = "<g>\n" + "\n".join(eq_lines[2:-2]) + "\n</g>"
-
-        # Undo scaling done by latextools
-        # https://github.com/cduck/latextools/blob/caa15da02d88e5a4c82eb06f8fadbe48abd7ad2f/latextools/convert.py#L131
-        self.width = self.eq.width * 3 / 4
-        self.height = self.eq.height * 3 / 4
-        self.content = c
-
-        # From latextools Ensures no clash between multiple math statements
-        id_prefix = f"embed-{hash(self.content)}-"
-        self.content = (
-            self.content.replace('id="', f'id="{id_prefix}')
-            .replace('="url(#', f'="url(#{id_prefix}')
-            .replace('xlink:href="#', f'href="#{id_prefix}')
-        )
+        if self.text in _compiled:
+            return
+        if _pending is not None:
+            # Placeholder: compiled when the enclosing batch exits.
+            _pending.append(self.text)
+        else:
+            _store(self.text, _compile(self.text))
+
+    def _resolve(self) -> Compiled:
+        if self.text not in _compiled and _pending:
+            # Needed inside a batch: compile everything deferred so far.
+            resolve_pending()
+        if self.text not in _compiled:
+            _store(self.text, _compile(self.text))
+        _compiled.move_to_end(self.text)
+        return _compiled[self.text]
+
+    @property
+    def width(self) -> float:
+        return self._resolve()[0]
+
+    @property
+    def height(self) -> float:
+        return self._resolve()[1]
+
+    @property
+    def content(self) -> str:
+        return self._resolve()[2]
 
     def get_bounding_box(self) -> BoundingBox:
         eps = 1e-4
@@ -5,7 +5,6 @@ from typing import Any
 
 from chalk.envelope import Envelope
 from chalk.trace import Trace
-from chalk.trail import Trail
 from chalk.transform import P2, BoundingBox, origin
 from chalk.types import Diagram
 from chalk.visitor import A, ShapeVisitor
@@ -22,13 +21,7 @@ class Shape:
         return Envelope.from_bounding_box(self.get_bounding_box())
 
     def get_trace(self) -> Trace:
-        box = self.get_bounding_box()
-        return (
-            Trail.rectangle(box.width, box.height)
-            .stroke()
-            .center_xy()
-            .get_trace()
-        )
+        return Trace.from_bounding_box(self.get_bounding_box())
 
     def accept(self, visitor: ShapeVisitor[A], **kwargs: Any) -> A:
         raise NotImplementedError
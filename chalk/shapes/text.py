@@ -1,11 +1,112 @@
 from dataclasses import dataclass
-from typing import Any, Optional
+from functools import lru_cache
+from typing import Any, Optional, Protocol, Tuple
 
 from chalk.shapes.shape import Shape
 from chalk.transform import P2, BoundingBox, origin
 from chalk.types import Diagram
 from chalk.visitor import A, ShapeVisitor
 
+FONT = "sans-serif"
+# Cairo's default font size, used when a text has no size.
+DEFAULT_FONT_SIZE = 10.0
+
+# Advance widths of the printable ASCII characters (32 to 126) in Helvetica,
+# in thousandths of the font size (from the Adobe font metrics files).
+HELVETICA_WIDTHS = (
+    [278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333]
+    + [278, 278, 556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278]
+    + [584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778, 722, 278]
+    + [500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944]
+    + [667, 667, 611, 278, 278, 278, 469, 556, 333, 556, 556, 500, 556, 556]
+    + [278, 556, 556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500]
+    + [278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584]
+)
+HELVETICA_CAP_HEIGHT = 718
+HELVETICA_DESCENDER = 207
+DESCENDERS = set("gjpqy,;()[]{}|_@$")
+
+
+class TextMetrics(Protocol):
+    def extents(
+        self, text: str, font: str, size: float
+    ) -> Tuple[float, float]:
+        "Returns the width and height of the rendered text."
+        ...
+
+
+class CairoTextMetrics:
+    """Measures text with Cairo, using the fonts installed on the local
+    machine. The extents match the output of the Cairo backend."""
+
+    def __init__(self) -> None:
+        import cairo
+
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+        self.ctx = cairo.Context(surface)
+
+    def extents(
+        self, text: str, font: str, size: float
+    ) -> Tuple[float, float]:
+        self.ctx.select_font_face(font)
+        self.ctx.set_font_size(size)
+        extents = self.ctx.text_extents(text)
+        return extents.width, extents.height
+
+
+class FontMetrics:
+    """Pure-Python approximation of the text extents, based on the
+    Helvetica font metrics. Characters outside of printable ASCII are
+    assumed to have the width of a digit."""
+
+    def extents(
+        self, text: str, font: str, size: float
+    ) -> Tuple[float, float]:
+        width = sum(
+            (
+                HELVETICA_WIDTHS[ord(c) - 32]
+                if 32 <= ord(c) < 127
+                else HELVETICA_WIDTHS[16]
+            )
+            for c in text
+        )
+        height = HELVETICA_CAP_HEIGHT
+        if DESCENDERS.intersection(text):
+            height += HELVETICA_DESCENDER
+        return size * width / 1000, size * height / 1000
+
+
+_metrics: Optional[TextMetrics] = None
+
+
+def set_text_metrics(metrics: Optional[TextMetrics]) -> None:
+    """Sets the provider used to measure text. By default text is not
+    measured and takes no space in the layout.
+
+    Usage:
+
+        ```python
+        from chalk.shapes.text import FontMetrics, set_text_metrics
+
+        set_text_metrics(FontMetrics())
+        ```
+
+    Args:
+        metrics (Optional[TextMetrics]): Text metrics provider, for example
+            ``CairoTextMetrics()`` or ``FontMetrics()``; ``None`` disables
+            text measurement.
+    """
+    global _metrics
+    _metrics = metrics
+    text_extents.cache_clear()
+
+
+@lru_cache(maxsize=4096)
+def text_extents(text: str, font: str, size: float) -> Tuple[float, float]:
+    "Memoized width and height of a text with the current provider."
+    assert _metrics is not None
+    return _metrics.extents(text, font, size)
+
 
 @dataclass
 class Text(Shape):
@@ -15,10 +116,16 @@ class Text(Shape):
     font_size: Optional[float]
 
     def get_bounding_box(self) -> BoundingBox:
-        # Text doesn't have a bounding box since we can't accurately know
-        # its size for all backends.
-        eps = 1e-4
-        self.bb = BoundingBox([origin, origin + P2(eps, eps)])
+        if _metrics is None:
+            # Without a metrics provider we can't accurately know the size
+            # of a text for all backends.
+            eps = 1e-4
+            self.bb = BoundingBox([origin, origin + P2(eps, eps)])
+            return self.bb
+        size = DEFAULT_FONT_SIZE if self.font_size is None else self.font_size
+        width, height = text_extents(self.text, FONT, size)
+        tl = P2(-width / 2, -height / 2)
+        self.bb = BoundingBox([tl, tl + P2(width, height)])
         return self.bb
 
     def accept(self, visitor: ShapeVisitor[A], **kwargs: Any) -> A:
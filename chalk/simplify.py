@@ -0,0 +1,231 @@
+"""
+Level-of-detail simplification of paths.
+
+Runs of straight segments are simplified with the Douglas–Peucker
+algorithm: points closer than the tolerance to the simplified polyline
+are dropped. Arcs are kept as they are. The tolerance is given in the
+coordinates of the diagram being simplified (pixels, when simplifying a
+diagram laid out for rendering) and is mapped to the local coordinates of
+each path through the transformations above it.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from chalk.shapes import Path, Segment
+from chalk.trail import Located, SegmentLike, Trail
+from chalk.transform import V2, Affine
+from chalk.types import Diagram
+from chalk.visitor import DiagramVisitor
+
+if TYPE_CHECKING:
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Compose,
+        Empty,
+        Instanced,
+        Primitive,
+    )
+
+Ident = Affine.identity()
+Point = Tuple[float, float]
+
+
+def simplify_points(points: List[Point], tolerance: float) -> List[Point]:
+    """Douglas–Peucker simplification of a polyline. The end points are
+    always kept.
+
+    Args:
+        points (List[Point]): Vertices of the polyline.
+        tolerance (float): Maximum distance of a dropped vertex to the
+            simplified polyline.
+
+    Returns:
+        List[Point]: The kept vertices.
+    """
+    n = len(points)
+    if n < 3:
+        return points
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    tol2 = tolerance * tolerance
+    # Iterative, so that long polylines don't hit the recursion limit.
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        worst, index = -1.0, first
+        for i in range(first + 1, last):
+            px, py = points[i]
+            # Distance to the segment [a, b].
+            u = 0.0
+            if length2 > 0:
+                u = ((px - ax) * dx + (py - ay) * dy) / length2
+                u = min(1.0, max(0.0, u))
+            ex, ey = px - ax - u * dx, py - ay - u * dy
+            d2 = ex * ex + ey * ey
+            if d2 > worst:
+                worst, index = d2, i
+        if worst > tol2:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_trail(trail: Trail, tolerance: float) -> Trail:
+    "Simplifies the runs of straight segments of a trail."
+    segments: List[SegmentLike] = []
+    run: List[Point] = [(0.0, 0.0)]
+
+    def flush() -> None:
+        kept = simplify_points(run, tolerance)
+        for (ax, ay), (bx, by) in zip(kept, kept[1:]):
+            segments.append(Segment(V2(bx - ax, by - ay)))
+        run[:] = [(0.0, 0.0)]
+
+    for seg in trail.segments:
+        if isinstance(seg, Segment):
+            x, y = run[-1]
+            run.append((x + seg.q.x, y + seg.q.y))
+        else:
+            flush()
+            segments.append(seg)
+    flush()
+    if len(segments) == len(trail.segments):
+        return trail
+    return Trail(segments, trail.closed)
+
+
+def simplify_path(path: Path, tolerance: float) -> Path:
+    "Simplifies the runs of straight segments of all the trails of a path."
+    return Path(
+        [
+            Located(simplify_trail(loc.trail, tolerance), loc.location)
+            for loc in path.loc_trails
+        ]
+    )
+
+
+def max_stretch(t: Affine) -> float:
+    "Largest factor by which the linear part of ``t`` stretches a vector."
+    a, b, _, d, e, _ = t[:6]
+    # Largest singular value of [[a, b], [d, e]].
+    p = (a * a + b * b + d * d + e * e) / 2
+    q = a * e - b * d
+    return math.sqrt(p + math.sqrt(max(0.0, p * p - q * q)))
+
+
+class Simplify(DiagramVisitor[Any, Affine]):
+    """Replaces the paths of a diagram by simplified ones. The
+    transformation ``t`` is accumulated downwards.
+
+    The result only depends on the linear part of ``t``, so subdiagrams
+    that are reused at different places (as in ``d | d``) are simplified
+    once, and unchanged subdiagrams are kept as they are.
+    """
+
+    def __init__(self, tolerance: float):
+        self.tolerance = tolerance
+        self.done: Dict[Tuple[int, float, float, float, float], Diagram] = {}
+
+    def simplify(self, diagram: Diagram, t: Affine) -> Diagram:
+        a, b, _, d, e, _ = t[:6]
+        key = (id(diagram), a, b, d, e)
+        result = self.done.get(key)
+        if result is None:
+            result = self.done[key] = diagram.accept(self, t)
+        return result
+
+    def visit_primitive(
+        self, diagram: Primitive, t: Affine = Ident
+    ) -> Diagram:
+        from chalk.core import Primitive
+
+        shape = diagram.shape
+        if not isinstance(shape, Path):
+            return diagram
+        stretch = max_stretch(t * diagram.transform)
+        if stretch == 0:
+            return diagram
+        path = simplify_path(shape, self.tolerance / stretch)
+        if all(
+            a.trail is b.trail
+            for a, b in zip(path.loc_trails, shape.loc_trails)
+        ):
+            return diagram
+        return Primitive(path, diagram.style, diagram.transform)
+
+    def visit_empty(self, diagram: Empty, t: Affine = Ident) -> Diagram:
+        return diagram
+
+    def visit_compose(self, diagram: Compose, t: Affine = Ident) -> Diagram:
+        from chalk.core import Compose
+
+        children = [self.simplify(d, t) for d in diagram.diagrams]
+        if all(a is b for a, b in zip(children, diagram.diagrams)):
+            return diagram
+        return Compose(diagram.envelope, children)
+
+    def visit_apply_transform(
+        self, diagram: ApplyTransform, t: Affine = Ident
+    ) -> Diagram:
+        from chalk.core import ApplyTransform
+
+        inner = self.simplify(diagram.diagram, t * diagram.transform)
+        if inner is diagram.diagram:
+            return diagram
+        return ApplyTransform(diagram.transform, inner)
+
+    def visit_apply_style(
+        self, diagram: ApplyStyle, t: Affine = Ident
+    ) -> Diagram:
+        from chalk.core import ApplyStyle
+
+        inner = self.simplify(diagram.diagram, t)
+        if inner is diagram.diagram:
+            return diagram
+        return ApplyStyle(diagram.style, inner)
+
+    def visit_apply_name(
+        self, diagram: ApplyName, t: Affine = Ident
+    ) -> Diagram:
+        from chalk.core import ApplyName
+
+        inner = self.simplify(diagram.diagram, t)
+        if inner is diagram.diagram:
+            return diagram
+        return ApplyName(diagram.dname, inner)
+
+    def visit_instanced(
+        self, diagram: Instanced, t: Affine = Ident
+    ) -> Diagram:
+        from chalk.core import Instanced
+
+        # Simplified once for all the copies, for the most magnified one.
+        t_max = max((t * ti for ti in diagram.transforms), key=max_stretch)
+        inner = self.simplify(diagram.diagram, t_max)
+        if inner is diagram.diagram:
+            return diagram
+        return Instanced(inner, diagram.transforms, diagram.styles)
+
+
+def simplify(self: Diagram, tolerance: float) -> Diagram:
+    """Simplifies the paths of the diagram, dropping the vertices that are
+    closer than ``tolerance`` to the simplified outline. Arcs are kept.
+
+    Args:
+        tolerance (float): Maximum deviation, in the coordinates of the
+            diagram.
+
+    Returns:
+        Diagram: The simplified diagram.
+    """
+    return Simplify(tolerance).simplify(self, Ident)
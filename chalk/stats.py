@@ -0,0 +1,133 @@
+"""
+Size statistics of diagrams.
+
+Diagrams are trees whose subtrees are often shared: ``d | d`` holds two
+references to the same node. The statistics are computed in one iterative
+pass over the distinct nodes, so they are cheap even for diagrams whose
+expanded tree is exponentially large, and deep diagrams don't hit the
+recursion limit.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set, Tuple
+
+from chalk.cache import hash_style
+from chalk.shapes import ArcSegment, Path
+from chalk.types import Diagram
+
+
+@dataclass
+class DiagramStats:
+    """Statistics of a diagram.
+
+    Attributes:
+        nodes (Dict[str, int]): Number of distinct nodes of each type
+            (``Primitive``, ``Compose``, ``ApplyTransform``, ...).
+        expanded (int): Number of nodes of the diagram seen as a tree,
+            counting shared subtrees once per reference. This is the number
+            of nodes visited by a traversal of the diagram.
+        depth (int): Maximum depth of the tree (a single node has depth 1).
+        shapes (Dict[str, int]): Number of distinct primitives of each shape
+            type (``Path``, ``Text``, ``Image``, ...).
+        segments (int): Number of straight segments in the distinct paths.
+        arcs (int): Number of arc segments in the distinct paths.
+        styles (int): Number of distinct styles, on primitives and on
+            ``ApplyStyle`` nodes.
+        names (int): Number of named subdiagrams (``ApplyName`` nodes).
+        shared (int): Number of distinct nodes referenced more than once.
+    """
+
+    nodes: Dict[str, int] = field(default_factory=dict)
+    expanded: int = 0
+    depth: int = 0
+    shapes: Dict[str, int] = field(default_factory=dict)
+    segments: int = 0
+    arcs: int = 0
+    styles: int = 0
+    names: int = 0
+    shared: int = 0
+
+
+def stats(self: Diagram) -> DiagramStats:
+    """Computes the size statistics of the diagram.
+
+    Returns:
+        DiagramStats: The statistics.
+    """
+    from chalk.core import (
+        ApplyName,
+        ApplyStyle,
+        ApplyTransform,
+        Compose,
+        Instanced,
+        Primitive,
+    )
+
+    nodes: Counter[str] = Counter()
+    shapes: Counter[str] = Counter()
+    refs: Counter[int] = Counter()
+    styles: Set[bytes] = set()
+    segments = arcs = names = 0
+    # Expanded size and depth of the subtree of each distinct node.
+    sizes: Dict[int, Tuple[int, int]] = {}
+
+    # Post-order traversal: a node is pushed again, marked as done, before
+    # its children, and is summarized once all of them have been.
+    stack: List[Tuple[Diagram, bool]] = [(self, False)]
+    started: Set[int] = set()
+    refs[id(self)] += 1
+    while stack:
+        d, done = stack.pop()
+        if not done and id(d) in started:
+            continue
+        children: Sequence[Diagram] = []
+        if isinstance(d, Compose):
+            children = d.diagrams
+        elif isinstance(d, (ApplyTransform, ApplyStyle, ApplyName, Instanced)):
+            children = [d.diagram]
+        if done:
+            size, depth = 1, 0
+            for child in children:
+                child_size, child_depth = sizes[id(child)]
+                size += child_size
+                depth = max(depth, child_depth)
+            sizes[id(d)] = (size, depth + 1)
+            continue
+
+        started.add(id(d))
+        stack.append((d, True))
+        nodes[type(d).__name__] += 1
+        if isinstance(d, Primitive):
+            shapes[type(d.shape).__name__] += 1
+            styles.add(hash_style(d.style))
+            if isinstance(d.shape, Path):
+                for loc_trail in d.shape.loc_trails:
+                    for seg in loc_trail.trail.segments:
+                        if isinstance(seg, ArcSegment):
+                            arcs += 1
+                        else:
+                            segments += 1
+        elif isinstance(d, ApplyStyle):
+            styles.add(hash_style(d.style))
+        elif isinstance(d, ApplyName):
+            names += 1
+        for child in children:
+            refs[id(child)] += 1
+            if id(child) not in started:
+                stack.append((child, False))
+
+    expanded, depth = sizes[id(self)]
+    return DiagramStats(
+        nodes=dict(nodes),
+        expanded=expanded,
+        depth=depth,
+        shapes=dict(shapes),
+        segments=segments,
+        arcs=arcs,
+        styles=len(styles),
+        names=names,
+        shared=sum(1 for n in refs.values() if n > 1),
+    )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copyreg
 from dataclasses import dataclass, fields
 from enum import Enum, auto
 from typing import Any, Dict, List, Optional, Tuple
@@ -45,6 +46,13 @@ class WidthType(Enum):
     NORMALIZED = auto()
 
 
+def color_from_rgb(rgb: Tuple[float, float, float]) -> Color:
+    return Color(rgb=rgb)
+
+
+# Colors hold a lambda, so they can't be pickled as they are.
+copyreg.pickle(Color, lambda c: (color_from_rgb, (c.rgb,)))
+
 LC = Color("black")
 LW = 0.1
 
@@ -87,6 +95,22 @@ class Style(Stylable):
             )
         )
 
+    def cairo_line_width(self) -> float:
+        "Line width in device units, as drawn by the Cairo backend."
+        # Set by observation
+        assert self.output_size is not None
+        normalizer = self.output_size * (15 / 500)
+        if self.line_width_ is None:
+            lw = LW * normalizer
+        else:
+            lwt, lw = self.line_width_
+            if lwt == WidthType.NORMALIZED:
+                lw = lw * normalizer
+
+            elif lwt == WidthType.LOCAL:
+                lw = lw
+        return lw
+
     def render(self, ctx: PyCairoContext) -> None:
         """Renders the style object.
 
@@ -107,20 +131,8 @@ class Style(Stylable):
             lc = LC
         else:
             lc = self.line_color_
-        # Set by observation
-        assert self.output_size is not None
-        normalizer = self.output_size * (15 / 500)
-        if self.line_width_ is None:
-            lw = LW * normalizer
-        else:
-            lwt, lw = self.line_width_
-            if lwt == WidthType.NORMALIZED:
-                lw = lw * normalizer
-
-            elif lwt == WidthType.LOCAL:
-                lw = lw
         ctx.set_source_rgb(*lc.rgb)
-        ctx.set_line_width(lw)
+        ctx.set_line_width(self.cairo_line_width())
 
         if self.dashing_ is not None:
             ctx.set_dash(self.dashing_[0], self.dashing_[1])
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Callable, List, Optional
+import math
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional
 
 from chalk.monoid import Monoid
 from chalk.transform import (
     P2,
     V2,
     Affine,
+    BoundingBox,
     Transformable,
     apply_affine,
     remove_translation,
@@ -40,6 +42,41 @@ class Trace(Monoid, Transformable):
             + other(point, direction)
         )
 
+    @classmethod
+    def concat(cls, elems: Iterable[Trace]) -> Trace:
+        traces = list(elems)
+        if len(traces) == 1:
+            return traces[0]
+        return Trace(
+            lambda point, direction: [
+                s for trace in traces for s in trace(point, direction)
+            ]
+        )
+
+    @staticmethod
+    def from_bounding_box(box: BoundingBox) -> Trace:
+        """Trace of the boundary of a box: where the ray enters and leaves
+        it, intersecting the slabs between its opposite sides."""
+        x0, y0 = box.min_point
+        x1, y1 = box.max_point
+
+        def f(p: P2, v: V2) -> List[SignedDistance]:
+            t0, t1 = -math.inf, math.inf
+            for lo, hi, q, u in ((x0, x1, p.x, v.x), (y0, y1, p.y, v.y)):
+                if u == 0:
+                    if q < lo or q > hi:
+                        return []
+                    continue
+                a, b = (lo - q) / u, (hi - q) / u
+                if a > b:
+                    a, b = b, a
+                t0, t1 = max(t0, a), min(t1, b)
+            if t0 > t1 or t0 == -math.inf:
+                return []
+            return [t0] if t0 == t1 else [t0, t1]
+
+        return Trace(f)
+
     # Transformable
     def apply_transform(self, t: Affine) -> Trace:
         def wrapped(p: P2, d: V2) -> List[SignedDistance]:
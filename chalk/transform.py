@@ -1,3 +1,4 @@
+import copyreg
 import math
 from typing import Any
 
@@ -38,6 +39,8 @@ def apply_affine(aff: Affine, x: Any) -> Any:
 class Transformable:
     """Transformable class."""
 
+    __slots__ = ()
+
     def apply_transform(self, t: Affine) -> Self:  # type: ignore[empty-body]
         pass
 
@@ -111,6 +114,10 @@ Vec2.translate = Transformable.translate  # type: ignore
 Vec2.translate_by = Transformable.translate_by  # type: ignore
 P2 = Point
 
+# The planar types need their coordinates as constructor arguments.
+copyreg.pickle(Vec2, lambda v: (Vec2, (v.x, v.y)))
+copyreg.pickle(Affine, lambda a: (Affine, tuple(a[:6])))
+
 origin = P2(0, 0)
 unit_x = V2(1, 0)
 unit_y = V2(0, 1)
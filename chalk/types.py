@@ -11,6 +11,7 @@ from chalk.transform import P2, V2
 
 if TYPE_CHECKING:
     from chalk.path import Path
+    from chalk.stats import DiagramStats
     from chalk.subdiagram import Name, Subdiagram
     from chalk.trail import Located, Trail
     from chalk.visitor import A, DiagramVisitor, ShapeVisitor
@@ -19,10 +20,14 @@ Ident = tx.Affine.identity()
 
 
 class Enveloped(Protocol):
+    __slots__ = ()
+
     def get_envelope(self) -> Envelope: ...
 
 
 class Traceable(Protocol):
+    __slots__ = ()
+
     def get_trace(self) -> Trace: ...
 
 
@@ -31,6 +36,8 @@ class Shape(Enveloped, Traceable, Protocol):
 
 
 class TrailLike(Protocol):
+    __slots__ = ()
+
     def to_trail(self) -> Trail: ...
 
     def to_path(self, location: P2 = P2(0, 0)) -> Path:
@@ -128,6 +135,9 @@ class Diagram(Enveloped, Traceable, Stylable, tx.Transformable, Monoid):
 
     def get_subdiagram(self, name: Name) -> Optional[Subdiagram]: ...
 
+    def named(self, name: Name) -> Diagram:  # type: ignore[empty-body]
+        ...
+
     def get_sub_map(  # type: ignore[empty-body]
         self, t: tx.Affine = Ident
     ) -> Dict[Name, List[Subdiagram]]: ...
@@ -138,6 +148,17 @@ class Diagram(Enveloped, Traceable, Stylable, tx.Transformable, Monoid):
         f: Callable[[List[Subdiagram], Diagram], Diagram],
     ) -> Diagram: ...
 
+    def stats(self) -> DiagramStats:  # type: ignore[empty-body]
+        ...
+
+    def cull(  # type: ignore[empty-body]
+        self, viewport: tx.BoundingBox, margin: Optional[float] = None
+    ) -> Diagram: ...
+
+    def simplify(  # type: ignore[empty-body]
+        self, tolerance: float
+    ) -> Diagram: ...
+
     def _style(self, style: Style) -> Diagram:  # type: ignore[empty-body]
         ...
 
@@ -152,7 +173,7 @@ class Diagram(Enveloped, Traceable, Stylable, tx.Transformable, Monoid):
     ) -> Diagram: ...
 
     def compose(  # type: ignore[empty-body]
-        self, envelope: Envelope, other: Optional[Diagram] = None
+        self, envelope: Optional[Envelope], other: Optional[Diagram] = None
     ) -> Diagram: ...
 
     def to_list(  # type: ignore[empty-body]
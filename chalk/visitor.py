@@ -10,11 +10,20 @@ if TYPE_CHECKING:
         ApplyTransform,
         Compose,
         Empty,
+        Instanced,
         Primitive,
     )
     from chalk.monoid import Monoid
     from chalk.Path import Path
-    from chalk.shapes import Image, Latex, Spacer, Text
+    from chalk.shapes import (
+        Circle,
+        Image,
+        Latex,
+        Rect,
+        RegularPolygon,
+        Spacer,
+        Text,
+    )
 
     A = TypeVar("A", bound=Monoid)
 else:
@@ -52,6 +61,10 @@ class DiagramVisitor(Generic[A, B]):
         "Defaults to pass over"
         return diagram.diagram.accept(self, arg)
 
+    def visit_instanced(self, diagram: Instanced, arg: B) -> A:
+        "Defaults to the composition of the copies"
+        return diagram.expand().accept(self, arg)
+
 
 C = TypeVar("C")
 
@@ -74,3 +87,12 @@ class ShapeVisitor(Generic[C]):
 
     def visit_image(self, shape: Image) -> C:
         raise NotImplementedError
+
+    def visit_circle(self, shape: Circle) -> C:
+        raise NotImplementedError
+
+    def visit_rect(self, shape: Rect) -> C:
+        raise NotImplementedError
+
+    def visit_regular_polygon(self, shape: RegularPolygon) -> C:
+        raise NotImplementedError
@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+
+import PIL.Image
+from colour import Color
+
+from chalk import Diagram, Name, circle, hcat, square
+from chalk.cache import RenderCache, structural_hash
+from chalk.shapes import image
+
+red = Color("red")
+
+
+def sample(color: Color = red) -> Diagram:
+    return hcat([circle(1).fill_color(color), square(1)], sep=0.5)
+
+
+def test_structural_hash() -> None:
+    assert structural_hash(sample()) == structural_hash(sample())
+    assert structural_hash(sample()) != structural_hash(sample(Color("blue")))
+    assert structural_hash(circle(1)) != structural_hash(circle(1).scale(2))
+    named = circle(1).named(Name("a"))
+    other = circle(1).named(Name("b"))
+    assert structural_hash(named) != structural_hash(other)
+    # Plain atoms are names too.
+    first = circle(1).named("first")  # type: ignore
+    again = circle(1).named("first")  # type: ignore
+    number = circle(1).named(1)  # type: ignore
+    assert structural_hash(first) == structural_hash(again)
+    assert structural_hash(first) != structural_hash(number)
+    assert structural_hash(first) != structural_hash(named)
+
+
+def test_render_cache(tmp_path: Path) -> None:
+    directory = str(tmp_path / "cache")
+    cache = RenderCache(maxsize=1, directory=directory)
+    path1 = str(tmp_path / "a.svg")
+    path2 = str(tmp_path / "b.svg")
+    cache.render(sample(), path1, backend="svg", height=64)
+    cache.render(sample(), path2, backend="svg", height=64)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert open(path1).read() == open(path2).read()
+
+    # Different size options are different renders.
+    cache.render(sample(), path2, backend="svg", height=32)
+    assert cache.misses == 2
+
+    # The on-disk tier is shared by caches using the same directory.
+    other = RenderCache(directory=directory)
+    other.render(sample(), path2, backend="svg", height=64)
+    assert other.hits == 1
+    assert open(path1).read() == open(path2).read()
+
+
+def test_image_changes(tmp_path: Path) -> None:
+    path = tmp_path / "a.png"
+    PIL.Image.new("RGB", (2, 2), (255, 0, 0)).save(path)
+    d = hcat([image(str(path), None), square(1)])
+    before = structural_hash(d)
+    assert structural_hash(d) == before
+    PIL.Image.new("RGB", (2, 2), (0, 0, 255)).save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    # The same diagram, drawn from the new file.
+    assert structural_hash(d) != before
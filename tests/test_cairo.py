@@ -0,0 +1,115 @@
+import math
+from typing import Any, List, Tuple
+
+import pytest
+from colour import Color
+
+from chalk import (
+    V2,
+    Affine,
+    arc_seg,
+    circle,
+    hcat,
+    instance,
+    make_path,
+    square,
+)
+from chalk.backend import cairo
+from chalk.backend.cairo import (
+    ToCairoShape,
+    device_arc,
+    draw_prims,
+    layout,
+    to_prims,
+)
+from chalk.shapes import Path
+from chalk.style import Style
+
+
+class Recorder:
+    "Records the path and drawing calls made on a Cairo context."
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        def record(*args: Any) -> None:
+            self.calls.append((name, args))
+
+        return record
+
+
+def test_batched_paths() -> None:
+    lines = [make_path([(0, 0), (1, 1)]) for _ in range(3)]
+    d = hcat(lines + [square(1).fill_color(Color("red"))])
+    s, width = layout(d, 100)
+    ctx = Recorder()
+    draw_prims(to_prims(s, Style.root(100)), ctx, batch=True)
+    names = [name for name, _ in ctx.calls]
+    # The lines are stroked at once, the filled square on its own.
+    assert names.count("stroke") == 2
+    assert names.count("fill_preserve") == 1
+    assert names.count("move_to") == 4
+    # Points are already in device coordinates.
+    xs = [args[0] for name, args in ctx.calls if name == "line_to"]
+    assert 0 <= min(xs) and max(xs) <= width
+
+
+def test_batched_arcs() -> None:
+    bump = arc_seg(V2(2, 0), 0.5).stroke()
+    d = hcat([circle(1), circle(2).scale_x(2), bump, bump])
+    s, _ = layout(d, 100)
+    ctx = Recorder()
+    draw_prims(to_prims(s, Style.root(100)), ctx, batch=True)
+    names = [name for name, _ in ctx.calls]
+    # The circles, then the arcs, are stroked at once in device coordinates.
+    assert names.count("stroke") == 2
+    assert names.count("curve_to") >= 10
+    assert not {"arc", "arc_negative", "save", "transform"} & set(names)
+
+
+@pytest.mark.parametrize("start,end", [(0.5, 4.0), (1.0, -2.0)])
+def test_device_arc(start: float, end: float) -> None:
+    m = Affine.translation((40, 30)) * Affine.rotation(20)
+    m = m * Affine.scale(V2(500, 500))
+    a, b, c, d, e, f = m[:6]
+
+    def point(angle: float) -> Tuple[float, float]:
+        x, y = math.cos(angle), math.sin(angle)
+        return a * x + b * y + c, d * x + e * y + f
+
+    ctx = Recorder()
+    device_arc(m, start, end, ctx)
+    p = point(start)
+    for name, args in ctx.calls:
+        assert name == "curve_to"
+        for i in range(11):
+            t = i / 10
+            w = [(1 - t) ** 3, 3 * t * (1 - t) ** 2, 3 * t * t * (1 - t), t**3]
+            x = w[0] * p[0] + w[1] * args[0] + w[2] * args[2] + w[3] * args[4]
+            y = w[0] * p[1] + w[1] * args[1] + w[2] * args[3] + w[3] * args[5]
+            # Within 0.1 pixel of the circle of radius 500.
+            assert abs(math.hypot(x - 40, y - 30) - 500) < 0.1
+        p = (args[4], args[5])
+    assert p == pytest.approx(point(end))
+
+
+def test_shared_path_ops(monkeypatch: pytest.MonkeyPatch) -> None:
+    converted: List[Path] = []
+
+    def path_ops(path: Path) -> List[Tuple[Any, ...]]:
+        converted.append(path)
+        return []
+
+    monkeypatch.setattr(cairo, "path_ops", path_ops)
+    line = make_path([(0, 0), (1, 1)])
+    copies = instance(line, [Affine.translation((i, 0)) for i in range(3)])
+    d = hcat([copies, make_path([(0, 0), (2, 0)]), line])
+    prims = to_prims(d, Style.root(100))
+    renderer = ToCairoShape(prims)
+    for prim in prims:
+        prim.shape.accept(renderer, ctx=Recorder(), style=prim.style)
+        # Only the shared path is kept, until its last copy is drawn.
+        assert len(renderer.paths) <= 1
+    assert not renderer.paths and not renderer.uses
+    assert len(converted) == 2
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from chalk import P2, BoundingBox, circle, hcat, square, vcat
+from chalk.backend.svg import render
+
+
+def test_cull() -> None:
+    grid = vcat([hcat([square(1) for _ in range(10)]) for _ in range(10)])
+    viewport = BoundingBox([P2(0, 0), P2(2, 2)])
+    culled = grid.cull(viewport, margin=0)
+    kept = culled.stats().nodes["Primitive"]
+    assert 4 <= kept < 20
+    # Nothing visible.
+    away = BoundingBox([P2(100, 100), P2(101, 101)])
+    assert "Primitive" not in grid.cull(away).stats().nodes
+
+
+def test_cull_explicit_envelope() -> None:
+    # The envelope set by `with_envelope` doesn't hide what is drawn.
+    d = circle(1).translate(5, 0).with_envelope(circle(1))
+    viewport = BoundingBox([P2(4, -1), P2(6, 1)])
+    assert d.cull(viewport, margin=0).stats().nodes["Primitive"] == 1
+
+
+def test_render_viewport(tmp_path: Path) -> None:
+    grid = vcat([hcat([square(1)] * 10)] * 10)
+    viewport = BoundingBox([P2(0, 0), P2(2, 2)])
+    render(grid, str(tmp_path / "a.svg"), height=64, viewport=viewport)
+    render(grid, str(tmp_path / "b.svg"), height=64)
+    a = (tmp_path / "a.svg").read_text()
+    b = (tmp_path / "b.svg").read_text()
+    assert 0 < a.count("<rect") < b.count("<rect") == 100
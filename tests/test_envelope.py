@@ -15,6 +15,9 @@ import chalk
 from chalk import (
     P2,
     V2,
+    Affine,
+    ArcSegment,
+    BoundingBox,
     Diagram,
     Trail,
     circle,
@@ -25,6 +28,8 @@ from chalk import (
     unit_x,
     unit_y,
 )
+from chalk.envelope import Envelope
+from chalk.trace import Trace
 
 
 @composite
@@ -138,6 +143,25 @@ def test_circle_trace() -> None:
     trace(origin, (unit_x + unit_y))
 
 
+def test_arc() -> None:
+    d = ArcSegment(0, 90).at(unit_x).stroke()
+    env = d.get_envelope()
+    assert env(unit_x) == pytest.approx(1)
+    assert env(-unit_x) == pytest.approx(0)
+    assert env(V2(1, 1)) == pytest.approx(math.sqrt(0.5))
+    trace = d.get_trace()
+    # Only the end of the ray on the arc is hit.
+    assert trace(origin, -unit_x) == pytest.approx([-1])
+    assert trace(P2(0.5, 2), -unit_y) == pytest.approx([2 - math.sqrt(0.75)])
+    ellipse = ArcSegment(0, 360).at(unit_x).stroke().scale_x(2).rotate(30)
+    t = Affine.rotation(30) * Affine.scale(V2(2, 1))
+    v = V2.polar(75)
+    points = [t * V2.polar(a / 10) for a in range(3600)]
+    assert ellipse.get_envelope()(v) == pytest.approx(
+        max(v.dot(p) for p in points), abs=1e-5
+    )
+
+
 def test_path_trace() -> None:
     d = make_path([(1, 0), (1, 1)])
     trace = d.get_trace()
@@ -147,6 +171,20 @@ def test_path_trace() -> None:
     )
 
 
+def test_bounding_box() -> None:
+    box = BoundingBox([P2(1, -1), P2(3, 2)])
+    env = Envelope.from_bounding_box(box)
+    assert env(unit_x) == 3
+    assert env(-2 * unit_y) == 0.5
+    assert env(V2(1, 1)) == pytest.approx(2.5)
+    trace = Trace.from_bounding_box(box)
+    assert trace(P2(0, 3), unit_x) == []
+    assert trace(P2(0, 0.5), unit_x) == [1, 3]
+    assert trace(P2(2, 0), V2(0, -2)) == [-1, 0.5]
+    assert trace(P2(0, -2), V2(1, 1)) == [1, 3]
+    assert trace(P2(0, 0), V2(1, -1)) == [1]
+
+
 def test_transform() -> None:
     square = make_path([(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)])
     env = square.scale_x(2).scale_y(3).get_envelope()
@@ -157,3 +195,51 @@ def test_transform() -> None:
     assert env((unit_x + unit_y).normalized()) == pytest.approx(1)
     env = square.translate(-2, -2).get_envelope()
     assert env(unit_x) == pytest.approx(-1)
+
+
+def children(d: Diagram) -> int:
+    from chalk.core import Compose
+
+    assert isinstance(d, Compose)
+    return len(d.diagrams)
+
+
+def test_accumulate() -> None:
+    c = circle(1)
+    d = empty()
+    prefixes = []
+    for i in range(100):
+        d = d + c.translate(2 * i, 0)
+        prefixes.append(d)
+    # Branching off an earlier diagram doesn't change the later ones.
+    branch = prefixes[9] + c.translate(0, 10)
+    assert children(prefixes[9]) == 11
+    assert children(branch) == 12
+    assert children(d) == 101
+    env = d.get_envelope()
+    assert env(unit_x) == pytest.approx(199)
+    assert env(-unit_x) == pytest.approx(1)
+    assert branch.get_envelope()(unit_y) == pytest.approx(11)
+    assert prefixes[9].get_envelope()(unit_y) == pytest.approx(1)
+    assert set(d.get_trace()(P2(-5, 0), unit_x)) >= {4.0, 204.0}
+
+
+def test_concat() -> None:
+    c = circle(1)
+    d = chalk.concat(c.translate(2 * i, 0) for i in range(100))
+    assert children(d) == 100
+    assert children(chalk.concat([d, c, d])) == 201
+    assert chalk.concat([c]) is c
+    assert d.get_envelope()(unit_x) == pytest.approx(199)
+    assert d.get_envelope()(-unit_y) == pytest.approx(1)
+
+
+def test_hcat() -> None:
+    d = chalk.hcat([circle(1), empty(), rectangle(4, 2), circle(2)], 0.5)
+    env = d.get_envelope()
+    assert env(-unit_x) == pytest.approx(1)
+    assert env(unit_x) == pytest.approx(1 + 0.5 + 0.5 + 4 + 0.5 + 4)
+    assert env(unit_y) == pytest.approx(2)
+    # A single diagram is still followed by the separator.
+    d = chalk.vcat([circle(1)], 3)
+    assert d.get_envelope()(unit_y) == pytest.approx(4)
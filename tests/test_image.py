@@ -0,0 +1,99 @@
+import base64
+import importlib
+import io
+import os
+from pathlib import Path
+
+import PIL.Image
+import pytest
+
+from chalk.backend.png import iter_png
+from chalk.backend.svg import render
+from chalk.core import Primitive
+from chalk.shapes import BufferImage, Image
+from chalk.shapes.image import (
+    _decode,
+    from_argb32,
+    image_from_buffer,
+    svg_size,
+    to_argb32,
+)
+
+# The module, which `chalk.shapes.image` (the function) shadows.
+image = importlib.import_module("chalk.shapes.image")
+
+
+def test_argb32_byte_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    im = PIL.Image.new("RGBA", (3, 2), (200, 100, 50, 128))
+    im.putpixel((1, 1), (1, 2, 3, 255))
+    little = to_argb32(im)
+    native = from_argb32(little, im.size, 12).tobytes()
+    monkeypatch.setattr(image, "LITTLE_ENDIAN", False)
+    big = to_argb32(im)
+    # The same 32-bit words, with their bytes in the other order.
+    words = [little[i : i + 4] for i in range(0, len(little), 4)]
+    assert big == b"".join(w[::-1] for w in words)
+    assert from_argb32(big, im.size, 12).tobytes() == native
+
+
+def test_svg_size(tmp_path: Path) -> None:
+    path = tmp_path / "a.svg"
+    svg = '<svg xmlns="http://www.w3.org/2000/svg" {}></svg>'
+    path.write_text(svg.format('width="2in" height="30px"'))
+    misses = _decode.cache_info().misses
+    assert svg_size(str(path)) == (192, 30)
+    # The size is read from the header, without rasterizing the image.
+    shape = Image(str(path), None)
+    assert (shape.width, shape.height) == (192, 30)
+    assert _decode.cache_info().misses == misses
+    path.write_text(svg.format('width="10" viewBox="0 0 40 20"'))
+    assert svg_size(str(path)) == (10, 20)
+    path.write_text(svg.format('width="100%" height="100%"'))
+    assert svg_size(str(path)) is None
+
+
+def test_decode_mtime(tmp_path: Path) -> None:
+    path = tmp_path / "a.png"
+    PIL.Image.new("RGB", (2, 2), (255, 0, 0)).save(path)
+    shape = Image(str(path), None)
+    assert shape.im.getpixel((0, 0)) == (255, 0, 0)
+    assert shape.im is shape.im
+    PIL.Image.new("RGB", (2, 2), (0, 0, 255)).save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    # The file changed: it is decoded again.
+    assert shape.im.getpixel((0, 0)) == (0, 0, 255)
+
+
+def pixels() -> PIL.Image.Image:
+    "A small image with opaque and transparent pixels."
+    im = PIL.Image.new("RGBA", (3, 5), (200, 100, 50, 255))
+    im.putpixel((1, 2), (0, 0, 0, 0))
+    im.putpixel((2, 4), (1, 2, 3, 255))
+    return im
+
+
+def test_buffer_png() -> None:
+    im = pixels()
+    # Rows padded to a stride of 16 bytes.
+    data = to_argb32(im)
+    rows = [data[i : i + 12] + bytes(4) for i in range(0, len(data), 12)]
+    shape = BufferImage(bytearray(b"".join(rows)), 3, 5, 16)
+    png = b"".join(iter_png(3, 5, shape.rgba_rows(band=2)))
+    with PIL.Image.open(io.BytesIO(png)) as out:
+        assert out.mode == "RGBA"
+        assert out.tobytes() == im.tobytes()
+
+
+def test_buffer_svg(tmp_path: Path) -> None:
+    im = pixels()
+    streamed = image_from_buffer(bytearray(to_argb32(im)), 3, 5)
+    render(streamed, str(tmp_path / "a.svg"))
+    # The same image, with its data URI built in memory.
+    png = b"".join(iter_png(3, 5, [im.tobytes()]))
+    (tmp_path / "b.png").write_bytes(png)
+    uri = "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+    in_memory = Primitive.from_shape(Image(str(tmp_path / "b.png"), uri))
+    render(in_memory, str(tmp_path / "b.svg"))
+    a = (tmp_path / "a.svg").read_text()
+    assert a == (tmp_path / "b.svg").read_text()
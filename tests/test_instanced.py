@@ -0,0 +1,74 @@
+import math
+from pathlib import Path
+
+import pytest
+from colour import Color
+
+from chalk import (
+    P2,
+    V2,
+    Affine,
+    BoundingBox,
+    Style,
+    circle,
+    instance,
+    place_at,
+    square,
+)
+from chalk.backend.svg import render
+from chalk.serialize import dumps, loads
+
+TRANSFORMS = [
+    Affine.translation(V2(3 * i, i * i)) * Affine.rotation(15 * i)
+    for i in range(10)
+] + [Affine.scale(V2(2, 1)) * Affine.translation(V2(-4, 1))]
+
+
+def test_envelope() -> None:
+    d = instance(square(1).translate(0.5, 0), TRANSFORMS)
+    expanded = d.expand()  # type: ignore
+    for angle in range(0, 360, 10):
+        v = V2.polar(angle)
+        assert d.get_envelope()(v) == pytest.approx(expanded.get_envelope()(v))
+        assert d.rotate(30).get_envelope()(v) == pytest.approx(
+            expanded.rotate(30).get_envelope()(v)
+        )
+
+
+def test_place_at() -> None:
+    dot = circle(1)
+    d = place_at([dot] * 100, [(i, math.sin(i)) for i in range(100)])
+    stats = d.stats()
+    assert stats.nodes == {"Instanced": 1, "Primitive": 1}
+    assert d.get_envelope()(V2(1, 0)) == pytest.approx(100)
+    trace = d.get_trace()
+    assert min(trace(P2(-5, 0), V2(1, 0))) == pytest.approx(4)
+
+
+def test_cull_and_serialize() -> None:
+    red = Style().fill_color(Color("red"))
+    styles = [red if i % 2 else Style() for i in range(len(TRANSFORMS))]
+    d = instance(circle(1), TRANSFORMS, styles)
+    culled = d.cull(BoundingBox([P2(-1, -1), P2(4, 2)]), margin=0)
+    assert len(culled.transforms) == 2  # type: ignore
+    assert culled.styles == [Style(), red]  # type: ignore
+    assert loads(dumps(d)) == d
+
+
+def test_render_svg(tmp_path: Path) -> None:
+    d = instance(circle(1), TRANSFORMS)
+    render(d, str(tmp_path / "a.svg"), height=64)
+    render(d.expand(), str(tmp_path / "b.svg"), height=64)  # type: ignore
+    a = (tmp_path / "a.svg").read_text()
+    b = (tmp_path / "b.svg").read_text()
+    assert a.count("<circle") == 1
+    assert a.count("<use") == len(TRANSFORMS)
+    assert b.count("<circle") == len(TRANSFORMS)
+
+
+def test_place_at_named(tmp_path: Path) -> None:
+    dots = [circle(1).named("a")] * 3  # type: ignore
+    d = place_at(dots, [(2 * i, 0) for i in range(3)])
+    assert d.stats().nodes["Instanced"] == 1
+    render(d, str(tmp_path / "a.svg"), height=64)
+    assert (tmp_path / "a.svg").read_text().count("<use") == 3
@@ -0,0 +1,71 @@
+import importlib
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from chalk import hcat
+from chalk.backend.svg import render
+from chalk.shapes.latex import Compiled, Latex, batch, compile_snippets
+
+# The module, which `chalk.shapes.latex` (the function) shadows.
+latex = importlib.import_module("chalk.shapes.latex")
+
+
+@pytest.fixture
+def compiled(monkeypatch: pytest.MonkeyPatch) -> Iterator[List[str]]:
+    "Replaces the LaTeX compiler, and records the snippets it compiles."
+    calls: List[str] = []
+
+    def fake(text: str) -> Compiled:
+        calls.append(text)
+        return 1.0, 2.0, f'<g id="{text}"></g>'
+
+    monkeypatch.setattr(latex, "_compile", fake)
+    latex.clear_cache()
+    yield calls
+    latex.clear_cache()
+
+
+def test_batch(compiled: List[str]) -> None:
+    with batch(workers=1):
+        shapes = [Latex(t) for t in ["a", "b", "a", "c"]]
+        assert compiled == []
+    # Each snippet is compiled once, when the block exits.
+    assert compiled == ["a", "b", "c"]
+    assert shapes[2].width == 1.0 and shapes[2].height == 2.0
+    Latex("b")
+    assert compiled == ["a", "b", "c"]
+
+
+def test_size_in_batch(compiled: List[str]) -> None:
+    with batch(workers=1):
+        a, _ = Latex("a"), Latex("b")
+        # Reading a size compiles all the snippets deferred so far.
+        assert a.width == 1.0
+        assert compiled == ["a", "b"]
+        Latex("c")
+    assert compiled == ["a", "b", "c"]
+
+
+def test_render_in_batch(compiled: List[str], tmp_path: Path) -> None:
+    from chalk.core import Primitive
+
+    with batch(workers=1):
+        d = hcat([Primitive.from_shape(Latex(t)) for t in "ab"])
+        render(d, str(tmp_path / "a.svg"))
+        assert compiled == ["a", "b"]
+    assert 'id="embed-' in (tmp_path / "a.svg").read_text()
+
+
+def test_cache_size(
+    compiled: List[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(latex, "CACHE_SIZE", 2)
+    compile_snippets(["a", "b"], workers=1)
+    Latex("a").width
+    compile_snippets(["c"])
+    # The least recently used snippet was dropped.
+    assert list(latex._compiled) == ["a", "c"]
+    latex.clear_cache()
+    assert not latex._compiled
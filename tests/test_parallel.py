@@ -0,0 +1,90 @@
+import os
+import re
+from pathlib import Path
+from typing import List
+
+import pytest
+from colour import Color
+
+from chalk import (
+    V2,
+    Affine,
+    RenderResult,
+    circle,
+    hcat,
+    instance,
+    render_many,
+    square,
+    text,
+    vcat,
+)
+from chalk.backend.svg import render
+from chalk.parallel import task_pool
+
+
+def test_render_many(tmp_path: Path) -> None:
+    diagrams = [circle(1), square(1), circle(2)]
+    paths = [str(tmp_path / f"{i}.svg") for i in range(2)]
+    # The last render fails: its directory does not exist.
+    paths.append(str(tmp_path / "missing" / "2.svg"))
+    seen: List[RenderResult] = []
+    results = render_many(
+        diagrams, paths, "svg", workers=2, progress=seen.append, height=32
+    )
+    assert [r.index for r in results] == [0, 1, 2]
+    assert sorted(r.index for r in seen) == [0, 1, 2]
+    assert results[0].ok and results[1].ok and not results[2].ok
+    assert "FileNotFoundError" in str(results[2].error)
+    render(diagrams[0], str(tmp_path / "a.svg"), height=32)
+    assert (tmp_path / "0.svg").read_text() == (tmp_path / "a.svg").read_text()
+    assert render_many([], [], "svg") == []
+
+
+def test_render_workers(tmp_path: Path) -> None:
+    d = hcat(
+        [circle(1).fill_color(Color("red")), text("a", 1), square(1)] * 10
+    )
+    render(d, str(tmp_path / "a.svg"), height=64)
+    render(d, str(tmp_path / "b.svg"), height=64, workers=2)
+    assert (tmp_path / "a.svg").read_text() == (tmp_path / "b.svg").read_text()
+
+
+def test_render_instanced_workers(tmp_path: Path) -> None:
+    shifts = [Affine.translation(V2(2 * i, 0)) for i in range(5)]
+    row = instance(circle(1), shifts)
+    grid = instance(hcat([row, square(1)]), [Affine.translation(V2(0, 3))])
+    d = vcat([row, grid, square(2), row] * 4)
+    render(d, str(tmp_path / "a.svg"), height=64)
+    render(d, str(tmp_path / "b.svg"), height=64, workers=2)
+    a = (tmp_path / "a.svg").read_text()
+    assert a == (tmp_path / "b.svg").read_text()
+    # Each id is defined once, and every reference is to a defined id.
+    ids = re.findall(r'id="(chalk-[0-9a-f]+)"', a)
+    assert len(ids) == len(set(ids)) == 2
+    assert set(re.findall(r'href="#(chalk-[0-9a-f]+)"', a)) == set(ids)
+
+
+def test_render_png_workers(tmp_path: Path) -> None:
+    pytest.importorskip("cairo")
+    from PIL import Image as PILImage
+
+    from chalk.backend.cairo import render as render_png
+
+    d = hcat([circle(1).fill_color(Color("red")), square(1)] * 10)
+    render_png(d, str(tmp_path / "a.png"), height=64)
+    render_png(d, str(tmp_path / "b.png"), height=64, workers=2)
+    a = PILImage.open(tmp_path / "a.png").tobytes()
+    assert a == PILImage.open(tmp_path / "b.png").tobytes()
+
+
+def pid(_: int) -> int:
+    return os.getpid()
+
+
+def test_task_pool() -> None:
+    with task_pool(abs, [0, -1, -2, -3], 2) as run:
+        assert run([3, 1]) == [3, 1]
+    with task_pool(pid, list(range(8)), 2) as run:
+        pids = set(run(range(4))) | set(run(range(4, 8)))
+    # The same two processes serve both calls.
+    assert len(pids) <= 2 and os.getpid() not in pids
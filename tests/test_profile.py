@@ -0,0 +1,23 @@
+import json
+from pathlib import Path
+
+from chalk import Diagram, circle, hcat, square
+from chalk.backend.svg import render
+from chalk.envelope import Envelope
+from chalk.profile import profile
+
+
+def test_profile(tmp_path: Path) -> None:
+    d: Diagram = hcat([circle(1), square(1)], sep=0.5).center_xy()
+    call = Envelope.__call__
+    with profile() as prof:
+        render(d, str(tmp_path / "out.svg"), 64)
+    assert Envelope.__call__ is call
+    for key in ["envelope", "style.merge", "affine.mul", "visit.ToSVG"]:
+        assert prof.stats[key].calls > 0
+    for key in ["stage.layout", "stage.traverse", "stage.write"]:
+        assert prof.stats[key].calls == 1
+    assert "stats" in json.loads(prof.to_json())
+    events = json.loads(prof.to_chrome_trace())["traceEvents"]
+    assert [e["name"] for e in events] == ["layout", "traverse", "write"]
+    assert events[1]["args"]["visit.ToSVG"] > 0
@@ -0,0 +1,56 @@
+import pickle
+
+import pytest
+from colour import Color
+
+from chalk import (
+    Diagram,
+    Envelope,
+    Name,
+    arc_between,
+    circle,
+    hcat,
+    rectangle,
+    text,
+    unit_x,
+    unit_y,
+)
+from chalk.serialize import dumps, loads
+
+
+def sample() -> Diagram:
+    cell = circle(1).fill_color(Color("red")).named(Name("c"))
+    row = hcat([cell, rectangle(2, 1).line_width(0.2)], sep=0.5)
+    # Plain atoms are accepted as names too.
+    label = text("x", 1).named("label")  # type: ignore
+    arc = arc_between((0, 0), (1, 1), 0.3).dashing([0.1, 0.2], 0)
+    return (row / row + label + arc).pad(1.2).with_envelope(rectangle(9, 9))
+
+
+def same_envelope(a: Diagram, b: Diagram) -> bool:
+    ea, eb = a.get_envelope(), b.get_envelope()
+    directions = [unit_x, -unit_x, unit_y, unit_x + 2 * unit_y]
+    return all(abs(ea(v) - eb(v)) < 1e-9 for v in directions)
+
+
+def test_roundtrip() -> None:
+    d = sample()
+    for copy in [loads(dumps(d)), pickle.loads(pickle.dumps(d))]:
+        assert copy == d
+        assert same_envelope(copy, d)
+        assert len(copy.get_sub_map()) == len(d.get_sub_map())
+
+
+def test_function_envelope() -> None:
+    d = circle(1).compose(Envelope.from_circle(2))
+    with pytest.raises(ValueError):
+        dumps(d)
+
+
+def test_name_atoms() -> None:
+    names = [("box", 1, 2.5), (None, True, ("a", -3))]
+    d = hcat(circle(1).named(Name(n)) for n in names)
+    assert loads(dumps(d)) == d
+    # Only primitive atoms are stored, so loading never runs code.
+    with pytest.raises(ValueError):
+        dumps(circle(1).named(Name(object())))
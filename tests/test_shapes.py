@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import pytest
+
+from chalk import (
+    P2,
+    V2,
+    Affine,
+    ArcSegment,
+    Trail,
+    circle,
+    hcat,
+    rectangle,
+    regular_polygon,
+    square,
+    triangle,
+)
+from chalk.backend.svg import render
+from chalk.serialize import dumps, loads
+from chalk.types import Diagram
+
+CASES = [
+    (circle(2), Trail.circle().stroke().center_xy().scale(2)),
+    (rectangle(2, 3), Trail.rectangle(2, 3).stroke().center_xy()),
+    (rectangle(0, 3), Trail.rectangle(0, 3).stroke().center_xy()),
+    (triangle(2), Trail.regular_polygon(3, 2).centered().stroke()),
+    (
+        regular_polygon(7, 0.5),
+        Trail.regular_polygon(7, 0.5).centered().stroke(),
+    ),
+]
+
+
+def shape(d: Diagram) -> object:
+    from chalk.core import Primitive
+
+    assert isinstance(d, Primitive)
+    return d.shape
+
+
+def test_shared_prototypes() -> None:
+    assert shape(circle(1)) is shape(circle(2))
+
+
+@pytest.mark.parametrize(
+    "d",
+    [
+        square(0.002),
+        rectangle(0.4, 0.001).scale(0.05),
+        triangle(0.002),
+    ],
+)
+def test_small_shapes(tmp_path: Path, d: Diagram) -> None:
+    # The sizes are built into the shapes: only the outer scale is in
+    # the transform, which stays invertible.
+    render(d, str(tmp_path / "a.svg"), height=64)
+    assert d.get_envelope()(V2(1, 0)) > 0
+    assert d.get_trace()(P2(0, 0), V2(1, 0))
+
+
+@pytest.mark.parametrize("d, expected", CASES)
+def test_same_envelope(d: Diagram, expected: Diagram) -> None:
+    for angle in range(0, 360, 15):
+        v = V2.polar(angle)
+        assert d.get_envelope()(v) == pytest.approx(expected.get_envelope()(v))
+
+
+@pytest.mark.parametrize("d, expected", CASES[:2] + CASES[3:])
+def test_same_trace(d: Diagram, expected: Diagram) -> None:
+    d, expected = d.rotate(10), expected.rotate(10)
+    for angle in range(0, 360, 15):
+        v = V2.polar(angle, 2)
+        for p in [P2(0.1, 0.2), P2(3, -4)]:
+            # Paths hit at the ends of two segments: drop the duplicates.
+            hits = sorted({round(x, 9) for x in d.get_trace()(p, v)})
+            expected_hits = {round(x, 9) for x in expected.get_trace()(p, v)}
+            assert hits == sorted(expected_hits)
+
+
+def test_native_elements(tmp_path: Path) -> None:
+    d = hcat([circle(1), square(1), triangle(1)] * 2)
+    assert loads(dumps(d)) == d
+    render(d, str(tmp_path / "a.svg"), height=64)
+    a = (tmp_path / "a.svg").read_text()
+    assert a.count("<circle") == a.count("<rect") == 2
+    assert "<path" not in a
+
+
+def test_arc_transform() -> None:
+    t = Affine.rotation(30) * Affine.scale(V2(2, 1))
+    seg = ArcSegment(20, 130).apply_transform(t)
+    expected = ArcSegment(20, 130, t)
+    assert seg == expected
+    assert tuple(seg.q) == pytest.approx(tuple(expected.q))
+    assert seg.p == P2(0, 0)
+    assert not hasattr(seg, "__dict__")
@@ -0,0 +1,28 @@
+import math
+from pathlib import Path as FilePath
+
+from chalk import circle, make_path
+from chalk.backend.svg import render
+from chalk.simplify import simplify_points
+
+
+def test_simplify_points() -> None:
+    line = [(i / 10, 1e-3 * (-1) ** i) for i in range(11)]
+    assert simplify_points(line, 0.01) == [line[0], line[-1]]
+    assert simplify_points(line, 1e-4) == line
+    corner = [(0.0, 0.0), (0.5, 0.0), (1.0, 0.0), (1.0, 1.0)]
+    assert simplify_points(corner, 0.1) == [corner[0], corner[2], corner[3]]
+
+
+def test_simplify_diagram(tmp_path: FilePath) -> None:
+    # Arcs are kept as they are.
+    d = circle(1)
+    assert d.simplify(0.1) is d
+    wave = make_path(
+        [(i / 1000, math.sin(i / 100)) for i in range(1000)]
+    ).scale(100)
+    render(wave, str(tmp_path / "a.svg"), height=200)
+    render(wave, str(tmp_path / "b.svg"), height=200, tolerance=0.25)
+    a = (tmp_path / "a.svg").read_text()
+    b = (tmp_path / "b.svg").read_text()
+    assert 5 * b.count(" L ") < a.count(" L ")
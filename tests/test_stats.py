@@ -0,0 +1,18 @@
+from colour import Color
+
+from chalk import Name, circle, hcat, vcat
+from chalk.stats import stats
+
+
+def test_stats() -> None:
+    row = hcat([circle(1), circle(1).fill_color(Color("red"))])
+    d = vcat([row, row]).named(Name("grid"))
+    s = stats(d)
+    assert s.nodes["ApplyName"] == 1 and s.names == 1
+    assert s.shapes["Circle"] == 2
+    assert s.arcs == 0 and s.segments == 0
+    assert s.styles == 2
+    # The row is referenced twice, but only counted once.
+    assert s.shared >= 1
+    assert s.expanded > sum(s.nodes.values())
+    assert s.depth > 2
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from colour import Color
+
+from chalk import hcat, make_path, square, text
+from chalk.backend.svg import render
+from chalk.shapes import image_from_buffer
+
+
+def test_merge(tmp_path: Path) -> None:
+    line = make_path([(0, 0), (1, 1)])
+    red = line.line_color(Color("red"))
+    d = hcat([line] * 5 + [red] * 5 + [square(1)] + [line] * 2)
+    render(d, str(tmp_path / "a.svg"), height=64)
+    render(d, str(tmp_path / "b.svg"), height=64, merge=True)
+    a = (tmp_path / "a.svg").read_text()
+    b = (tmp_path / "b.svg").read_text()
+    assert a.count("<path") == 12
+    # One path per run of lines; the filled square is kept apart.
+    assert b.count("<path") == 3
+    assert a.count("<rect") == b.count("<rect") == 1
+    assert a.count("L ") == b.count("L ")
+
+
+def test_stream_tokens(tmp_path: Path) -> None:
+    # Text that looks like a placeholder is not replaced.
+    label = "chalk-stream-0 chalk-stream-0123456789abcdef"
+    pixels = image_from_buffer(bytearray(4 * 2 * 2), 2, 2)
+    render(hcat([text(label, 1), pixels]), str(tmp_path / "a.svg"))
+    out = (tmp_path / "a.svg").read_text()
+    assert label in out
+    assert "data:image/png;base64,iVBOR" in out
@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import pytest
+
+from chalk import text
+from chalk.backend.svg import render
+from chalk.shapes.text import FONT, FontMetrics, set_text_metrics
+from chalk.transform import unit_x, unit_y
+
+
+@pytest.fixture(autouse=True)
+def no_metrics() -> Iterator[None]:
+    yield
+    set_text_metrics(None)
+
+
+class Fixed:
+    "Every character is a 2 × 3 box."
+
+    def extents(
+        self, text: str, font: str, size: float
+    ) -> Tuple[float, float]:
+        return 2.0 * len(text), 3.0
+
+
+def test_font_metrics() -> None:
+    metrics = FontMetrics()
+    assert metrics.extents("Hi", FONT, 10) == pytest.approx((9.44, 7.18))
+    # Descenders and characters outside of ASCII.
+    assert metrics.extents("gé", FONT, 10) == pytest.approx((11.12, 9.25))
+
+
+def test_envelope() -> None:
+    assert text("Hi", 10).get_envelope()(unit_x) < 1e-3
+    set_text_metrics(FontMetrics())
+    envelope = text("Hi", 10).get_envelope()
+    assert envelope(unit_x) == envelope(-unit_x) == pytest.approx(4.72)
+    assert envelope(unit_y) == envelope(-unit_y) == pytest.approx(3.59)
+
+
+def test_set_text_metrics() -> None:
+    set_text_metrics(FontMetrics())
+    assert text("abc", 10).get_envelope().width == pytest.approx(16.12)
+    # The memoized extents are dropped when the provider changes.
+    set_text_metrics(Fixed())
+    assert text("abc", 10).get_envelope().width == 6
+    set_text_metrics(None)
+    assert text("abc", 10).get_envelope().width < 1e-3
+
+
+def test_svg_centered(tmp_path: Path) -> None:
+    set_text_metrics(Fixed())
+    render(text("abc", 1), str(tmp_path / "a.svg"))
+    out = (tmp_path / "a.svg").read_text()
+    # The text is centered by its anchor, not shifted by its width.
+    assert "text-anchor:middle" in out and "translate(-" not in out
+    # The metrics measure the regular face.
+    assert "bold" not in out
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+from colour import Color
+
+from chalk import circle, hcat, square, text
+from chalk.backend.cairo import layout, to_prims
+from chalk.backend.tiled import prim_bounds
+from chalk.style import Style
+
+
+def test_prim_bounds() -> None:
+    d = hcat([circle(1), square(2), text("abc", 1)])
+    s, width = layout(d, 100)
+    for prim in to_prims(s, Style.root(100)):
+        bounds = prim_bounds(prim)
+        assert bounds is not None
+        x0, y0, x1, y1 = prim.get_envelope().bounds
+        assert bounds[0] < x0 and bounds[1] < y0
+        assert bounds[2] > x1 and bounds[3] > y1
+
+
+def test_render_tiled(tmp_path: Path) -> None:
+    pytest.importorskip("cairo")
+    from PIL import Image as PILImage
+
+    from chalk.backend.cairo import render
+
+    d = hcat([circle(1).fill_color(Color("red")), square(1)] * 10)
+    render(d, str(tmp_path / "a.png"), height=100)
+    render(d, str(tmp_path / "b.png"), height=100, tile=32)
+    a = PILImage.open(tmp_path / "a.png").convert("RGBA")
+    b = PILImage.open(tmp_path / "b.png").convert("RGBA")
+    assert a.size == b.size
+    # Cairo and PIL may unpremultiply the alpha differently.
+    assert all(
+        abs(x - y) <= 1
+        for p, q in zip(a.getdata(), b.getdata())
+        for x, y in zip(p, q)
+    )